@@ -0,0 +1,114 @@
+"""Startup-time benchmark: what `scrapy crawl <spider>` pays before the first request.
+
+Each scenario runs in a fresh interpreter (so nothing is cached in
+sys.modules) and is repeated; the median wall time is reported, along with
+the median time spent loading the spider alone (after Scrapy and the
+settings are imported), which is where the loaders differ and is far less
+noisy than the whole process.
+
+    python benchmarks/bench_startup.py [--runs 7] [--spider indeed] [--baseline REV]
+
+Scenarios load the spider through SPIDER_LOADER_CLASS, as `scrapy crawl`
+does. "current" runs this tree with Scrapy's stock SpiderLoader (which
+imports every spider module) and with the project's LazySpiderLoader.
+``--baseline`` also runs the tree of a git revision (e.g. the commit before
+LazySpiderLoader) with its own settings and spider modules, extracted with
+``git archive``; that is the number to compare "current" against. Optional
+packages that aren't installed are reported, since a tree that imports them
+at module level fails every crawl without them.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRELUDE = """
+import os, sys
+sys.path.insert(0, {root!r})
+os.environ["SCRAPY_SETTINGS_MODULE"] = "indeed_scraper.settings"
+from scrapy.utils.project import get_project_settings
+settings = get_project_settings()
+"""
+
+LOAD = """
+import time
+started = time.perf_counter()
+from scrapy.utils.misc import load_object
+if {loader!r}:
+    settings.set("SPIDER_LOADER_CLASS", {loader!r})
+load_object(settings["SPIDER_LOADER_CLASS"]).from_settings(settings.frozencopy()).load({spider!r})
+print(time.perf_counter() - started)
+"""
+
+STOCK_LOADER = "scrapy.spiderloader.SpiderLoader"
+
+OPTIONAL_DEPS = ("bs4", "selenium", "webdriver_manager")
+
+
+def extract(rev, directory):
+    """The tree of git revision ``rev``, unpacked into ``directory``."""
+    archive = subprocess.run(["git", "-C", ROOT, "archive", rev], capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", directory], input=archive, check=True)
+    return directory
+
+
+def run_once(code):
+    """(wall time, spider load time or None), or (None, error line) if the scenario failed."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode:
+        return None, result.stderr.strip().splitlines()[-1]
+    output = result.stdout.split()
+    return (elapsed, float(output[-1]) if output else None), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--spider", default="indeed")
+    parser.add_argument("--baseline", metavar="REV", help="also time the tree of this git revision with its own settings")
+    args = parser.parse_args()
+
+    missing = [m for m in OPTIONAL_DEPS if subprocess.run(
+        [sys.executable, "-c", f"import {m}"], capture_output=True
+    ).returncode]
+    if missing:
+        print(f"Optional deps not installed: {', '.join(missing)} "
+              "(a tree that imports them at module level fails every crawl without them)\n")
+
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as tmp:
+        scenarios = [("scrapy + settings only", ROOT, None)]
+        if args.baseline:
+            scenarios.append((f"baseline {args.baseline}: its own SPIDER_LOADER_CLASS", extract(args.baseline, tmp), ""))
+        scenarios += [
+            ("current: stock SpiderLoader", ROOT, STOCK_LOADER),
+            ("current: LazySpiderLoader", ROOT, "indeed_scraper.spiderloader.LazySpiderLoader"),
+        ]
+        print(f"{'scenario':52} {'median':>9} {'min':>9} {'load':>9}")
+        for label, root, loader in scenarios:
+            code = PRELUDE.format(root=root)
+            if loader is not None:
+                code += LOAD.format(loader=loader, spider=args.spider)
+            timings, loads, error = [], [], None
+            for _ in range(args.runs):
+                result, error = run_once(code)
+                if error:
+                    break
+                timings.append(result[0])
+                if result[1] is not None:
+                    loads.append(result[1])
+            if error:
+                print(f"{label:52} {'FAILED':>9}  {error}")
+                continue
+            load = f"{statistics.median(loads) * 1000:7.1f}ms" if loads else f"{'-':>9}"
+            print(f"{label:52} {statistics.median(timings) * 1000:7.1f}ms {min(timings) * 1000:7.1f}ms {load}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Materialized per-source/company/title/country/day aggregates of the scraped postings.
+
+Every posting is counted once (by URL) into rows of the ``aggregates``
+table, one per (dimension, key, day) plus an all-time row per
+(dimension, key) with day ``""``::
+
+    dimension  key                 day          jobs  salaried  salary_sum  salary_min  salary_max  sketch
+    source     indeed              2025-10-14   31    4         ...
+    title      python developer    ""           12    7         ...
+    all        ""                  2025-10-14   96    20        ...
+
+``day`` is the posted date (the scrape date when a board gives none). Postings
+backfilled from a CSV without a known scrape date are only counted in the
+all-time rows when their date is relative ("Today", "9d") or missing. The
+salary columns cover postings with a disclosed salary, taken as the middle
+of the range once annualized (``parse_salary``). ``sketch`` is a
+``QuantileSketch`` of those salaries, so medians and percentiles come out
+of one row too. A dashboard reads a handful of rows however much history
+there is; nothing is ever rescanned.
+"""
+import math
+import sqlite3
+import struct
+from datetime import date
+
+from indeed_scraper.geo import normalize_location
+from indeed_scraper.utils.normalize import normalize_company, normalize_text, parse_posted, parse_salary
+
+DIMENSIONS = ("all", "source", "company", "title", "country")
+ALL_TIME = ""
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative error: log-spaced buckets of positive values.
+
+    Every value is counted in the bucket ``ceil(log_gamma(value))`` with
+    gamma = (1 + accuracy) / (1 - accuracy), so any quantile is off by at most
+    ``accuracy`` of its value. Salaries span a few hundred buckets at 1%.
+    """
+
+    def __init__(self, accuracy=0.01):
+        if not 0 < accuracy < 1:
+            raise ValueError(f"accuracy must be between 0 and 1, got {accuracy}")
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.count = 0
+
+    def add(self, value, count=1):
+        if value <= 0:
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += count
+
+    def merge(self, other):
+        if other.gamma == self.gamma:
+            for index, count in other.buckets.items():
+                self.buckets[index] = self.buckets.get(index, 0) + count
+            self.count += other.count
+        else:
+            # sketches written with another accuracy: re-bucket by representative value
+            for index, count in other.buckets.items():
+                self.add(other._value(index), count)
+
+    def _value(self, index):
+        # the middle (in relative terms) of bucket (gamma**(index-1), gamma**index]
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.buckets))
+
+    def to_bytes(self):
+        return struct.pack("<d", self.gamma) + b"".join(
+            struct.pack("<iI", index, count) for index, count in sorted(self.buckets.items())
+        )
+
+    @classmethod
+    def from_bytes(cls, data):
+        (gamma,) = struct.unpack_from("<d", data)
+        o = cls((gamma - 1) / (gamma + 1))
+        o.gamma = gamma
+        o._log_gamma = math.log(gamma)
+        for index, count in struct.iter_unpack("<iI", data[8:]):
+            o.buckets[index] = count
+            o.count += count
+        return o
+
+
+class _Delta:
+    __slots__ = ("jobs", "salaried", "salary_sum", "salary_min", "salary_max", "sketch")
+
+    def __init__(self, accuracy):
+        self.jobs = self.salaried = 0
+        self.salary_sum = 0.0
+        self.salary_min = self.salary_max = None
+        self.sketch = QuantileSketch(accuracy)
+
+    def add(self, salary):
+        self.jobs += 1
+        if salary is None:
+            return
+        low, high, middle = salary
+        self.salaried += 1
+        self.salary_sum += middle
+        self.salary_min = low if self.salary_min is None else min(self.salary_min, low)
+        self.salary_max = high if self.salary_max is None else max(self.salary_max, high)
+        self.sketch.add(middle)
+
+
+def dimension_keys(job, source):
+    """(dimension, key) pairs a posting is counted under."""
+    keys = [("all", ""), ("source", source or "")]
+    company = normalize_company(job.get("company"))
+    if company:
+        keys.append(("company", company))
+    title = normalize_text(job.get("title"))
+    if title:
+        keys.append(("title", title))
+    country = normalize_location(job.get("location")).country
+    if country:
+        keys.append(("country", country))
+    return keys
+
+
+class Aggregates:
+    def __init__(self, path, accuracy=0.01):
+        self.accuracy = accuracy
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS aggregates (
+                dimension TEXT NOT NULL,
+                key TEXT NOT NULL,
+                day TEXT NOT NULL,
+                jobs INTEGER NOT NULL,
+                salaried INTEGER NOT NULL,
+                salary_sum REAL NOT NULL,
+                salary_min REAL,
+                salary_max REAL,
+                sketch BLOB,
+                PRIMARY KEY (dimension, key, day)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS aggregates_top ON aggregates (dimension, day, jobs);
+            CREATE TABLE IF NOT EXISTS counted (key TEXT PRIMARY KEY) WITHOUT ROWID;
+            """
+        )
+        self.pending = {}
+
+    def add(self, job, source=None, today=None, backfill=False, scraped_on=None):
+        """Count one posting (once per URL); returns False if it was counted before.
+
+        A ``backfill`` posting (read from a CSV) was scraped on ``scraped_on``; when
+        that is unknown, one without an absolute posted date gets no per-day row.
+        Counts collect in memory until ``flush()``.
+        """
+        key = job.get("url")
+        if not key:
+            return False
+        if self.db.execute("INSERT OR IGNORE INTO counted (key) VALUES (?)", (key,)).rowcount == 0:
+            return False
+        if backfill:
+            posted = parse_posted(job.get("posted"), scraped_on, relative=scraped_on is not None) or scraped_on
+        else:
+            today = today or date.today()
+            posted = parse_posted(job.get("posted"), today) or today
+        days = (posted.isoformat(), ALL_TIME) if posted else (ALL_TIME,)
+        low, high = parse_salary(job.get("salary") or job.get("salary_range") or "")
+        salary = (low, high, (low + high) / 2) if high else None
+        for dimension, value in dimension_keys(job, source):
+            for day in days:
+                delta = self.pending.get((dimension, value, day))
+                if delta is None:
+                    delta = self.pending[(dimension, value, day)] = _Delta(self.accuracy)
+                delta.add(salary)
+        return True
+
+    def flush(self):
+        """Merge the pending counts into the tables, in one transaction."""
+        for (dimension, key, day), delta in self.pending.items():
+            row = self.db.execute(
+                "SELECT * FROM aggregates WHERE dimension = ? AND key = ? AND day = ?", (dimension, key, day)
+            ).fetchone()
+            if row is not None:
+                delta.jobs += row["jobs"]
+                delta.salaried += row["salaried"]
+                delta.salary_sum += row["salary_sum"]
+                delta.salary_min = _fold(min, delta.salary_min, row["salary_min"])
+                delta.salary_max = _fold(max, delta.salary_max, row["salary_max"])
+                if row["sketch"]:
+                    delta.sketch.merge(QuantileSketch.from_bytes(row["sketch"]))
+            self.db.execute(
+                "INSERT OR REPLACE INTO aggregates VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (dimension, key, day, delta.jobs, delta.salaried, delta.salary_sum,
+                 delta.salary_min, delta.salary_max, delta.sketch.to_bytes() if delta.sketch.count else None),
+            )
+        self.pending = {}
+        self.db.commit()
+
+    def rows(self, dimension, key=None, since=None, daily=False, order="jobs", limit=None):
+        """Aggregate rows of one dimension, as dicts with mean/median/p90 filled in.
+
+        All-time rows unless ``daily`` (then one row per key and day, from ``since`` on).
+        """
+        where, params = ["dimension = ?"], [dimension]
+        if key is not None:
+            where.append("key = ?")
+            params.append(key)
+        if daily:
+            where.append("day != ?")
+            params.append(ALL_TIME)
+            if since is not None:
+                where.append("day >= ?")
+                params.append(since.isoformat())
+        else:
+            where.append("day = ?")
+            params.append(ALL_TIME)
+        sql = "SELECT * FROM aggregates WHERE " + " AND ".join(where)
+        sql += " ORDER BY day DESC, jobs DESC, key" if daily else " ORDER BY jobs DESC, key"
+        rows = [_summary(row) for row in self.db.execute(sql, params)]
+        if order != "jobs":
+            rows.sort(key=lambda r: (r[order] is None, -(r[order] or 0)))
+        return rows[:limit] if limit else rows
+
+    def close(self):
+        if self.pending:
+            self.flush()
+        self.db.commit()
+        self.db.close()
+
+
+def _fold(function, a, b):
+    if a is None or b is None:
+        return a if b is None else b
+    return function(a, b)
+
+
+def _summary(row):
+    sketch = QuantileSketch.from_bytes(row["sketch"]) if row["sketch"] else None
+    return {
+        "key": row["key"],
+        "day": row["day"],
+        "jobs": row["jobs"],
+        "salaried": row["salaried"],
+        "mean": row["salary_sum"] / row["salaried"] if row["salaried"] else None,
+        "median": sketch.quantile(0.5) if sketch else None,
+        "p90": sketch.quantile(0.9) if sketch else None,
+        "min": row["salary_min"],
+        "max": row["salary_max"],
+    }
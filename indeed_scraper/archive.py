@@ -0,0 +1,229 @@
+"""Append-only archive of every fetched page, so selectors can be fixed without re-buying pages.
+
+With ARCHIVE_ENABLED, ``RawPageArchive`` appends each downloaded response to
+``<ARCHIVE_DIR>/pages-<date>-<pid>.warcz`` as a WARC-like record::
+
+    WARC/1.1
+    WARC-Type: response
+    WARC-Record-ID: <urn:uuid:...>
+    WARC-Date: 2026-10-19T08:00:00Z
+    WARC-Target-URI: https://remote.co/remote-jobs/search/?...
+    X-Request-URI: https://api.scraperapi.com/?...
+    X-Site / X-Spider / X-Callback / X-Dictionary
+    Content-Encoding: deflate
+    Content-Length: N
+
+    <deflate("HTTP/1.1 <status>\\r\\n<headers>\\r\\n\\r\\n<body>")>
+
+The block is compressed with a preset dictionary shared by every page of the
+same site (the tail of the first page archived for it), so the boilerplate
+that pages of a board share costs almost nothing. ``index.sqlite`` maps
+(site, target URL, fetch time) to the segment, offset and length of each
+block. Responses replayed from a cache or checkpoint, and coalesced copies,
+are not archived again.
+
+``scrapy reparse`` streams the archive back through the current spider
+callbacks.
+"""
+import os
+import sqlite3
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Headers
+
+from indeed_scraper.extensions import FREE_RESPONSE_FLAGS
+from indeed_scraper.providers import site_for, target_url
+from indeed_scraper.utils.storage import data_dir
+
+DICTIONARY_SIZE = 32 * 1024  # deflate's window; a longer preset dictionary is not used
+
+
+class ArchiveIndex:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, isolation_level=None, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS dictionaries (id INTEGER PRIMARY KEY, site TEXT UNIQUE NOT NULL, data BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS records (
+                site TEXT NOT NULL, target TEXT NOT NULL, fetched_at TEXT NOT NULL,
+                url TEXT NOT NULL, status INTEGER NOT NULL, spider TEXT NOT NULL, callback TEXT NOT NULL,
+                segment TEXT NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL,
+                dictionary INTEGER, size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS records_key ON records (site, target, fetched_at);
+            CREATE INDEX IF NOT EXISTS records_time ON records (fetched_at);
+            """
+        )
+
+    def dictionary_for(self, site):
+        row = self.conn.execute("SELECT id, data FROM dictionaries WHERE site = ?", (site,)).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def add_dictionary(self, site, data):
+        # another process may have won the race; keep whichever landed first
+        self.conn.execute("INSERT OR IGNORE INTO dictionaries (site, data) VALUES (?, ?)", (site, data))
+        return self.dictionary_for(site)
+
+    def dictionary(self, dictionary_id):
+        row = self.conn.execute("SELECT data FROM dictionaries WHERE id = ?", (dictionary_id,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, record):
+        self.conn.execute(
+            "INSERT INTO records (site, target, fetched_at, url, status, spider, callback, segment, offset, length, dictionary, size)"
+            " VALUES (:site, :target, :fetched_at, :url, :status, :spider, :callback, :segment, :offset, :length, :dictionary, :size)",
+            record,
+        )
+
+    def records(self, spider=None, site=None, since=None, until=None):
+        """Index rows in fetch order, filtered by spider/site and an inclusive ISO date range."""
+        clauses, params = [], []
+        if spider:
+            clauses.append("spider = ?")
+            params.append(spider)
+        if site:
+            clauses.append("site = ?")
+            params.append(site)
+        if since:
+            clauses.append("fetched_at >= ?")
+            params.append(since.isoformat())
+        if until:
+            # until is a date: everything fetched on that day is in
+            clauses.append("substr(fetched_at, 1, 10) <= ?")
+            params.append(until.isoformat())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        self.conn.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in self.conn.execute(f"SELECT * FROM records {where} ORDER BY fetched_at", params)]
+        finally:
+            self.conn.row_factory = None
+
+    def close(self):
+        self.conn.close()
+
+
+def _http_block(status, headers, body):
+    lines = [f"HTTP/1.1 {status}".encode()]
+    for name, values in headers.items():
+        for value in values:
+            lines.append(name + b": " + value)
+    return b"\r\n".join(lines) + b"\r\n\r\n" + body
+
+
+def _parse_http_block(block):
+    head, _, body = block.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.split(b"\r\n")
+    headers = Headers()
+    for line in header_lines:
+        name, _, value = line.partition(b": ")
+        headers.appendlist(name, value)
+    return int(status_line.split()[1]), headers, body
+
+
+class PageArchive:
+    def __init__(self, directory):
+        self.directory = directory
+        self.index = ArchiveIndex(os.path.join(directory, "index.sqlite"))
+        self.dictionaries = {}
+        self.segment = None
+        self.fd = None
+
+    def _open_segment(self, day):
+        # one segment per day and process: appends never interleave, offsets stay exact
+        name = f"pages-{day}-{os.getpid()}.warcz"
+        if name != self.segment:
+            if self.fd is not None:
+                os.close(self.fd)
+            self.fd = os.open(os.path.join(self.directory, name), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self.segment = name
+        return name
+
+    def _dictionary(self, site, body):
+        if site not in self.dictionaries:
+            dictionary_id, data = self.index.dictionary_for(site)
+            if dictionary_id is None and body:
+                dictionary_id, data = self.index.add_dictionary(site, body[-DICTIONARY_SIZE:])
+            if dictionary_id is not None:
+                self.dictionaries[site] = (dictionary_id, data)
+        return self.dictionaries.get(site, (None, None))
+
+    def append(self, url, status, headers, body, spider, callback, fetched_at=None):
+        fetched_at = fetched_at or datetime.now(timezone.utc)
+        site, target = site_for(url), target_url(url)
+        dictionary_id, data = self._dictionary(site, body)
+        compressor = zlib.compressobj(6, zdict=data) if data else zlib.compressobj(6)
+        block = compressor.compress(_http_block(status, headers, body)) + compressor.flush()
+
+        stamp = fetched_at.strftime("%Y-%m-%dT%H:%M:%SZ")
+        header = "\r\n".join([
+            "WARC/1.1",
+            "WARC-Type: response",
+            f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+            f"WARC-Date: {stamp}",
+            f"WARC-Target-URI: {target}",
+            f"X-Request-URI: {url}",
+            f"X-Site: {site}",
+            f"X-Spider: {spider}",
+            f"X-Callback: {callback}",
+            f"X-Dictionary: {dictionary_id or ''}",
+            "Content-Encoding: deflate",
+            f"Content-Length: {len(block)}",
+        ]).encode() + b"\r\n\r\n"
+        segment = self._open_segment(fetched_at.strftime("%Y%m%d"))
+        os.write(self.fd, header + block + b"\r\n\r\n")
+        end = os.lseek(self.fd, 0, os.SEEK_CUR)
+        self.index.add({
+            "site": site, "target": target, "fetched_at": fetched_at.isoformat(), "url": url, "status": status,
+            "spider": spider, "callback": callback, "segment": segment,
+            "offset": end - len(block) - 4, "length": len(block), "dictionary": dictionary_id, "size": len(body),
+        })
+        return len(block)
+
+    def read(self, record):
+        """(status, headers, body) of an index row."""
+        with open(os.path.join(self.directory, record["segment"]), "rb") as f:
+            f.seek(record["offset"])
+            block = f.read(record["length"])
+        data = self.index.dictionary(record["dictionary"]) if record["dictionary"] else None
+        decompressor = zlib.decompressobj(zdict=data) if data else zlib.decompressobj()
+        return _parse_http_block(decompressor.decompress(block) + decompressor.flush())
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        self.index.close()
+
+
+class RawPageArchive:
+    def __init__(self, archive, stats):
+        self.archive = archive
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("ARCHIVE_ENABLED"):
+            raise NotConfigured
+        o = cls(PageArchive(data_dir(crawler.settings.get("ARCHIVE_DIR"), "archive")), crawler.stats)
+        crawler.signals.connect(o.response_received, signal=signals.response_received)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def response_received(self, response, request, spider):
+        if FREE_RESPONSE_FLAGS.intersection(response.flags):
+            return
+        stored = self.archive.append(
+            request.url, response.status, response.headers, response.body, spider.name,
+            getattr(request.callback, "__name__", None) or "parse",
+        )
+        self.stats.inc_value("archive/records")
+        self.stats.inc_value("archive/bytes_raw", len(response.body))
+        self.stats.inc_value("archive/bytes_stored", stored)
+
+    def spider_closed(self, spider):
+        self.archive.close()
@@ -0,0 +1,158 @@
+"""Persistent per-card extraction cache: re-crawls only extract the cards that changed.
+
+Most cards on a board's results page come back byte for byte on the next
+day's crawl. With CARD_CACHE_ENABLED, ``SiteSpec.extract_tree`` looks every
+card up by a 64-bit BLAKE2b hash of its HTML and of the spec that reads it
+(so editing a spec starts afresh). Only the cards not found are run through
+the field cascade; the others get the record stored the first time, as
+``(record, skip_reason)`` exactly like ``extract_card`` returns it. Fields
+that default to ``@today`` are stored as the placeholder and dated when read.
+
+The cache is a SQLite table of at most CARD_CACHE_SIZE cards. Each lookup
+marks the cards it touched as used; once the table is over its size, the
+least recently used cards are evicted. Writes are batched (every
+FLUSH_PAGES pages and at spider close). Counts go to ``cardcache/hits``,
+``cardcache/misses`` and ``cardcache/evicted``.
+
+Pages parsed in the process pool (PARSE_OFFLOAD_ENABLED) are extracted there
+without the cache.
+"""
+import hashlib
+import json
+import sqlite3
+import sys
+from datetime import date
+
+from lxml import etree
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from indeed_scraper.sitespec import TODAY
+from indeed_scraper.utils.storage import data_file
+
+FLUSH_PAGES = 20
+
+
+class CardCache:
+    def __init__(self, path, capacity=200000, stats=None):
+        self.capacity = capacity
+        self.stats = stats
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS cards (
+                key INTEGER PRIMARY KEY,
+                value TEXT NOT NULL,
+                used INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS cards_used ON cards (used);
+            """
+        )
+        used, self.size = self.db.execute("SELECT MAX(used), COUNT(*) FROM cards").fetchone()
+        self.tick = (used or 0) + 1
+        self.pending = {}  # key -> value, not written yet
+        self.touched = set()
+        self.pages = 0
+
+    @staticmethod
+    def key(spec, card):
+        digest = hashlib.blake2b(spec.fingerprint, digest_size=8)
+        digest.update(etree.tostring(card, with_tail=False))
+        return int.from_bytes(digest.digest(), "big", signed=True)
+
+    def extract(self, spec, cards):
+        """``spec.extract_card(card)`` for each card, taken from the cache where the card is known."""
+        keys = [self.key(spec, card) for card in cards]
+        found = self._get(keys)
+        today = date.today().isoformat()
+        results = []
+        for key, card in zip(keys, cards):
+            value = found.get(key)
+            if value is None:
+                value = found[key] = self.pending[key] = json.dumps(spec.extract_card(card, today=TODAY))
+                self._count("misses")
+            else:
+                self.touched.add(key)
+                self._count("hits")
+            # decoded afresh every time: callers may change the records they get
+            record, reason = json.loads(value)
+            if record is not None:
+                for name in spec.dated:
+                    if record.get(name) == TODAY:
+                        record[name] = today
+            results.append((record, reason))
+        self.pages += 1
+        if self.pages % FLUSH_PAGES == 0:
+            self.flush()
+        return results
+
+    def _get(self, keys):
+        found = {key: self.pending[key] for key in keys if key in self.pending}
+        wanted = [key for key in set(keys) if key not in found]
+        if wanted:
+            sql = f"SELECT key, value FROM cards WHERE key IN ({', '.join('?' * len(wanted))})"
+            found.update(self.db.execute(sql, wanted))
+        return found
+
+    def flush(self):
+        """Write new cards and usage marks, then evict down to the capacity, in one transaction."""
+        self.db.executemany("UPDATE cards SET used = ? WHERE key = ?", ((self.tick, key) for key in self.touched))
+        cursor = self.db.executemany(
+            "INSERT OR IGNORE INTO cards (key, value, used) VALUES (?, ?, ?)",
+            ((key, value, self.tick) for key, value in self.pending.items()),
+        )
+        self.size += max(cursor.rowcount, 0)
+        if self.size > self.capacity:
+            evicted = self.db.execute(
+                "DELETE FROM cards WHERE key IN (SELECT key FROM cards ORDER BY used LIMIT ?)",
+                (self.size - self.capacity,),
+            ).rowcount
+            self.size -= evicted
+            self._count("evicted", evicted)
+        self.db.commit()
+        self.pending = {}
+        self.touched = set()
+        self.tick += 1
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def _count(self, name, count=1):
+        if self.stats is not None:
+            self.stats.inc_value(f"cardcache/{name}", count)
+
+
+class CardExtractionCache:
+    """Give the spider's ``SPEC`` a CardCache for the crawl (CARD_CACHE_ENABLED)."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.spec = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("CARD_CACHE_ENABLED"):
+            raise NotConfigured
+        cache = CardCache(
+            data_file(settings.get("CARD_CACHE_PATH"), "cards.sqlite"),
+            settings.getint("CARD_CACHE_SIZE"),
+            crawler.stats,
+        )
+        o = cls(cache)
+        crawler.signals.connect(o.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def spider_opened(self, spider):
+        self.spec = getattr(sys.modules.get(type(spider).__module__), "SPEC", None)
+        if self.spec is not None:
+            self.spec.card_cache = self.cache
+
+    def spider_closed(self, spider):
+        if self.spec is not None and self.spec.card_cache is self.cache:
+            self.spec.card_cache = None
+        self.cache.close()
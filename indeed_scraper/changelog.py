@@ -0,0 +1,187 @@
+"""Per-run delta of a spider's postings, for consumers that only want what changed.
+
+``ChangeLog`` remembers, per spider and search (``-a search_query`` /
+``search_location``, see ``search_key``), every posting key (its URL) with
+a hash of its normalized title, salary and location, the run it was last
+seen in and how many runs in a row have missed it. At the end of each run it
+appends the run's changes to ``<CHANGELOG_DIR>/<spider>[.<search>].changes.jsonl``::
+
+    {"run": 12, "time": "...", "op": "new", "key": "https://...", "hash": "...", "title": ..., "salary": ..., "location": ...}
+    {"run": 12, "time": "...", "op": "updated", "key": ..., "hash": ..., "changed": ["salary"], ...}
+    {"run": 12, "time": "...", "op": "expired", "key": ..., "last_run": 9}
+
+A posting is expired once CHANGELOG_EXPIRE_RUNS completed runs in a row did
+not see it (finished, or stopped at a CLOSESPIDER_* cap such as the page
+limit). Runs that errored or were shut down, or found nothing at all, expire
+nothing: a blocked crawl is not evidence that the postings are gone. Nor do
+``scrapy recrawl`` runs, which only fetch the newest pages of a search.
+
+The workers of one ``scrapy workers`` crawl (SHARED_RUN_ID) each see only
+their share of the postings. They write into one run, and only the last of
+the SHARED_WORKERS to close expires anything, once all of them have
+completed.
+
+The file is only ever appended to. A consumer keeps the last ``run`` it
+processed and reads on from there.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime, timezone
+
+from indeed_scraper.utils.normalize import normalize_text
+from indeed_scraper.utils.runs import completed
+
+TRACKED_FIELDS = ("title", "salary", "location")
+
+
+def tracked_values(job):
+    salary = job.get("salary") or job.get("salary_range") or ""
+    return {"title": job.get("title") or "", "salary": salary, "location": job.get("location") or ""}
+
+
+def search_key(spider):
+    """The spider's name, plus the search it was given with ``-a`` (if any), as a file name."""
+    search = " ".join(str(getattr(spider, name)) for name in ("search_query", "search_location") if getattr(spider, name, None))
+    slug = re.sub(r"[^a-z0-9]+", "-", search.lower()).strip("-")
+    return f"{spider.name}.{slug}" if slug else spider.name
+
+
+def content_hash(values):
+    normalized = "\x1f".join(normalize_text(values[field]) for field in TRACKED_FIELDS)
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ChangeLog:
+    def __init__(self, state_path, changes_path, expire_runs=3, crawl=None, workers=None, partial=False):
+        self.changes_path = changes_path
+        self.expire_runs = expire_runs
+        self.partial = partial  # the run only covers part of the search, never expire
+        self.crawl = crawl  # SHARED_RUN_ID: workers of one crawl share a run
+        self.workers = workers
+        self.db = sqlite3.connect(state_path, timeout=60, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS postings (
+                key TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                title TEXT, salary TEXT, location TEXT,
+                first_run INTEGER NOT NULL,
+                last_run INTEGER NOT NULL,
+                missed INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS runs (run INTEGER PRIMARY KEY, started_at TEXT NOT NULL, reason TEXT);
+            CREATE TABLE IF NOT EXISTS run_workers (run INTEGER NOT NULL, worker TEXT NOT NULL, reason TEXT, PRIMARY KEY (run, worker));
+            """
+        )
+        if "crawl" not in {row[1] for row in self.db.execute("PRAGMA table_info(runs)")}:
+            self.db.execute("ALTER TABLE runs ADD COLUMN crawl TEXT")
+            self.db.execute("CREATE UNIQUE INDEX runs_crawl ON runs (crawl)")
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.run = None
+        self.changes = []
+        self.seen = {}  # key -> tracked values, written at close
+
+    def add(self, job):
+        """Note one scraped posting; False if it has no key or was seen before in this run."""
+        key = job.get("url")
+        if not key or key in self.seen:
+            return False
+        self.seen[key] = tracked_values(job)
+        return True
+
+    def _compare(self, key, values):
+        digest = content_hash(values)
+        row = self.db.execute("SELECT * FROM postings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            op, changed = "new", None
+            self.db.execute(
+                "INSERT INTO postings (key, hash, title, salary, location, first_run, last_run) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, digest, values["title"], values["salary"], values["location"], self.run, self.run),
+            )
+        else:
+            self.db.execute("UPDATE postings SET last_run = ?, missed = 0 WHERE key = ?", (self.run, key))
+            if row["hash"] == digest:
+                return
+            op = "updated"
+            changed = [f for f in TRACKED_FIELDS if normalize_text(row[f]) != normalize_text(values[f])]
+            self.db.execute(
+                "UPDATE postings SET hash = ?, title = ?, salary = ?, location = ? WHERE key = ?",
+                (digest, values["title"], values["salary"], values["location"], key),
+            )
+        change = {"op": op, "key": key, "hash": digest, **values}
+        if changed is not None:
+            change["changed"] = changed
+        self.changes.append(change)
+
+    def expire(self):
+        """Count a miss for every posting this run did not see; returns the ones that expired."""
+        self.db.execute("UPDATE postings SET missed = missed + 1 WHERE last_run < ?", (self.run,))
+        expired = self.db.execute(
+            "SELECT key, last_run FROM postings WHERE missed >= ? ORDER BY key", (self.expire_runs,)
+        ).fetchall()
+        self.db.execute("DELETE FROM postings WHERE missed >= ?", (self.expire_runs,))
+        for row in expired:
+            self.changes.append({"op": "expired", "key": row["key"], "last_run": row["last_run"]})
+        return expired
+
+    def _open_run(self):
+        if self.crawl is not None:
+            self.db.execute("INSERT OR IGNORE INTO runs (started_at, crawl) VALUES (?, ?)", (self.started_at, self.crawl))
+            return self.db.execute("SELECT run FROM runs WHERE crawl = ?", (self.crawl,)).fetchone()[0]
+        return self.db.execute("INSERT INTO runs (started_at) VALUES (?)", (self.started_at,)).lastrowid
+
+    def _should_expire(self, reason, worker):
+        if self.partial:
+            return False
+        if self.crawl is None:
+            return completed(reason) and bool(self.seen)
+        # one worker's share proves nothing; the last worker of the crawl decides for all
+        self.db.execute("INSERT OR REPLACE INTO run_workers VALUES (?, ?, ?)", (self.run, str(worker), reason))
+        reasons = [row[0] for row in self.db.execute("SELECT reason FROM run_workers WHERE run = ?", (self.run,))]
+        if not self.workers or len(reasons) < self.workers or not all(completed(r) for r in reasons):
+            return False
+        return self.db.execute("SELECT 1 FROM postings WHERE last_run = ? LIMIT 1", (self.run,)).fetchone() is not None
+
+    def close(self, reason, worker=None):
+        """Finish the run: record its postings, expire (if it completed with results), append its changes.
+
+        Everything is written in one transaction, so workers sharing the state
+        file take turns. Returns ``{"new": n, "updated": n, "expired": n}``.
+        """
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            self.run = self._open_run()
+            for key, values in self.seen.items():
+                self._compare(key, values)
+            expired = self.expire() if self._should_expire(reason, worker) else []
+            if self.changes:
+                stamp = datetime.now(timezone.utc).isoformat()
+                lines = "".join(
+                    json.dumps({"run": self.run, "time": stamp, **change}, ensure_ascii=False) + "\n"
+                    for change in self.changes
+                )
+                # the whole run is appended at once, at its end
+                fd = os.open(self.changes_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    data = lines.encode("utf-8")
+                    while data:
+                        data = data[os.write(fd, data):]
+                finally:
+                    os.close(fd)
+            self.db.execute("UPDATE runs SET reason = ? WHERE run = ?", (reason, self.run))
+            self.db.execute("COMMIT")
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        finally:
+            self.db.close()
+        counts = {"new": 0, "updated": 0, "expired": len(expired)}
+        for change in self.changes:
+            if change["op"] in ("new", "updated"):
+                counts[change["op"]] += 1
+        return counts
@@ -0,0 +1,433 @@
+"""Crash-safe checkpoints: a killed crawl resumes where it stopped without re-buying pages.
+
+With CHECKPOINT_ENABLED, every run keeps ``<CHECKPOINT_DIR>/<spider>.sqlite`` up to date
+(``<spider>.<worker>.sqlite`` for the workers of ``scrapy workers``):
+
+- the frontier: each scheduled request (serialized), pending until its callback
+  has finished with the response
+- every paid response, from the moment it arrives until that callback is done
+- a write-ahead log of emitted items: handed to the feeds once the pipelines are
+  done with them, stored once they are on disk. Local feed files are flushed
+  after each item, which stores it right away; other feeds store everything
+  when they close
+- the spider's counters and seen-sets (CHECKPOINT_SPIDER_STATE), saved after
+  each callback
+
+The next run of a spider that left a checkpoint behind restores the counters,
+re-emits the items that were not known to be stored, and reissues the pending requests instead of
+its start requests. Items are told apart by their ``url`` (their whole
+content when they have none), so a posting dated ``@today`` is not emitted
+twice when the resumed run is on the next day. A CSV feed the run appends to
+gets no second header row. Responses that had already arrived are served from the
+checkpoint, so no paid request is repeated. Requests that failed are
+retried. A run that closes normally deletes its checkpoint. A run stopped by
+a signal ("shutdown") keeps it.
+"""
+import base64
+import json
+import os
+import pickle
+import sqlite3
+import weakref
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.extensions.feedexport import FeedExporter, FileFeedStorage
+from scrapy.http import Headers
+from scrapy.utils.misc import load_object
+from scrapy.utils.request import request_from_dict
+from itemadapter import ItemAdapter, is_item
+
+from indeed_scraper.seenset import FingerprintSet, ScalableBloomFilter
+from indeed_scraper.utils.storage import data_dir
+
+COMPACT_SETS = (FingerprintSet, ScalableBloomFilter)
+
+_checkpoints = weakref.WeakKeyDictionary()
+
+
+def item_key(item):
+    """What identifies an item across runs: its URL, else its whole content."""
+    adapter = ItemAdapter(item)
+    return adapter.get("url") or json.dumps(adapter.asdict(), sort_keys=True, default=str)
+
+
+def checkpoint_for(crawler):
+    """The crawler's Checkpoint, or None when checkpointing is off."""
+    if not crawler.settings.getbool("CHECKPOINT_ENABLED"):
+        return None
+    if crawler not in _checkpoints:
+        _checkpoints[crawler] = Checkpoint.from_crawler(crawler)
+    return _checkpoints[crawler]
+
+
+class CheckpointStore:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS requests (fp TEXT PRIMARY KEY, payload BLOB NOT NULL, done INTEGER NOT NULL DEFAULT 0);
+            CREATE TABLE IF NOT EXISTS responses (fp TEXT PRIMARY KEY, data BLOB NOT NULL);
+            -- exported: 0 logged, 1 handed to the feeds (maybe still in their buffers), 2 stored
+            CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, fp TEXT NOT NULL, data TEXT NOT NULL, exported INTEGER NOT NULL DEFAULT 0, key TEXT);
+            CREATE INDEX IF NOT EXISTS items_fp ON items (fp);
+            CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+        if "key" not in {row[1] for row in self.conn.execute("PRAGMA table_info(items)")}:
+            self.conn.execute("ALTER TABLE items ADD COLUMN key TEXT")  # checkpoint left by an older version
+
+    def is_empty(self):
+        return self.conn.execute("SELECT NOT EXISTS (SELECT 1 FROM requests)").fetchone()[0] == 1
+
+    def add_request(self, fp, payload):
+        """Record a scheduled request; False if one with this fingerprint was recorded before."""
+        cursor = self.conn.execute("INSERT OR IGNORE INTO requests (fp, payload) VALUES (?, ?)", (fp, payload))
+        return cursor.rowcount == 1
+
+    def known_request(self, fp):
+        return self.conn.execute("SELECT 1 FROM requests WHERE fp = ?", (fp,)).fetchone() is not None
+
+    def pending_requests(self):
+        return [row[0] for row in self.conn.execute("SELECT payload FROM requests WHERE done = 0 ORDER BY rowid")]
+
+    def finish_request(self, fp):
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute("UPDATE requests SET done = 1 WHERE fp = ?", (fp,))
+            self.conn.execute("DELETE FROM responses WHERE fp = ?", (fp,))
+
+    def save_response(self, fp, data):
+        self.conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?)", (fp, data))
+
+    def load_response(self, fp):
+        row = self.conn.execute("SELECT data FROM responses WHERE fp = ?", (fp,)).fetchone()
+        return row[0] if row else None
+
+    def log_item(self, fp, key, data):
+        return self.conn.execute("INSERT INTO items (fp, key, data) VALUES (?, ?, ?)", (fp, key, data)).lastrowid
+
+    def item_exported(self, fp, key):
+        row = self.conn.execute("SELECT 1 FROM items WHERE fp = ? AND key = ? AND exported = 2", (fp, key)).fetchone()
+        return row is not None
+
+    def confirm_item(self, item_id, exported=1):
+        self.conn.execute("UPDATE items SET exported = ? WHERE id = ?", (exported, item_id))
+
+    def items_stored(self):
+        """Everything handed to the feeds so far is on disk now."""
+        self.conn.execute("UPDATE items SET exported = 2 WHERE exported = 1")
+
+    def unconfirmed_items(self):
+        """Unstored items of finished requests; a pending request's callback will yield its own again."""
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "DELETE FROM items WHERE exported < 2 AND fp IN (SELECT fp FROM requests WHERE done = 0)"
+            )
+        return list(self.conn.execute("SELECT id, data FROM items WHERE exported < 2 ORDER BY id"))
+
+    def save_state(self, state):
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("INSERT OR REPLACE INTO state VALUES (?, ?)", state.items())
+
+    def load_state(self):
+        return dict(self.conn.execute("SELECT name, value FROM state"))
+
+    def close(self):
+        self.conn.close()
+
+
+def _dump_value(value):
+    if isinstance(value, (set, frozenset)):
+        return json.dumps({"set": sorted(value)})
+    if isinstance(value, COMPACT_SETS):
+        return json.dumps({"compact": type(value).__name__, "data": base64.b64encode(value.to_bytes()).decode("ascii")})
+    return json.dumps({"value": value})
+
+
+def _load_value(text):
+    data = json.loads(text)
+    if "compact" in data:
+        cls = next(cls for cls in COMPACT_SETS if cls.__name__ == data["compact"])
+        return cls.from_bytes(base64.b64decode(data["data"]))
+    return set(data["set"]) if "set" in data else data["value"]
+
+
+def _appends_to_csv(slot):
+    storage = slot.storage
+    return (
+        slot.feed_options["format"] == "csv"
+        and isinstance(storage, FileFeedStorage)
+        and storage.write_mode == "ab"
+        and os.path.exists(storage.path)
+        and os.path.getsize(storage.path) > 0
+    )
+
+
+class Checkpoint:
+    def __init__(self, crawler, directory, state_attributes, worker=None):
+        self.crawler = crawler
+        self.fingerprinter = crawler.request_fingerprinter
+        self.directory = directory
+        self.state_attributes = state_attributes
+        self.worker = worker
+        self.store = None
+        self.resuming = False
+        self.item_ids = {}
+        self.added = weakref.WeakSet()  # requests whose scheduling recorded them
+        self.feeds = None  # the running FeedExporter: close after it has
+        self.close_reason = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        o = cls(
+            crawler,
+            data_dir(settings.get("CHECKPOINT_DIR"), "checkpoints"),
+            settings.getlist("CHECKPOINT_SPIDER_STATE"),
+            settings.get("SHARED_WORKER"),
+        )
+        crawler.signals.connect(o.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(o.request_scheduled, signal=signals.request_scheduled)
+        crawler.signals.connect(o.request_dropped, signal=signals.request_dropped)
+        crawler.signals.connect(o.item_done, signal=signals.item_scraped)
+        crawler.signals.connect(o.item_dropped, signal=signals.item_dropped)
+        crawler.signals.connect(o.feeds_closed, signal=signals.feed_exporter_closed)
+        return o
+
+    def fingerprint(self, request):
+        return self.fingerprinter.fingerprint(request).hex()
+
+    def open(self, spider):
+        if self.store is None:
+            # workers of one `scrapy workers` run each keep their own
+            name = f"{spider.name}.{self.worker}" if self.worker else spider.name
+            self.store = CheckpointStore(os.path.join(self.directory, f"{name}.sqlite"))
+            self.resuming = not self.store.is_empty()
+
+    def spider_opened(self, spider):
+        self.open(spider)
+        self.feeds = next((ext for ext in self.crawler.extensions.middlewares if isinstance(ext, FeedExporter)), None)
+        if self.resuming:
+            spider.logger.info(f"♻️ Resuming from checkpoint {self.store.path}")
+            # FeedExporter opened its slots on spider_opened already, before any export
+            for slot in self.feeds.slots if self.feeds is not None else ():
+                if _appends_to_csv(slot):
+                    kwargs = {**slot.feed_options["item_export_kwargs"], "include_headers_line": False}
+                    slot.feed_options = {**slot.feed_options, "item_export_kwargs": kwargs}
+
+    def spider_closed(self, spider, reason):
+        if self.store is None:
+            return
+        self.save_state(spider)
+        self.close_reason = reason
+        if self.feeds is None:
+            self.close()
+
+    def feeds_closed(self):
+        # the feed exporter closes its files after spider_closed; only now are the items on disk
+        if self.store is None:
+            return
+        self.store.items_stored()
+        self.feeds = None
+        if self.close_reason is not None:
+            self.close()
+
+    def close(self):
+        path = self.store.path
+        self.store.close()
+        self.store = None
+        if self.close_reason != "shutdown":
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    # --- frontier ---
+
+    def start_outputs(self, spider, start_outputs):
+        """What the crawl starts with: the spider's own start outputs, or on resume the checkpoint."""
+        self.open(spider)
+        if not self.resuming:
+            yield from start_outputs
+            return
+        # the start requests already ran make_api_request; restore the counters after them
+        self.restore_state(spider)
+        for item_id, data in self.store.unconfirmed_items():
+            item = json.loads(data)
+            self.item_ids[id(item)] = item_id
+            yield item
+        for payload in self.store.pending_requests():
+            yield request_from_dict(pickle.loads(payload), spider=spider)
+        for output in start_outputs:
+            # start requests a previous run already made are covered by the frontier above
+            if is_item(output) or not self.store.known_request(self.fingerprint(output)):
+                yield output
+
+    def request_scheduled(self, request, spider):
+        self.open(spider)
+        payload = pickle.dumps(request.to_dict(spider=spider), protocol=4)
+        if self.store.add_request(self.fingerprint(request), payload):
+            self.added.add(request)
+
+    def request_dropped(self, request, spider):
+        # a duplicate the dupe filter dropped shares its fingerprint with the request
+        # that is still pending; only a request recorded by its own scheduling is done
+        if request in self.added:
+            self.store.finish_request(self.fingerprint(request))
+
+    def request_done(self, request, spider):
+        self.store.finish_request(self.fingerprint(request))
+        self.save_state(spider)
+
+    # --- responses ---
+
+    def save_response(self, request, response):
+        data = {
+            "cls": f"{type(response).__module__}.{type(response).__name__}",
+            "url": response.url,
+            "status": response.status,
+            "headers": {k: v for k, v in response.headers.items()},
+            "body": response.body,
+            "flags": response.flags,
+        }
+        self.store.save_response(self.fingerprint(request), pickle.dumps(data, protocol=4))
+
+    def load_response(self, request):
+        payload = self.store.load_response(self.fingerprint(request))
+        if payload is None:
+            return None
+        data = pickle.loads(payload)
+        return load_object(data["cls"])(
+            url=data["url"],
+            status=data["status"],
+            headers=Headers(data["headers"]),
+            body=data["body"],
+            # "cached" keeps MetricsExporter from counting credits for it again
+            flags=data["flags"] + ["cached", "checkpoint"],
+            request=request,
+        )
+
+    # --- items ---
+
+    def log_item(self, request, item):
+        """Write ``item`` to the log; False if a previous run already exported it for this request."""
+        fp = self.fingerprint(request)
+        key = item_key(item)
+        if self.resuming and self.store.item_exported(fp, key):
+            self.crawler.stats.inc_value("checkpoint/skipped_items")
+            return False
+        self.item_ids[id(item)] = self.store.log_item(fp, key, json.dumps(ItemAdapter(item).asdict(), default=str))
+        return True
+
+    def item_done(self, item, spider):
+        item_id = self.item_ids.pop(id(item), None)
+        if item_id is not None:
+            self.store.confirm_item(item_id, exported=2 if self.flush_feeds() else 1)
+
+    def flush_feeds(self):
+        """Push what the feeds have written to disk; True if that stores it (local, plain files)."""
+        # FeedExporter connected to item_scraped before us: the item is in its files already
+        if self.feeds is None:
+            return True
+        stored = True
+        for slot in self.feeds.slots:
+            if not isinstance(slot.storage, FileFeedStorage) or slot.feed_options.get("postprocessing"):
+                stored = False
+            elif slot.file is not None:
+                slot.file.flush()
+        return stored
+
+    def item_dropped(self, item, spider):
+        item_id = self.item_ids.pop(id(item), None)
+        if item_id is not None:
+            self.store.confirm_item(item_id, exported=2)  # nothing to store
+
+    # --- spider state ---
+
+    def save_state(self, spider):
+        state = {}
+        for name in self.state_attributes:
+            value = getattr(spider, name, None)
+            if isinstance(value, (set, frozenset, int, float, str) + COMPACT_SETS):
+                state[name] = _dump_value(value)
+        if state:
+            self.store.save_state(state)
+
+    def restore_state(self, spider):
+        for name, text in self.store.load_state().items():
+            setattr(spider, name, _load_value(text))
+
+
+class CheckpointMiddleware:
+    # Spider middleware: swaps in the checkpoint's frontier at start, logs items to
+    # the write-ahead log and marks a request done once its callback has finished.
+    # Keep it at a low order so it sees the final output of every other middleware.
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        checkpoint = checkpoint_for(crawler)
+        if checkpoint is None:
+            raise NotConfigured
+        return cls(checkpoint)
+
+    def __init__(self, checkpoint):
+        self.checkpoint = checkpoint
+
+    async def process_start(self, start):
+        outputs = [output async for output in start]
+        spider = self.checkpoint.crawler.spider
+        for output in self.checkpoint.start_outputs(spider, outputs):
+            yield output
+
+    def process_start_requests(self, start_requests, spider):
+        yield from self.checkpoint.start_outputs(spider, list(start_requests))
+
+    def process_spider_output(self, response, result, spider):
+        for output in result:
+            if is_item(output) and not self.checkpoint.log_item(response.request, output):
+                continue
+            yield output
+        self.checkpoint.request_done(response.request, spider)
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for output in result:
+            if is_item(output) and not self.checkpoint.log_item(response.request, output):
+                continue
+            yield output
+        self.checkpoint.request_done(response.request, spider)
+
+
+class CheckpointReplayMiddleware:
+    # Downloader middleware: keeps every response until its callback is done and,
+    # on resume, answers already-paid requests from the checkpoint. It sits ahead
+    # of SharedBudgetMiddleware so replays never reserve credits.
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        checkpoint = checkpoint_for(crawler)
+        if checkpoint is None:
+            raise NotConfigured
+        return cls(checkpoint, crawler.stats)
+
+    def __init__(self, checkpoint, stats):
+        self.checkpoint = checkpoint
+        self.stats = stats
+
+    def process_request(self, request, spider):
+        if not self.checkpoint.resuming:
+            return None
+        response = self.checkpoint.load_response(request)
+        if response is not None:
+            self.stats.inc_value("checkpoint/replayed_responses")
+        return response
+
+    def process_response(self, request, response, spider):
+        if "checkpoint" not in response.flags:
+            self.checkpoint.save_response(request, response)
+        return response
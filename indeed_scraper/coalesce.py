@@ -0,0 +1,139 @@
+"""One download per target page, however many requests ask for it.
+
+``TargetRequestFingerprinter`` (REQUEST_FINGERPRINTER_CLASS) fingerprints a
+provider request by its canonical target URL rather than the API URL, so the
+dupe filter, HTTP cache, shared scheduler and checkpoints all treat two
+queries or two providers fetching the same page as one request.
+
+``CoalescingMiddleware`` merges identical requests of a crawler that
+overlap in time. The first request downloads; the others wait and get a
+copy of its final response (after render escalation), flagged
+``coalesced``. For COALESCE_TTL seconds afterwards the response is still
+handed to late arrivals. Only 2xx responses with the listings their site's
+spec expects are shared: after an error or a blocked page the waiters
+download for themselves, and nothing is kept. Requests with
+``meta["dont_coalesce"]`` always download, e.g. the rendered re-fetch of a
+page that was first fetched without rendering.
+"""
+from collections import OrderedDict
+from time import monotonic
+
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.defer import maybe_deferred_to_future
+from scrapy.utils.request import fingerprint
+from twisted.internet.defer import Deferred
+
+from indeed_scraper.providers import site_for, target_url
+from indeed_scraper.render import has_listings
+from indeed_scraper.sitespec import spec_for_site
+
+
+def shareable(response):
+    """True for a 2xx response that is not a blocked page: one worth handing to other requests."""
+    if not 200 <= response.status < 300:
+        return False
+    return spec_for_site(site_for(response.url)) is None or has_listings(response)
+
+
+class TargetRequestFingerprinter:
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls()
+
+    def fingerprint(self, request):
+        target = target_url(request.url)
+        if target != request.url:
+            request = request.replace(url=target)
+        return fingerprint(request)
+
+
+class _Flight:
+    __slots__ = ("request", "waiters")
+
+    def __init__(self, request):
+        self.request = request
+        self.waiters = []
+
+
+class CoalescingMiddleware:
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("COALESCE_ENABLED"):
+            raise NotConfigured
+        settings = crawler.settings
+        return cls(
+            crawler.request_fingerprinter,
+            settings.getfloat("COALESCE_TTL"),
+            settings.getfloat("DOWNLOAD_TIMEOUT"),
+            crawler.stats,
+        )
+
+    def __init__(self, fingerprinter, ttl, timeout, stats):
+        self.fingerprinter = fingerprinter
+        self.ttl = ttl
+        self.timeout = timeout
+        self.stats = stats
+        self.inflight = {}
+        self.recent = OrderedDict()
+
+    def _prune(self, now):
+        while self.recent:
+            fp, (stored_at, _) = next(iter(self.recent.items()))
+            if now - stored_at < self.ttl:
+                break
+            del self.recent[fp]
+
+    def _share(self, response, request):
+        return response.replace(url=request.url, request=request, flags=response.flags + ["coalesced"])
+
+    async def process_request(self, request, spider):
+        if request.method != "GET" or request.meta.get("dont_coalesce"):
+            return None
+        fp = self.fingerprinter.fingerprint(request)
+        self._prune(monotonic())
+        if fp in self.recent:
+            self.stats.inc_value("coalesce/recent")
+            return self._share(self.recent[fp][1], request)
+
+        flight = self.inflight.get(fp)
+        if flight is None:
+            self.inflight[fp] = _Flight(request)
+            return None
+
+        from twisted.internet import reactor
+
+        waiter = Deferred()
+        # if the leader never lands (a middleware swapped its response for a new
+        # request), stop waiting after DOWNLOAD_TIMEOUT and download ourselves
+        waiter.addTimeout(self.timeout, reactor, onTimeoutCancel=lambda result, timeout: None)
+        flight.waiters.append(waiter)
+        response = await maybe_deferred_to_future(waiter)
+        if response is None:
+            # the leading request failed or got nothing worth sharing; download this one ourselves
+            return None
+        self.stats.inc_value("coalesce/merged")
+        return self._share(response, request)
+
+    def _land(self, request, response):
+        fp = self.fingerprinter.fingerprint(request)
+        flight = self.inflight.get(fp)
+        if flight is None or flight.request is not request:
+            return
+        del self.inflight[fp]
+        if response is not None and not shareable(response):
+            self.stats.inc_value("coalesce/unshared")
+            response = None
+        if response is not None and self.ttl > 0:
+            self.recent[fp] = (monotonic(), response)
+        for waiter in flight.waiters:
+            if not waiter.called:
+                waiter.callback(response)
+
+    def process_response(self, request, response, spider):
+        if "coalesced" not in response.flags:
+            self._land(request, response)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        self._land(request, None)
+        return None
@@ -0,0 +1,3 @@
+# Project-specific `scrapy <command>` entry points, registered through the
+# COMMANDS_MODULE setting. Each module here defines one Command class and the
+# command is named after the module.
@@ -0,0 +1,47 @@
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+from indeed_scraper.dedup import LSHIndex
+from indeed_scraper.utils.jobfiles import read_jobs, source_for
+from indeed_scraper.utils.storage import data_file
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    requires_crawler_process = False
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options] <jobs.csv> [<jobs.csv> ...]"
+
+    def short_desc(self):
+        return "Cluster near-duplicate jobs across the scraped CSVs"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--min-size", type=int, default=2, help="only print clusters with at least this many jobs")
+        parser.add_argument("--quiet", action="store_true", help="index only, don't print clusters")
+
+    def run(self, args, opts):
+        if not args:
+            raise UsageError()
+        path = data_file(self.settings.get("DEDUP_INDEX_PATH"), "dedup.sqlite")
+        index = LSHIndex(path, threshold=self.settings.getfloat("DEDUP_THRESHOLD"))
+        try:
+            for csv_path in args:
+                source = source_for(csv_path)
+                count = 0
+                for job in read_jobs(csv_path):
+                    if job.get("url"):
+                        index.add(job["url"], job.get("title"), job.get("company"), job.get("location"), source=source)
+                        count += 1
+                print(f"📥 Indexed {count} jobs from {csv_path}")
+
+            if opts.quiet:
+                return
+            for cluster_id, members in index.clusters(opts.min_size):
+                print(f"\n🔗 {cluster_id} ({len(members)} postings)")
+                for source, key in members:
+                    print(f"   [{source}] {key}")
+        finally:
+            index.close()
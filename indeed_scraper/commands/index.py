@@ -0,0 +1,49 @@
+from datetime import date
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+from indeed_scraper.jobindex import JobIndex
+from indeed_scraper.utils.jobfiles import read_jobs, source_for
+from indeed_scraper.utils.storage import data_file
+
+
+def parse_scraped_on(value):
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise UsageError(f"Invalid --scraped-on value: {value!r} (use e.g. 2025-10-01)")
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    requires_crawler_process = False
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options] <jobs.csv> [<jobs.csv> ...]"
+
+    def short_desc(self):
+        return "Add scraped CSVs to the local search index"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--scraped-on", metavar="YYYY-MM-DD",
+                            help="day the CSVs were scraped, to date relative posted values "
+                                 "(\"Today\", \"9d\"); without it they are left undated")
+
+    def run(self, args, opts):
+        if not args:
+            raise UsageError()
+        scraped_on = parse_scraped_on(opts.scraped_on)
+        index = JobIndex(data_file(self.settings.get("SEARCH_INDEX_PATH"), "jobs_index.sqlite"))
+        try:
+            for csv_path in args:
+                source = source_for(csv_path)
+                count = sum(1 for job in read_jobs(csv_path) if index.add(job, source=source, backfill=True, scraped_on=scraped_on))
+                index.commit()
+                print(f"📥 Indexed {count} jobs from {csv_path}")
+        finally:
+            index.close()
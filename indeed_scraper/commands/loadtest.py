@@ -0,0 +1,163 @@
+import os
+import tempfile
+from time import monotonic
+
+from scrapy import signals
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.utils.reactor import install_reactor
+
+from indeed_scraper.mockprovider import add_mock_options, listen, mock_from_options
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def load_spider(spidercls, requests):
+    """``spidercls`` cycling through synthetic queries until it has made ``requests`` API calls.
+
+    Its call cap becomes ``requests``, and single-call spiders parse every
+    results page instead of only the first.
+    """
+
+    def start_requests(self):
+        number = 0
+        while self.api_calls < requests and number < requests:
+            number += 1
+            self.search_query = f"load test {number}"
+            yield from spidercls.start_requests(self)
+
+    attributes = {
+        "start_requests": start_requests,
+        "max_api_calls": requests,
+        "single_call": False,
+        "__module__": spidercls.__module__,
+    }
+    return type(spidercls.__name__, (spidercls,), attributes)
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    requires_crawler_process = True
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options] <spider>"
+
+    def short_desc(self):
+        return "Run a spider flat out against an in-process mock provider and report throughput"
+
+    def long_desc(self):
+        return (
+            "Start the mock provider server (see `scrapy mockprovider`) and crawl it with <spider>,\n"
+            "cycling through synthetic queries until --requests API calls were made. Download\n"
+            "delays and page caps are lifted; the spider's max_api_calls becomes --requests.\n"
+            "Reports request and item throughput, status codes, latency percentiles, scheduler\n"
+            "counters and, with --budget, shared credit budget enforcement.\n\n"
+            "Example: scrapy loadtest weworkremotely --requests 2000 --concurrency 200 --error-rate 0.01"
+        )
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--requests", type=int, default=500, help="API calls to make (default: %(default)s)")
+        parser.add_argument("--concurrency", type=int, default=100, help="CONCURRENT_REQUESTS for the crawl (default: %(default)s)")
+        parser.add_argument("--budget", type=int, default=0,
+                            help="SHARED_CREDIT_BUDGET to enforce, 0 = none (uses a throwaway shared store unless SHARED_STORE_URL is set)")
+        parser.add_argument("--external", metavar="URL",
+                            help="use a mock server already running at URL (e.g. from `scrapy mockprovider`) instead of an in-process one")
+        add_mock_options(parser)
+
+    def process_options(self, args, opts):
+        super().process_options(args, opts)
+        if opts.requests < 1 or opts.concurrency < 1:
+            raise UsageError("--requests and --concurrency must be at least 1")
+        try:
+            self.mock = None if opts.external else mock_from_options(opts)
+        except ValueError as e:
+            raise UsageError(str(e))
+        overrides = {
+            "CONCURRENT_REQUESTS": opts.concurrency,
+            "CONCURRENT_REQUESTS_PER_DOMAIN": opts.concurrency,
+            "DOWNLOAD_DELAY": 0,
+            "CLOSESPIDER_PAGECOUNT": 0,
+            "AUTOTHROTTLE_ENABLED": False,
+            # keep the real metrics, checkpoints, render memory and exports out of it
+            "METRICS_ENABLED": False,
+            "CHECKPOINT_ENABLED": False,
+            "CHANGELOG_ENABLED": False,
+            "RENDER_MEMORY_PATH": os.path.join(tempfile.mkdtemp(prefix="loadtest-"), "render_memory.json"),
+            "FEEDS": {},
+            "FEED_URI": None,
+        }
+        if opts.budget:
+            overrides["SHARED_CREDIT_BUDGET"] = opts.budget
+            if not self.settings.get("SHARED_STORE_URL"):
+                path = os.path.join(os.path.dirname(overrides["RENDER_MEMORY_PATH"]), "frontier.sqlite")
+                overrides["SHARED_STORE_URL"] = f"sqlite://{path}"
+                overrides["SHARED_IDLE_TIMEOUT"] = 0
+        if opts.external:
+            overrides["MOCK_PROVIDER_URL"] = opts.external
+        self.settings.setdict(overrides, priority="cmdline")
+
+    def run(self, args, opts):
+        if len(args) != 1:
+            raise UsageError()
+        try:
+            spidercls = self.crawler_process.spider_loader.load(args[0])
+        except KeyError:
+            raise UsageError(f"Spider not found: {args[0]}")
+        if not hasattr(spidercls, "make_api_request"):
+            raise UsageError(f"{args[0]} fetches directly, there is no provider to mock")
+
+        crawler = self.crawler_process.create_crawler(load_spider(spidercls, opts.requests))
+        if self.mock is not None:
+            # the server shares the crawl's reactor, so that reactor has to be up first
+            install_reactor(self.settings["TWISTED_REACTOR"], self.settings["ASYNCIO_EVENT_LOOP"])
+            port = listen(self.mock)
+            crawler.settings.set("MOCK_PROVIDER_URL", f"http://127.0.0.1:{port.getHost().port}", priority="cmdline")
+
+        latencies, clock = [], {}
+        crawler.signals.connect(
+            lambda response, request, spider: latencies.append(request.meta.get("download_latency", 0.0)),
+            signal=signals.response_received, weak=False,
+        )
+        crawler.signals.connect(lambda spider: clock.setdefault("start", monotonic()), signal=signals.spider_opened, weak=False)
+        crawler.signals.connect(lambda spider: clock.setdefault("end", monotonic()), signal=signals.spider_closed, weak=False)
+
+        self.crawler_process.crawl(crawler)
+        self.crawler_process.start()
+        self.report(crawler, latencies, clock.get("end", 0) - clock.get("start", 0))
+
+    def report(self, crawler, latencies, elapsed):
+        stats = crawler.stats.get_stats()
+        requests = stats.get("downloader/request_count", 0)
+        items = stats.get("item_scraped_count", 0)
+        elapsed = max(elapsed, 1e-9)
+        print(f"🏁 {crawler.spidercls.name}: {requests} requests in {elapsed:.1f}s ({requests / elapsed:.1f} req/s),"
+              f" {items} items ({items / elapsed:.1f} items/s)")
+        statuses = sorted((k.rsplit("/", 1)[1], v) for k, v in stats.items() if k.startswith("downloader/response_status_count/"))
+        print("   statuses: " + (", ".join(f"{code}×{count}" for code, count in statuses) or "none"))
+        errors = {k.split("/", 2)[2]: v for k, v in stats.items() if k.startswith("downloader/exception_type_count/")}
+        if errors:
+            print(f"   errors: {errors}")
+        print(f"   latency: p50 {percentile(latencies, 0.5):.3f}s, p95 {percentile(latencies, 0.95):.3f}s,"
+              f" p99 {percentile(latencies, 0.99):.3f}s, max {max(latencies, default=0):.3f}s")
+        scheduler = {k: v for k, v in stats.items() if k.startswith(("scheduler/", "shared/", "dupefilter/", "coalesce/"))
+                     and "/budget/" not in k}
+        print(f"   scheduler: {scheduler or 'no activity'}")
+        dropped = {k.split("/", 2)[2]: v for k, v in stats.items() if k.startswith("cards/dropped/")}
+        if dropped:
+            print(f"   dropped cards: {dropped}")
+        if crawler.settings.getint("SHARED_CREDIT_BUDGET"):
+            budget = crawler.settings.getint("SHARED_CREDIT_BUDGET")
+            reserved = stats.get("shared/budget/credits", 0)
+            refused = stats.get("shared/budget/refused", 0)
+            verdict = "✅ held" if reserved <= budget else "❌ exceeded"
+            print(f"   budget: {reserved}/{budget} credits reserved, {refused} requests refused ({verdict})")
+        if self.mock is not None:
+            print(f"   mock server: {dict(self.mock.stats)}")
+        print(f"   finish reason: {stats.get('finish_reason')}")
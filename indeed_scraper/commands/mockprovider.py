@@ -0,0 +1,45 @@
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.utils.reactor import install_reactor
+
+from indeed_scraper.mockprovider import add_mock_options, listen, mock_from_options
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    requires_crawler_process = False
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options]"
+
+    def short_desc(self):
+        return "Serve fixture pages through mock ScraperAPI, ZenRows and ScrapingBee endpoints"
+
+    def long_desc(self):
+        return (
+            "Run a local stand-in for the proxy providers. Point crawls at it with\n"
+            "-s MOCK_PROVIDER_URL=http://127.0.0.1:<port>; any API key is accepted.\n\n"
+            "Example: scrapy mockprovider --latency uniform:0.2,0.8 --error-rate 0.02 --provider-concurrency 50"
+        )
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--port", type=int, default=8099, help="port to listen on (default: %(default)s)")
+        parser.add_argument("--interface", default="127.0.0.1", help="interface to bind (default: %(default)s)")
+        add_mock_options(parser)
+
+    def run(self, args, opts):
+        try:
+            mock = mock_from_options(opts)
+        except ValueError as e:
+            raise UsageError(str(e))
+        install_reactor(self.settings["TWISTED_REACTOR"])
+        from twisted.internet import reactor
+
+        port = listen(mock, opts.port, opts.interface)
+        address = port.getHost()
+        print(f"🧪 Mock providers on http://{address.host}:{address.port} (sites: {', '.join(sorted(mock.pages))})")
+        print(f"   crawl with -s MOCK_PROVIDER_URL=http://{address.host}:{address.port}; stats at /_stats")
+        reactor.run()
+        print(f"📊 Served: {dict(mock.stats)}")
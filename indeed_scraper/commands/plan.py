@@ -0,0 +1,149 @@
+import json
+import math
+import os
+import sys
+from itertools import product
+
+from scrapy import Request
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.utils.misc import load_object
+
+from indeed_scraper.providers import (
+    TYPICAL_LATENCY_SECONDS,
+    base_tier_url,
+    provider_for,
+    request_credits,
+    request_tier,
+    target_url,
+)
+from indeed_scraper.render import RenderMemory, expected_credits, memory_key
+from indeed_scraper.utils.storage import data_dir, data_file
+
+
+def recorded_latency(metrics_dir, spider_name):
+    """Mean download latency from the spider's last MetricsExporter snapshot, or None."""
+    path = os.path.join(metrics_dir, f"{spider_name}.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    series = snapshot.get("histograms", {}).get("scraper_download_latency_seconds", [])
+    total = sum(s["sum"] for s in series)
+    count = sum(s["count"] for s in series)
+    return total / count if count else None
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    requires_crawler_process = False
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options] [<spider> ...]"
+
+    def short_desc(self):
+        return "Expand spiders x queries x pages into the request set and price it, without fetching"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--query", action="append", default=[], help="search query (repeat for a matrix; default: each spider's own)")
+        parser.add_argument("--location", action="append", default=[], help="search location (repeat for a matrix)")
+        parser.add_argument("--pages", type=int, help="pages to follow per query (default: each spider's max_pages, else 1)")
+        parser.add_argument("--workers", type=int, default=1, help="worker processes sharing the crawl (see `scrapy workers`)")
+        parser.add_argument("--budget", type=int, help="refuse plans costing more credits (default: SHARED_CREDIT_BUDGET)")
+        parser.add_argument("--output", metavar="FILE", help="write the planned requests as JSON lines")
+
+    def run(self, args, opts):
+        if opts.pages is not None and opts.pages < 1:
+            raise UsageError("--pages must be at least 1")
+        loader = load_object(self.settings["SPIDER_LOADER_CLASS"]).from_settings(self.settings.frozencopy())
+        spider_names = args or sorted(loader.list())
+        metrics_dir = data_dir(self.settings.get("METRICS_DIR"), "metrics")
+        # with render escalation, pages go out at the base tier unless they are known to need
+        # rendering, and are priced with the rendered fetch they may escalate to
+        self.render_memory = None
+        if self.settings.getbool("RENDER_ESCALATION_ENABLED"):
+            self.render_memory = RenderMemory(
+                data_file(self.settings.get("RENDER_MEMORY_PATH"), "render_memory.json"),
+                self.settings.getfloat("RENDER_MEMORY_HALFLIFE"),
+            )
+        cells = list(product(opts.query or [None], opts.location or [None]))
+
+        planned, total_credits, total_seconds = [], 0, 0.0
+        for name in spider_names:
+            try:
+                spidercls = loader.load(name)
+            except KeyError:
+                raise UsageError(f"Spider not found: {name}")
+            if not hasattr(spidercls, "make_api_request"):
+                print(f"⏭  {name}: fetches directly in start_requests, not plannable")
+                continue
+            rows, seconds = self.plan_spider(spidercls, cells, opts.pages, metrics_dir)
+            credits = sum(row["credits"] for row in rows)
+            print(f"🗺  {name}: {len(rows)} requests, {credits} credits, ~{seconds / 60:.1f} min")
+            planned += rows
+            total_credits += credits
+            total_seconds += seconds
+
+        wall = total_seconds / max(1, opts.workers)
+        print(f"\n📋 Plan: {len(planned)} requests, {total_credits} credits, ~{wall / 60:.1f} min"
+              f" with {max(1, opts.workers)} worker(s)")
+
+        if opts.output:
+            with open(opts.output, "w", encoding="utf-8") as f:
+                for row in planned:
+                    f.write(json.dumps(row) + "\n")
+            print(f"💾 Requests written to {opts.output}")
+
+        budget = opts.budget if opts.budget is not None else self.settings.getint("SHARED_CREDIT_BUDGET")
+        if budget > 0 and total_credits > budget:
+            print(f"⛔ Over budget: plan needs {total_credits} credits, budget is {budget}", file=sys.stderr)
+            self.exitcode = 1
+
+    def plan_spider(self, spidercls, cells, pages_option, metrics_dir):
+        settings = self.settings.copy()
+        spidercls.update_settings(settings)
+        concurrency = max(1, min(settings.getint("CONCURRENT_REQUESTS"), settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN") or sys.maxsize))
+        delay = settings.getfloat("DOWNLOAD_DELAY")
+        # a crawl stops at the spider's max_api_calls or CLOSESPIDER_PAGECOUNT, whichever comes first
+        caps = [getattr(spidercls, "max_api_calls", None), settings.getint("CLOSESPIDER_PAGECOUNT")]
+        cap = min((c for c in caps if c), default=sys.maxsize)
+        pages = pages_option or getattr(spidercls, "max_pages", 1)
+        latency = recorded_latency(metrics_dir, spidercls.name)
+
+        rows, seen, seconds = [], set(), 0.0
+        for query, location in cells:
+            kwargs = {k: v for k, v in (("search_query", query), ("search_location", location)) if v}
+            starts = [r for r in spidercls(**kwargs).start_requests() if isinstance(r, Request)]
+            starts = [r for r in starts if r.url not in seen]
+            if not starts:
+                continue
+            seen.update(r.url for r in starts)
+            # next pages are only found by fetching, so they are priced like the page they follow
+            followups = max(0, min(pages - 1, cap - len(starts)))
+            for index, request in enumerate(starts):
+                url = request.url
+                credits = request_credits(url)
+                if self.render_memory is not None:
+                    credits = expected_credits(self.render_memory, url)
+                    if not self.render_memory.needs_render(memory_key(url)):
+                        url = base_tier_url(url)
+                tier = request_tier(url)
+                request_latency = latency if latency is not None else TYPICAL_LATENCY_SECONDS.get(tier, TYPICAL_LATENCY_SECONDS["base"])
+                for page in range(1, 2 + (followups if index == 0 else 0)):
+                    rows.append({
+                        "spider": spidercls.name,
+                        "query": query,
+                        "location": location,
+                        "page": page,
+                        "target": target_url(url),
+                        "provider": provider_for(url),
+                        "tier": tier,
+                        "credits": credits,
+                        "latency": request_latency,
+                    })
+            # start requests go out `concurrency` at a time, next pages one after another
+            seconds += (math.ceil(len(starts) / concurrency) + followups) * (request_latency + delay)
+        return rows, seconds
@@ -0,0 +1,133 @@
+import random
+import subprocess
+import sys
+
+from scrapy import Request
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.utils.misc import load_object
+
+from indeed_scraper.providers import base_tier_url, request_credits, site_for
+from indeed_scraper.recrawl import RecrawlPlanner, YieldHistory
+from indeed_scraper.render import RenderMemory, expected_credits, memory_key
+from indeed_scraper.utils.storage import data_file
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    requires_crawler_process = False
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options] [<spider> ...]"
+
+    def short_desc(self):
+        return "Decide which queries to crawl this cycle, and how deep, from their past new-job yield"
+
+    def long_desc(self):
+        return (
+            "Rank every (spider, query) pair by the new jobs it is expected to have waiting\n"
+            "(RECRAWL_ENABLED records the yield of each crawl) and fund the best ones until the\n"
+            "cycle budget is spent. Run it often (e.g. hourly) with a per-cycle budget instead of\n"
+            "one fixed daily crawl: hot queries get crawled soon after they post, dead ones are skipped.\n\n"
+            "Example: scrapy recrawl --query 'python developer' --query 'data engineer' --budget 200 --run"
+        )
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--query", action="append", default=[],
+                            help="candidate query (repeat; default: each spider's own plus the ones in the history)")
+        parser.add_argument("--budget", type=int, help="credits for this cycle (default: RECRAWL_CYCLE_BUDGET, 0 = no cap)")
+        parser.add_argument("--seed", type=int, help="random seed, for a repeatable plan")
+        parser.add_argument("--run", action="store_true", help="run the planned crawls one after another")
+
+    def run(self, args, opts):
+        loader = load_object(self.settings["SPIDER_LOADER_CLASS"]).from_settings(self.settings.frozencopy())
+        spider_names = args or sorted(loader.list())
+        history = YieldHistory(
+            data_file(self.settings.get("RECRAWL_HISTORY_PATH"), "recrawl.sqlite"),
+            self.settings.getfloat("RECRAWL_HALFLIFE"),
+        )
+        self.render_memory = None
+        if self.settings.getbool("RENDER_ESCALATION_ENABLED"):
+            self.render_memory = RenderMemory(
+                data_file(self.settings.get("RENDER_MEMORY_PATH"), "render_memory.json"),
+                self.settings.getfloat("RENDER_MEMORY_HALFLIFE"),
+            )
+        known = {}
+        for arm in history.arms():
+            known.setdefault(arm["spider"], set()).add(arm["query"])
+
+        candidates = []
+        for name in spider_names:
+            try:
+                spidercls = loader.load(name)
+            except KeyError:
+                raise UsageError(f"Spider not found: {name}")
+            if not hasattr(spidercls, "make_api_request"):
+                continue
+            # "" stands for the spider's own default query
+            queries = opts.query or sorted({""} | known.get(name, set()))
+            for query in queries:
+                candidate = self.candidate(spidercls, query)
+                if candidate:
+                    candidates.append(candidate)
+        if not candidates:
+            raise UsageError("No plannable spiders")
+
+        budget = opts.budget if opts.budget is not None else self.settings.getint("RECRAWL_CYCLE_BUDGET")
+        planner = RecrawlPlanner(history, self.settings.getfloat("RECRAWL_MIN_EXPECTED"), random.Random(opts.seed))
+        rows = planner.plan(candidates, budget)
+        history.close()
+
+        icons = {"crawl": "🟢", "skip": "💤", "budget": "💸"}
+        spent = 0
+        for row in rows:
+            credits = row["pages"] * row["credits"] if row["decision"] == "crawl" else 0
+            spent += credits
+            print(f"{icons[row['decision']]} {row['spider']:<15} {row['query'] or '(default)':<25}"
+                  f" ~{row['expected']:.1f} new ({row['rate'] * 24:.1f}/day)"
+                  f" → {row['decision']}" + (f" {row['pages']} page(s), {credits} credits" if credits else ""))
+        crawls = [row for row in rows if row["decision"] == "crawl"]
+        print(f"\n📋 Cycle: {len(crawls)} of {len(rows)} queries, {spent} credits" + (f" of {budget}" if budget > 0 else ""))
+
+        if not opts.run:
+            return
+        failed = 0
+        for row in crawls:
+            command = [
+                sys.executable, "-m", "scrapy", "crawl", row["spider"],
+                "-s", "RECRAWL_ENABLED=1",
+                "-s", "CHANGELOG_EXPIRE=0",
+                "-s", f"CLOSESPIDER_PAGECOUNT={row['pages']}",
+            ]
+            if row["query"]:
+                command += ["-a", f"search_query={row['query']}"]
+            for setting in opts.set:
+                command += ["-s", setting]
+            code = subprocess.call(command)
+            print(f"🏁 {row['spider']} {row['query'] or '(default)'} exited with code {code}")
+            failed += code != 0
+        self.exitcode = 1 if failed else 0
+
+    def candidate(self, spidercls, query):
+        kwargs = {"search_query": query} if query else {}
+        starts = [r for r in spidercls(**kwargs).start_requests() if isinstance(r, Request)]
+        if not starts:
+            return None
+        url = starts[0].url
+        credits = request_credits(url)
+        if self.render_memory is not None:
+            credits = expected_credits(self.render_memory, url)
+            if not self.render_memory.needs_render(memory_key(url)):
+                url = base_tier_url(url)
+        settings = self.settings.copy()
+        spidercls.update_settings(settings)
+        caps = [getattr(spidercls, "max_api_calls", None), settings.getint("CLOSESPIDER_PAGECOUNT")]
+        return {
+            "spider": spidercls.name,
+            "query": query,
+            "site": site_for(url),
+            "credits": credits,
+            "max_pages": min((c for c in caps if c), default=1),
+        }
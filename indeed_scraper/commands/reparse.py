@@ -0,0 +1,146 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+from itemadapter import ItemAdapter, is_item
+from scrapy import Request
+from scrapy.commands import ScrapyCommand
+from scrapy.crawler import Crawler
+from scrapy.exceptions import UsageError
+from scrapy.exporters import CsvItemExporter, JsonItemExporter, JsonLinesItemExporter
+from scrapy.http import HtmlResponse
+from scrapy.statscollectors import MemoryStatsCollector
+from scrapy.utils.misc import load_object
+from scrapy.utils.project import get_project_settings
+
+from indeed_scraper.archive import PageArchive
+from indeed_scraper.checkpoint import item_key
+from indeed_scraper.commands.search import parse_since
+from indeed_scraper.utils.storage import data_dir
+
+EXPORTERS = {".jsonl": JsonLinesItemExporter, ".json": JsonItemExporter, ".csv": CsvItemExporter}
+
+# per worker process: (spider, archive, names of the spider's seen-sets), set up once by _init_worker
+_worker = None
+
+
+def _init_worker(spider_name, archive_dir):
+    global _worker
+    settings = get_project_settings()
+    settings.set("EVENTS_BUFFER_SIZE", 0)
+    settings.set("LOG_ENABLED", False)
+    spidercls = load_object(settings["SPIDER_LOADER_CLASS"]).from_settings(settings.frozencopy()).load(spider_name)
+    # a crawler that never crawls: callbacks only need its settings, signals and stats
+    crawler = Crawler(spidercls, settings)
+    crawler.stats = MemoryStatsCollector(crawler)
+    _worker = (spidercls.from_crawler(crawler), PageArchive(archive_dir), settings.getlist("SHARED_SPIDER_SETS"))
+
+
+def _reparse(records):
+    """Items from a batch of index rows, plus the stats their callbacks recorded."""
+    spider, archive, seen_sets = _worker
+    spider.crawler.stats.clear_stats()
+    items = []
+    for record in records:
+        status, headers, body = archive.read(record)
+        fetched_at = datetime.fromisoformat(record["fetched_at"])
+        # every page is parsed as if it were the crawl's first: no call cap, no "single-call mode",
+        # nothing seen yet (the parent drops repeats across pages, in archive order)
+        if hasattr(spider, "api_calls"):
+            spider.api_calls = 0
+        for name in seen_sets:
+            if isinstance(getattr(spider, name, None), set):
+                setattr(spider, name, set())
+        # age filters ("posted in the last 24h") apply as of the fetch, not as of today
+        if hasattr(spider, "cutoff_time"):
+            spider.cutoff_time = fetched_at - timedelta(hours=24)
+        if hasattr(spider, "cutoff_date"):
+            spider.cutoff_date = fetched_at.replace(tzinfo=None) - timedelta(days=1)
+        callback = getattr(spider, record["callback"], None) or spider.parse
+        request = Request(record["url"], callback=callback, meta={"origin": "reparse"}, dont_filter=True)
+        response = HtmlResponse(record["url"], status=status, headers=headers, body=body, request=request)
+        for output in callback(response) or ():
+            if is_item(output):
+                items.append(ItemAdapter(output).asdict())
+    return items, spider.crawler.stats.get_stats()
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    requires_crawler_process = False
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options] <spider>"
+
+    def short_desc(self):
+        return "Regenerate items from archived pages (ARCHIVE_ENABLED) with the current parsers"
+
+    def long_desc(self):
+        return (
+            "Stream pages from the raw-page archive through <spider>'s callbacks in a process\n"
+            "pool and export the items, without any request going out.\n\n"
+            "Example: scrapy reparse remote_co --since 2025-10-01 --until 2025-10-31 -o remote_co_october.csv"
+        )
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("-o", "--output", metavar="FILE", help="items file, .csv/.jsonl/.json (default: <spider>_reparsed.csv)")
+        parser.add_argument("--since", help="first fetch date: ISO date or 7d/24h/2w")
+        parser.add_argument("--until", help="last fetch date (ISO date, inclusive)")
+        parser.add_argument("--site", help="re-parse every archived page of this site (e.g. indeed.com), whichever spider fetched it")
+        parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="worker processes (default: CPU count)")
+        parser.add_argument("--batch", type=int, default=50, help="pages per work unit (default: %(default)s)")
+
+    def run(self, args, opts):
+        if len(args) != 1:
+            raise UsageError()
+        if opts.processes < 1 or opts.batch < 1:
+            raise UsageError("--processes and --batch must be at least 1")
+        spider_name = args[0]
+        loader = load_object(self.settings["SPIDER_LOADER_CLASS"]).from_settings(self.settings.frozencopy())
+        if spider_name not in loader.list():
+            raise UsageError(f"Spider not found: {spider_name}")
+        since = parse_since(opts.since) if opts.since else None
+        try:
+            until = date.fromisoformat(opts.until) if opts.until else None
+        except ValueError:
+            raise UsageError(f"Invalid --until value: {opts.until!r} (use e.g. 2025-10-31)")
+
+        archive_dir = data_dir(self.settings.get("ARCHIVE_DIR"), "archive")
+        archive = PageArchive(archive_dir)
+        records = archive.index.records(spider=None if opts.site else spider_name, site=opts.site, since=since, until=until)
+        archive.close()
+        if not records:
+            print(f"📭 No archived pages for {opts.site or spider_name} in that range")
+            return
+        print(f"🗄  {len(records)} archived pages → {spider_name} callbacks on {opts.processes} process(es)")
+
+        output = opts.output or f"{spider_name}_reparsed.csv"
+        exporter_cls = EXPORTERS.get(os.path.splitext(output)[1].lower(), CsvItemExporter)
+        batches = [records[i:i + opts.batch] for i in range(0, len(records), opts.batch)]
+        seen, written, dropped = set(), 0, {}
+        with open(output, "wb") as f, ProcessPoolExecutor(
+            opts.processes, initializer=_init_worker, initargs=(spider_name, archive_dir)
+        ) as pool:
+            exporter = exporter_cls(f)
+            exporter.start_exporting()
+            for items, stats in pool.map(_reparse, batches):
+                for item in items:
+                    # same key as the spiders' seen_urls, so the result does not depend on --processes/--batch
+                    key = item_key(item)
+                    if key in seen:
+                        dropped["duplicate"] = dropped.get("duplicate", 0) + 1
+                        continue
+                    seen.add(key)
+                    exporter.export_item(item)
+                    written += 1
+                for name, value in stats.items():
+                    if name.startswith("cards/dropped/"):
+                        reason = name[len("cards/dropped/"):]
+                        dropped[reason] = dropped.get(reason, 0) + value
+            exporter.finish_exporting()
+
+        print(f"💾 {written} items written to {output}")
+        if dropped:
+            print(f"🗑  Dropped cards: {dropped}")
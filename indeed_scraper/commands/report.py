@@ -0,0 +1,101 @@
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+from indeed_scraper.aggregates import DIMENSIONS, Aggregates
+from indeed_scraper.commands.index import parse_scraped_on
+from indeed_scraper.commands.search import parse_since
+from indeed_scraper.utils.jobfiles import read_jobs, source_for
+from indeed_scraper.utils.normalize import normalize_company, normalize_text
+from indeed_scraper.utils.storage import data_file
+
+ORDERS = ("jobs", "salaried", "mean", "median", "p90")
+
+
+def money(value):
+    return f"${value / 1000:,.0f}K" if value is not None else "—"
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    requires_crawler_process = False
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return f"[options] [{'|'.join(DIMENSIONS)}]"
+
+    def short_desc(self):
+        return "Show precomputed job counts and salary stats per source, company, title or country"
+
+    def long_desc(self):
+        return (
+            "Read the aggregate tables kept up to date by AggregatesPipeline (AGGREGATES_ENABLED).\n"
+            "Every number is precomputed: the report costs the same however much history there is.\n"
+            "Salaries are the middle of the disclosed range, annualized; median and p90 are\n"
+            "approximate (AGGREGATES_SKETCH_ACCURACY).\n\n"
+            "Examples:\n"
+            "  scrapy report source --daily --since 7d\n"
+            "  scrapy report title --order median --top 20\n"
+            "  scrapy report --add indeed_jobs.csv --add zip_jobs.csv"
+        )
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--key", help="only this source/company/title/country")
+        parser.add_argument("--daily", action="store_true", help="one row per posted day")
+        parser.add_argument("--since", help="with --daily: days on or after 7d, 2w or YYYY-MM-DD")
+        parser.add_argument("--order", choices=ORDERS, default="jobs", help="sort by (default: jobs)")
+        parser.add_argument("--top", type=int, default=25, help="rows to show, 0 = all")
+        parser.add_argument("--add", action="append", default=[], metavar="CSV",
+                            help="count the postings of a scraped CSV first (repeat; already-counted URLs are skipped)")
+        parser.add_argument("--scraped-on", metavar="YYYY-MM-DD",
+                            help="with --add: day the CSVs were scraped, to date relative posted values; "
+                                 "without it such postings only count toward the all-time rows")
+
+    def run(self, args, opts):
+        if len(args) > 1 or (args and args[0] not in DIMENSIONS):
+            raise UsageError(f"Dimension must be one of: {', '.join(DIMENSIONS)}")
+        dimension = args[0] if args else "source"
+        scraped_on = parse_scraped_on(opts.scraped_on)
+        aggregates = Aggregates(
+            data_file(self.settings.get("AGGREGATES_PATH"), "aggregates.sqlite"),
+            self.settings.getfloat("AGGREGATES_SKETCH_ACCURACY"),
+        )
+        try:
+            for csv_path in opts.add:
+                source = source_for(csv_path)
+                count = sum(1 for job in read_jobs(csv_path) if aggregates.add(job, source=source, backfill=True, scraped_on=scraped_on))
+                aggregates.flush()
+                print(f"📥 Counted {count} new postings from {csv_path}")
+            rows = aggregates.rows(
+                dimension,
+                key=self.key(dimension, opts.key),
+                since=parse_since(opts.since) if opts.since else None,
+                daily=opts.daily,
+                order=opts.order,
+                limit=opts.top,
+            )
+        finally:
+            aggregates.close()
+
+        if not rows:
+            print(f"📭 No aggregates for {dimension}" + (f" {opts.key!r}" if opts.key else ""))
+            return
+        width = min(40, max(len(dimension), *(len(row["key"] or "(all)") for row in rows)))
+        print(("day         " if opts.daily else "") + f"{dimension:<{width}}  {'jobs':>6} {'salaried':>8}"
+              f" {'mean':>8} {'median':>8} {'p90':>8} {'min':>8} {'max':>8}")
+        for row in rows:
+            print((f"{row['day']:<12}" if opts.daily else "") + f"{(row['key'] or '(all)')[:width]:<{width}}"
+                  f"  {row['jobs']:>6} {row['salaried']:>8} {money(row['mean']):>8} {money(row['median']):>8}"
+                  f" {money(row['p90']):>8} {money(row['min']):>8} {money(row['max']):>8}")
+
+    def key(self, dimension, value):
+        # keys are stored normalized; accept them the way they appear in the CSVs
+        if value is None:
+            return None
+        if dimension == "company":
+            return normalize_company(value)
+        if dimension == "title":
+            return normalize_text(value)
+        if dimension == "country":
+            return value.upper()
+        return value
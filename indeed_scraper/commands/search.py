@@ -0,0 +1,102 @@
+import math
+from datetime import date, timedelta
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+from indeed_scraper.geo import load_gazetteer
+from indeed_scraper.jobindex import JobIndex
+from indeed_scraper.utils.storage import data_file
+
+
+def parse_since(value):
+    """Accept "7d"/"24h"/"2w" or an ISO date."""
+    value = value.strip().lower()
+    hours = {"h": 1, "d": 24, "w": 7 * 24}
+    if value[:-1].isdigit() and value[-1] in hours:
+        # posted dates are days: 24h is since yesterday, 36h since the day before
+        return date.today() - timedelta(days=math.ceil(int(value[:-1]) * hours[value[-1]] / 24))
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise UsageError(f"Invalid --since value: {value!r} (use e.g. 7d, 2w or 2025-10-01)")
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    requires_crawler_process = False
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options] [<keyword> ...]"
+
+    def short_desc(self):
+        return "Query the local job index"
+
+    def long_desc(self):
+        return (
+            "Query the index built by `scrapy index` / SearchIndexPipeline without touching the CSVs.\n\n"
+            "--country/--region/--city match the normalized location (any spelling the gazetteer\n"
+            "knows: 'United Kingdom' or UK, 'New Jersey' or NJ, NYC), --location the raw text.\n\n"
+            "Example: scrapy search python --region NJ --salary --since 7d"
+        )
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--title", action="append", default=[], help="keyword(s) that must appear in the title")
+        parser.add_argument("--company", action="append", default=[], help="keyword(s) that must appear in the company")
+        parser.add_argument("--location", action="append", default=[], help="keyword(s) that must appear in the location")
+        parser.add_argument("--country", help="only jobs in this country (name or ISO code)")
+        parser.add_argument("--region", help="only jobs in this state/province (name or code)")
+        parser.add_argument("--city", help="only jobs in this city")
+        parser.add_argument("--remote", action="store_true", default=None, help="only fully remote jobs")
+        parser.add_argument("--onsite", dest="remote", action="store_false", default=None, help="only on-site and hybrid jobs")
+        parser.add_argument("--source", help="only jobs from this spider (indeed, ziprecruiter, ...)")
+        parser.add_argument("--salary", action="store_true", help="only jobs with a disclosed salary")
+        parser.add_argument("--min-salary", type=float, help="minimum annualized salary (upper bound of the range)")
+        parser.add_argument("--since", help="posted on or after: 7d, 24h, 2w or YYYY-MM-DD")
+        parser.add_argument("--limit", type=int, default=50)
+
+    def run(self, args, opts):
+        terms = [(None, a) for a in args]
+        terms += [("title", t) for t in opts.title]
+        terms += [("company", t) for t in opts.company]
+        terms += [("location", t) for t in opts.location]
+
+        country, region, city = self.places(opts)
+        index = JobIndex(data_file(self.settings.get("SEARCH_INDEX_PATH"), "jobs_index.sqlite"))
+        try:
+            rows = index.search(
+                terms,
+                salary_disclosed=opts.salary,
+                min_salary=opts.min_salary,
+                posted_since=parse_since(opts.since) if opts.since else None,
+                source=opts.source,
+                country=country,
+                region=region,
+                city=city,
+                remote=opts.remote,
+                limit=opts.limit,
+            )
+        finally:
+            index.close()
+
+        for row in rows:
+            print(f"{row['posted'] or '?':10}  [{row['source']}] {row['title']} — {row['company']} ({row['location']})")
+            print(f"            💰 {row['salary'] or 'Not disclosed'}  🔗 {row['key']}")
+        print(f"📊 {len(rows)} matching jobs")
+
+    def places(self, opts):
+        gazetteer = load_gazetteer()
+        country = region = None
+        if opts.country:
+            country = gazetteer.country_code(opts.country)
+            if country is None:
+                raise UsageError(f"Unknown country: {opts.country!r}")
+        if opts.region:
+            found = gazetteer.region(opts.region, country)
+            if found is None:
+                raise UsageError(f"Unknown region: {opts.region!r}" + (f" in {country}" if country else ""))
+            country, region = found
+        city = opts.city and (gazetteer.city_name(opts.city) or opts.city)
+        return country, region, city
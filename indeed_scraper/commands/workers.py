@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+
+# set for each worker above; a -s for them would give every worker the same value
+PER_WORKER_SETTINGS = {"FEED_URI", "SHARED_STORE_URL", "SHARED_RUN_ID", "SHARED_WORKER", "SHARED_WORKERS"}
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    requires_crawler_process = False
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options] <spider>"
+
+    def short_desc(self):
+        return "Run a spider in N worker processes sharing one frontier (SHARED_STORE_URL)"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("-n", "--processes", type=int, default=2, help="worker processes to start (default: 2)")
+        parser.add_argument("--store", help="shared store URL (default: SHARED_STORE_URL, else the local SQLite frontier)")
+        parser.add_argument("--run-id", help="shared state of this run to continue (default: a new run)")
+        parser.add_argument("-a", dest="spargs", action="append", default=[], metavar="NAME=VALUE",
+                            help="spider argument passed to every worker")
+
+    def run(self, args, opts):
+        if len(args) != 1:
+            raise UsageError()
+        if opts.processes < 1:
+            raise UsageError("--processes must be at least 1")
+        spider = args[0]
+        store = opts.store or self.settings.get("SHARED_STORE_URL") or "sqlite://"
+        # a fresh queue, dupe filter, seen-sets and credit counter unless continuing a run
+        run_id = opts.run_id or f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        print(f"🧵 Run {run_id} on {store}")
+
+        # each worker exports to its own file (jobs.1.csv, jobs.2.csv, ...), named after
+        # the FEED_URI in effect (-s included)
+        feed_stem, feed_ext = os.path.splitext(self.settings.get("FEED_URI") or f"{spider}.csv")
+        workers = []
+        for number in range(1, opts.processes + 1):
+            command = [
+                sys.executable, "-m", "scrapy", "crawl", spider,
+                "-s", f"SHARED_STORE_URL={store}",
+                "-s", f"SHARED_RUN_ID={run_id}",
+                "-s", f"FEED_URI={feed_stem}.{number}{feed_ext}",
+                "-s", f"SHARED_WORKER={number}",
+                "-s", f"SHARED_WORKERS={opts.processes}",
+            ]
+            for setting in opts.set:
+                if setting.split("=", 1)[0] not in PER_WORKER_SETTINGS:
+                    command += ["-s", setting]
+            for spider_arg in opts.spargs:
+                command += ["-a", spider_arg]
+            workers.append(subprocess.Popen(command))
+            print(f"🚀 Worker {number}/{opts.processes} started (pid {workers[-1].pid})")
+
+        failed = 0
+        for number, worker in enumerate(workers, 1):
+            code = worker.wait()
+            print(f"🏁 Worker {number} exited with code {code}")
+            failed += code != 0
+        self.exitcode = 1 if failed else 0
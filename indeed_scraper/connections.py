@@ -0,0 +1,245 @@
+"""Warm, reused connections to the few proxy-API hosts all traffic goes to.
+
+Almost every request goes to one of PROVIDER_HOSTS, so a fresh TCP + TLS
+handshake per request is pure overhead once concurrency goes up. This module
+tunes the stock HTTP/1.1 handler for that:
+
+- ``ProviderDownloadHandler`` keeps up to PROVIDER_POOL_SIZE idle keep-alive
+  connections per host for PROVIDER_POOL_IDLE_TIMEOUT seconds, and counts
+  pool hits and misses per host (``connections/pool_hits/<host>``,
+  ``connections/pool_misses/<host>``).
+- At spider open it opens PROVIDER_PREWARM_CONNECTIONS connections to the
+  spider's provider host (taken from its module's ``get_proxy_url``). This
+  resolves the name into the DNS cache (DNSCACHE_ENABLED) and leaves
+  handshaken connections in the pool for the first requests.
+- ``SessionReusingContextFactory`` (DOWNLOADER_CLIENTCONTEXTFACTORY) keeps
+  one TLS context and the newest TLS session per host, with session tickets
+  on, so new connections can resume the session instead of a full handshake
+  (``connections/tls_resumed`` vs ``connections/tls_full``).
+- With PROVIDER_HTTP2_ENABLED, provider requests are multiplexed over HTTP/2
+  (Scrapy's H2 handler, needs the optional ``h2`` package). Other hosts keep
+  HTTP/1.1.
+- With MOCK_PROVIDER_URL set, provider requests go to the mock server instead
+  (see ``indeed_scraper.mockprovider``).
+
+Pool-hit counting, prewarming and TLS resumption counting rely on Twisted and
+pyOpenSSL internals. They are looked up once; if a release drops one, the
+feature it serves turns itself off and downloads go on as with the stock
+handler.
+"""
+import logging
+import sys
+import weakref
+
+from OpenSSL import SSL
+from scrapy import signals
+from scrapy.core.downloader.contextfactory import ScrapyClientContextFactory
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler
+from scrapy.core.downloader.tls import ScrapyClientTLSOptions
+from scrapy.utils.misc import build_from_crawler
+from twisted.internet.ssl import CertificateOptions
+from twisted.web.client import URI, Agent, HTTPConnectionPool
+
+from indeed_scraper.providers import PROVIDER_HOSTS, provider_for
+
+logger = logging.getLogger(__name__)
+
+try:
+    from OpenSSL._util import lib as _openssl_lib
+except ImportError:
+    _openssl_lib = None
+
+# private HTTPConnectionPool/Agent methods used to park prewarmed connections
+_CAN_PREWARM = all(hasattr(HTTPConnectionPool, name) for name in ("_newConnection", "_putConnection")) and hasattr(
+    Agent, "_getEndpoint"
+)
+
+
+def _session_reused(connection):
+    """Whether the connection's handshake resumed a TLS session; None if pyOpenSSL no longer tells."""
+    try:
+        return bool(_openssl_lib.SSL_session_reused(connection._ssl))
+    except AttributeError:
+        return None
+
+
+def _host_label(key):
+    # pool keys are (scheme, host, port), possibly with proxy details after them
+    host = key[1] if len(key) > 1 else key[0]
+    return host.decode("ascii", "replace") if isinstance(host, bytes) else str(host)
+
+
+class CountingConnectionPool(HTTPConnectionPool):
+    def __init__(self, reactor, stats):
+        super().__init__(reactor, persistent=True)
+        self.stats = stats
+
+    def getConnection(self, key, endpoint):
+        idle = getattr(self, "_connections", None)
+        if idle is not None:
+            outcome = "pool_hits" if idle.get(key) else "pool_misses"
+            self.stats.inc_value(f"connections/{outcome}/{_host_label(key)}")
+        return super().getConnection(key, endpoint)
+
+    def warm(self, key, endpoint):
+        """Open a connection and park it in the pool as if a request had just finished with it."""
+        d = self._newConnection(key, endpoint)
+        d.addCallback(lambda protocol: self._putConnection(key, protocol))
+        return d
+
+
+class _SessionReusingTLSOptions(ScrapyClientTLSOptions):
+    def __init__(self, hostname, ctx, verbose_logging, factory):
+        super().__init__(hostname, ctx, verbose_logging=verbose_logging)
+        self.hostname = hostname
+        self.factory = factory
+
+    def clientConnectionForTLS(self, tlsProtocol):
+        connection = super().clientConnectionForTLS(tlsProtocol)
+        session = self.factory.sessions.get(self.hostname)
+        if session is not None:
+            connection.set_session(session)
+        return connection
+
+    def _identityVerifyingInfoCallback(self, connection, where, ret):
+        super()._identityVerifyingInfoCallback(connection, where, ret)
+        if where & SSL.SSL_CB_HANDSHAKE_DONE and connection not in self.factory.handshaken:
+            self.factory.handshaken.add(connection)
+            resumed = _session_reused(connection)
+            if resumed is not None:
+                self.factory.count("tls_resumed" if resumed else "tls_full")
+        elif not (where & SSL.SSL_CB_EXIT and connection in self.factory.handshaken):
+            return
+        # TLS 1.3 servers send their session tickets after the handshake, with the
+        # first response: take the session again each time OpenSSL has read one
+        self.factory.sessions[self.hostname] = connection.get_session()
+
+
+class SessionReusingContextFactory(ScrapyClientContextFactory):
+    """ScrapyClientContextFactory with one context and a resumable TLS session per host."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.creators = {}
+        self.sessions = {}
+        self.handshaken = weakref.WeakSet()
+        self.stats = None
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        o = super().from_crawler(crawler, *args, **kwargs)
+        o.stats = crawler.stats
+        return o
+
+    def getCertificateOptions(self):
+        # as Scrapy's, but with tickets: Twisted turns them off by default, and with
+        # them any resumption a stateless server (most CDNs) could offer
+        return CertificateOptions(
+            verify=False,
+            method=self._ssl_method,
+            fixBrokenPeers=True,
+            acceptableCiphers=self.tls_ciphers,
+            enableSessionTickets=True,
+        )
+
+    def count(self, name):
+        if self.stats is not None:
+            self.stats.inc_value(f"connections/{name}")
+
+    def creatorForNetloc(self, hostname, port):
+        # one options object per host: it wires its callbacks into the context, and
+        # a context that has made a connection cannot be changed any more
+        key = (hostname, port)
+        if key not in self.creators:
+            self.creators[key] = _SessionReusingTLSOptions(
+                hostname.decode("ascii"), self.getContext(), self.tls_verbose_logging, self
+            )
+        return self.creators[key]
+
+
+class ProviderDownloadHandler(HTTP11DownloadHandler):
+    def __init__(self, settings, crawler):
+        super().__init__(settings, crawler)
+        from twisted.internet import reactor
+
+        pool = getattr(self, "_pool", None)  # HTTP11DownloadHandler's own pool
+        if pool is not None:
+            pool = self._pool = CountingConnectionPool(reactor, crawler.stats)
+            if hasattr(pool, "_factory"):
+                pool._factory.noisy = False
+            pool.maxPersistentPerHost = settings.getint("PROVIDER_POOL_SIZE") or max(
+                settings.getint("CONCURRENT_REQUESTS"), settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN")
+            )
+            pool.cachedConnectionTimeout = settings.getint("PROVIDER_POOL_IDLE_TIMEOUT")
+        else:
+            logger.warning("HTTP11DownloadHandler has no _pool any more; provider connections use its defaults")
+        self.mock_base = (settings.get("MOCK_PROVIDER_URL") or "").rstrip("/")
+        self.prewarm_connections = settings.getint("PROVIDER_PREWARM_CONNECTIONS") if pool is not None and _CAN_PREWARM else 0
+        self.stats = crawler.stats
+        self.h2 = None
+        if settings.getbool("PROVIDER_HTTP2_ENABLED"):
+            try:
+                from scrapy.core.downloader.handlers.http2 import H2DownloadHandler
+            except ImportError:
+                logger.warning("PROVIDER_HTTP2_ENABLED is set but the h2 package is not installed; staying on HTTP/1.1")
+            else:
+                self.h2 = build_from_crawler(H2DownloadHandler, crawler)
+        if self.prewarm_connections > 0:
+            crawler.signals.connect(self.spider_opened, signal=signals.spider_opened)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings, crawler)
+
+    def rewrite(self, url):
+        """The URL a request for ``url`` is sent to: the mock server's, for provider requests under MOCK_PROVIDER_URL."""
+        if not self.mock_base or provider_for(url) == "direct":
+            return url
+        from indeed_scraper.mockprovider import mock_url
+
+        return mock_url(self.mock_base, url)
+
+    def download_request(self, request, spider):
+        url = self.rewrite(request.url)
+        if url != request.url:
+            # request and response keep the real provider URL, so fingerprints,
+            # budgets and metrics behave as in production
+            mock_request = request.replace(url=url)
+            d = super().download_request(mock_request, spider)
+            d.addCallback(self._restore, request, mock_request)
+            return d
+        if self.h2 is not None and provider_for(request.url) != "direct" and request.url.startswith("https://"):
+            self.stats.inc_value("connections/http2_requests")
+            return self.h2.download_request(request, spider)
+        return super().download_request(request, spider)
+
+    def _restore(self, response, request, mock_request):
+        # the stock handler records download_latency on the request it was given
+        if "download_latency" in mock_request.meta:
+            request.meta["download_latency"] = mock_request.meta["download_latency"]
+        return response.replace(url=request.url)
+
+    def spider_opened(self, spider):
+        get_proxy_url = getattr(sys.modules.get(type(spider).__module__), "get_proxy_url", None)
+        if get_proxy_url is None:
+            return
+        url = self.rewrite(get_proxy_url("https://example.com/"))
+        uri = URI.fromBytes(url.encode("ascii"))
+        if uri.host.decode("ascii") in PROVIDER_HOSTS and self.h2 is not None:
+            return  # one multiplexed HTTP/2 connection is opened by the first request
+        from twisted.internet import reactor
+
+        agent = Agent(reactor, contextFactory=self._contextFactory, pool=self._pool)
+        key = (uri.scheme, uri.host, uri.port)
+        endpoint = agent._getEndpoint(uri)
+        for _ in range(min(self.prewarm_connections, self._pool.maxPersistentPerHost)):
+            d = self._pool.warm(key, endpoint)
+            d.addCallbacks(
+                lambda _: self.stats.inc_value(f"connections/prewarmed/{_host_label(key)}"),
+                lambda failure: self.stats.inc_value(f"connections/prewarm_failed/{_host_label(key)}"),
+            )
+
+    def close(self):
+        if self.h2 is not None:
+            self.h2.close()
+        return super().close()
@@ -0,0 +1,165 @@
+"""Cross-board near-duplicate detection.
+
+Each job is reduced to a MinHash signature over character shingles of its
+normalized title, company and location. Signatures are split into LSH bands
+and stored in SQLite, so finding the candidates for a new job is a handful of
+indexed bucket lookups instead of a comparison against the whole history.
+"""
+import hashlib
+import random
+import sqlite3
+import struct
+
+from indeed_scraper.utils.normalize import char_shingles, normalize_company, normalize_text
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def cluster_id_for(key):
+    """Cluster ID given to a job that starts a new cluster."""
+    return "c" + hashlib.blake2b(key.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def job_shingles(title, company, location):
+    """Shingle set for a job; fields are prefixed so "Remote" the title can't match "Remote" the location."""
+    shingles = set()
+    for prefix, value in (("t", normalize_text(title)), ("c", normalize_company(company)), ("l", normalize_text(location))):
+        shingles.update(f"{prefix}:{s}" for s in char_shingles(value))
+    return shingles
+
+
+class MinHasher:
+    def __init__(self, num_perm=64, seed=1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, shingles):
+        hashes = [_hash64(s) for s in shingles]
+        if not hashes:
+            return [_MAX_HASH] * self.num_perm
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self.permutations
+        ]
+
+    @staticmethod
+    def similarity(sig_a, sig_b):
+        return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class LSHIndex:
+    """On-disk MinHash LSH index that assigns a cluster ID to every job key it sees.
+
+    ``bands * rows`` must equal the signature length. With the defaults (16 bands
+    of 4 rows) pairs above ~0.6 Jaccard similarity almost always share a bucket,
+    and ``threshold`` then filters the candidates on estimated similarity.
+    """
+
+    def __init__(self, path, num_perm=64, bands=16, threshold=0.6):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self._pack = struct.Struct(f"<{num_perm}I")
+        self.db = sqlite3.connect(path)
+        self.db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS signatures (
+                key TEXT PRIMARY KEY,
+                cluster_id TEXT NOT NULL,
+                source TEXT,
+                sig BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                key TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket);
+            """
+        )
+
+    def _bucket_ids(self, sig):
+        for band in range(self.bands):
+            chunk = sig[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(struct.pack(f"<{self.rows}I", *chunk), digest_size=8).digest()
+            yield band, int.from_bytes(digest, "little", signed=True)
+
+    def cluster_of(self, key):
+        row = self.db.execute("SELECT cluster_id FROM signatures WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, key, title, company, location, source=None):
+        """Index one job and return its cluster ID (an existing one for near-duplicates)."""
+        existing = self.cluster_of(key)
+        if existing:
+            return existing
+
+        sig = self.hasher.signature(job_shingles(title, company, location))
+        buckets = list(self._bucket_ids(sig))
+
+        candidates = set()
+        for band, bucket in buckets:
+            candidates.update(
+                row[0] for row in self.db.execute(
+                    "SELECT key FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                )
+            )
+
+        best_cluster, best_score = None, 0.0
+        for candidate in candidates:
+            cluster_id, blob = self.db.execute(
+                "SELECT cluster_id, sig FROM signatures WHERE key = ?", (candidate,)
+            ).fetchone()
+            score = MinHasher.similarity(sig, self._pack.unpack(blob))
+            if score >= self.threshold and score > best_score:
+                best_cluster, best_score = cluster_id, score
+
+        cluster_id = best_cluster or cluster_id_for(key)
+        with self.db:
+            self.db.execute(
+                "INSERT INTO signatures (key, cluster_id, source, sig) VALUES (?, ?, ?, ?)",
+                (key, cluster_id, source, self._pack.pack(*sig)),
+            )
+            self.db.executemany(
+                "INSERT INTO buckets (band, bucket, key) VALUES (?, ?, ?)",
+                ((band, bucket, key) for band, bucket in buckets),
+            )
+        return cluster_id
+
+    def clusters(self, min_size=2):
+        """Yield (cluster_id, [(source, key), ...]) for clusters with at least ``min_size`` members."""
+        rows = self.db.execute(
+            """
+            SELECT cluster_id, source, key FROM signatures
+            WHERE cluster_id IN (
+                SELECT cluster_id FROM signatures GROUP BY cluster_id HAVING COUNT(*) >= ?
+            )
+            ORDER BY cluster_id
+            """,
+            (min_size,),
+        )
+        current, members = None, []
+        for cluster_id, source, key in rows:
+            if cluster_id != current and members:
+                yield current, members
+                members = []
+            current = cluster_id
+            members.append((source, key))
+        if members:
+            yield current, members
+
+    def close(self):
+        self.db.close()
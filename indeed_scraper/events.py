@@ -0,0 +1,160 @@
+"""Structured spider events: cheap to emit, formatted only when someone reads them.
+
+Spiders report what happens as named events with fields instead of
+pre-formatted log strings::
+
+    events_for(self).debug("api_call", "📡 API Call #{n}: {url}", n=self.api_calls, url=url)
+
+Each emit:
+
+- counts the event in the ``events/<name>`` stat
+- appends the raw (time, level, event, template, fields) tuple to an
+  in-memory ring buffer of EVENTS_BUFFER_SIZE entries
+- logs it only if the spider logger is enabled for the level and the event
+  is sampled (EVENTS_SAMPLE_RATES). The message is formatted by the logging
+  handler, so a line that is filtered out is never formatted
+
+The ring buffer is written to ``<EVENTS_DIR>/<spider>-<time>.jsonl`` only
+when a run fails: it errors or is shut down (any close reason but
+"finished" and the CLOSESPIDER caps the spiders use as page limits), a
+callback raises, or an error-level event was emitted. The spiders' errbacks
+report failed requests with ``request_failed``, which is error-level except
+for requests a middleware refused on purpose (IgnoreRequest, e.g. the shared
+credit budget): those are the warning-level ``request_refused``.
+"""
+import json
+import logging
+import os
+import weakref
+from collections import Counter, deque
+from datetime import datetime, timezone
+from time import time
+
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest
+from scrapy.spidermiddlewares.httperror import HttpError
+
+from indeed_scraper.utils.runs import completed
+from indeed_scraper.utils.storage import data_dir
+
+_event_logs = weakref.WeakKeyDictionary()
+
+
+def events_for(spider):
+    """The EventLog of the spider's crawler (a detached one for spiders used outside a crawl)."""
+    crawler = getattr(spider, "crawler", None)
+    key = spider if crawler is None else crawler
+    if key not in _event_logs:
+        _event_logs[key] = EventLog(spider.logger) if crawler is None else EventLog.from_crawler(crawler, spider)
+    return _event_logs[key]
+
+
+class _Message:
+    # formats on str(), i.e. only once a handler actually emits the record
+    __slots__ = ("template", "fields")
+
+    def __init__(self, template, fields):
+        self.template = template
+        self.fields = fields
+
+    def __str__(self):
+        return _format(self.template, self.fields)
+
+
+def _format(template, fields):
+    fields = {k: v.decode("utf-8", "replace") if isinstance(v, bytes) else v for k, v in fields.items()}
+    try:
+        return template.format(**fields)
+    except (KeyError, IndexError, ValueError):
+        return f"{template} {fields}"
+
+
+class EventLog:
+    def __init__(self, logger, stats=None, sample_rates=None, buffer_size=0, directory=None):
+        self.logger = logger
+        self.stats = stats
+        self.sample_rates = sample_rates or {}
+        self.buffer = deque(maxlen=buffer_size)
+        self.directory = directory
+        self.counts = Counter()
+        self.failed = False
+
+    @classmethod
+    def from_crawler(cls, crawler, spider):
+        settings = crawler.settings
+        o = cls(
+            spider.logger,
+            crawler.stats,
+            settings.getdict("EVENTS_SAMPLE_RATES"),
+            settings.getint("EVENTS_BUFFER_SIZE"),
+            settings.get("EVENTS_DIR"),
+        )
+        crawler.signals.connect(o.spider_error, signal=signals.spider_error)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def emit(self, level, event, template, **fields):
+        self.counts[event] += 1
+        if self.stats is not None:
+            self.stats.inc_value(f"events/{event}")
+        if self.buffer.maxlen:
+            self.buffer.append((time(), level, event, template, fields))
+        if level >= logging.ERROR:
+            self.failed = True
+        if not self.logger.isEnabledFor(level):
+            return
+        rate = self.sample_rates.get(event, 1.0)
+        if rate < 1.0:
+            # deterministic: log whenever count * rate crosses the next whole number
+            n = self.counts[event]
+            if int(n * rate) == int((n - 1) * rate):
+                return
+        self.logger.log(level, _Message(template, fields), extra={"event": event, "event_fields": fields})
+
+    def debug(self, event, template, **fields):
+        self.emit(logging.DEBUG, event, template, **fields)
+
+    def info(self, event, template, **fields):
+        self.emit(logging.INFO, event, template, **fields)
+
+    def warning(self, event, template, **fields):
+        self.emit(logging.WARNING, event, template, **fields)
+
+    def error(self, event, template, **fields):
+        self.emit(logging.ERROR, event, template, **fields)
+
+    def request_failed(self, failure):
+        """Report a spider errback's failure; a deliberate refusal is not a failed run."""
+        request = getattr(failure, "request", None)
+        url = request.url if request is not None else "unknown"
+        if failure.check(IgnoreRequest) and not failure.check(HttpError):
+            self.warning("request_refused", "⛔ Request refused: {url} ({error})", url=url, error=repr(failure.value))
+        else:
+            self.error("request_failed", "❌ Request failed: {url} ({error})", url=url, error=repr(failure.value))
+
+    def spider_error(self, failure, response, spider):
+        self.error("callback_error", "💥 {error} in callback for {url}", error=repr(failure.value), url=response.url)
+
+    def spider_closed(self, spider, reason):
+        if not completed(reason) or self.failed:
+            self.dump(spider.name, reason)
+
+    def dump(self, name, reason):
+        """Write the ring buffer as JSON lines; returns the path (None if there is nothing to write)."""
+        if not self.buffer:
+            return None
+        directory = data_dir(self.directory, "events")
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = os.path.join(directory, f"{name}-{stamp}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for ts, level, event, template, fields in self.buffer:
+                record = {
+                    "time": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+                    "level": logging.getLevelName(level),
+                    "event": event,
+                    "message": _format(template, fields),
+                    **{k: v.decode("utf-8", "replace") if isinstance(v, bytes) else v for k, v in fields.items()},
+                }
+                f.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+        self.logger.warning(f"🧯 Run ended with '{reason}': last {len(self.buffer)} events written to {path}")
+        return path
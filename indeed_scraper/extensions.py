@@ -0,0 +1,204 @@
+# Project extensions
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/extensions.html
+
+import json
+import os
+from datetime import datetime, timezone
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+from indeed_scraper.metrics import (
+    LATENCY_BUCKETS,
+    SIZE_BUCKETS,
+    registry_for,
+)
+from indeed_scraper.providers import provider_for, request_credits, site_for
+from indeed_scraper.seenset import compact_set
+from indeed_scraper.sharedstore import SharedSet, store_for
+from indeed_scraper.utils.storage import data_dir
+
+DROPPED_CARDS_PREFIX = "cards/dropped/"
+# responses that cost no credits: served from a cache/checkpoint or shared with another request
+FREE_RESPONSE_FLAGS = {"cached", "coalesced"}
+
+
+class MetricsExporter:
+    """Record download/credit metrics and write them as ``<spider>.prom`` and ``<spider>.json``.
+
+    Files are written to METRICS_DIR when the spider closes and, if
+    METRICS_FLUSH_INTERVAL is set, every that many seconds during the run.
+    Parse time and items per page come from CallbackMetricsMiddleware;
+    dropped cards are read from the ``cards/dropped/<reason>`` stats the spiders keep.
+    """
+
+    def __init__(self, crawler, directory, flush_interval):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.registry = registry_for(crawler)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.flush_task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("METRICS_ENABLED"):
+            raise NotConfigured
+        directory = data_dir(settings.get("METRICS_DIR"), "metrics")
+        o = cls(crawler, directory, settings.getfloat("METRICS_FLUSH_INTERVAL"))
+        crawler.signals.connect(o.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(o.response_received, signal=signals.response_received)
+        crawler.signals.connect(o.response_downloaded, signal=signals.response_downloaded)
+        crawler.signals.connect(o.item_scraped, signal=signals.item_scraped)
+        return o
+
+    def spider_opened(self, spider):
+        if self.flush_interval > 0:
+            self.flush_task = task.LoopingCall(self.flush, spider)
+            self.flush_task.start(self.flush_interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        if self.flush_task and self.flush_task.running:
+            self.flush_task.stop()
+        self.flush(spider, reason=reason)
+
+    def response_received(self, response, request, spider):
+        labels = (("provider", provider_for(request.url)), ("site", site_for(request.url)))
+        latency = request.meta.get("download_latency")
+        if latency is not None:
+            self.registry.observe("scraper_download_latency_seconds", labels, latency, LATENCY_BUCKETS)
+        self.registry.observe("scraper_response_bytes", labels, len(response.body), SIZE_BUCKETS)
+        self.registry.inc("scraper_responses_total", labels + (("status", response.status),))
+
+    def response_downloaded(self, response, request, spider):
+        # every provider call, including render probes that never reach response_received
+        if response.status < 400 and not FREE_RESPONSE_FLAGS.intersection(response.flags):
+            self.registry.inc("scraper_credits_total", (("provider", provider_for(request.url)),), request_credits(request.url))
+
+    def item_scraped(self, item, spider):
+        self.registry.inc("scraper_items_total")
+
+    def flush(self, spider, reason=None):
+        for key, value in self.stats.get_stats().items():
+            if key.startswith(DROPPED_CARDS_PREFIX):
+                self.registry.set("scraper_cards_dropped_total", (("reason", key[len(DROPPED_CARDS_PREFIX):]),), value)
+
+        const_labels = (("spider", spider.name),)
+        self._write(f"{spider.name}.prom", self.registry.to_prometheus(const_labels))
+        snapshot = {
+            "spider": spider.name,
+            "written_at": datetime.now(timezone.utc).isoformat(),
+            "finish_reason": reason,
+            **self.registry.to_dict(),
+        }
+        self._write(f"{spider.name}.json", json.dumps(snapshot, indent=2, default=str))
+
+    def _write(self, name, content):
+        # write-then-rename so the node_exporter textfile collector never reads half a file
+        path = os.path.join(self.directory, name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+class ApiCallRefunds:
+    """Give a spider back the API call of a request the scheduler dropped as a duplicate.
+
+    ``make_api_request`` counts a call (and marks the request with an
+    ``origin``) when it builds the request; one the dupe filter then drops
+    is never sent, so it must not bring the spider closer to max_api_calls.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        o = cls(crawler.stats)
+        crawler.signals.connect(o.request_dropped, signal=signals.request_dropped)
+        return o
+
+    def request_dropped(self, request, spider):
+        if "origin" in request.meta and getattr(spider, "api_calls", 0) > 0:
+            spider.api_calls -= 1
+            self.stats.inc_value("api_calls/refunded")
+
+
+class SharedSeenSets:
+    """Swap the spider's in-memory seen-sets (SHARED_SPIDER_SETS) for views of the shared store.
+
+    With several workers on one store, a URL yielded by any of them counts as
+    seen for all of them.
+    """
+
+    def __init__(self, store, attributes):
+        self.store = store
+        self.attributes = attributes
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        store = store_for(crawler)
+        if store is None:
+            raise NotConfigured
+        o = cls(store, crawler.settings.getlist("SHARED_SPIDER_SETS"))
+        crawler.signals.connect(o.spider_opened, signal=signals.spider_opened)
+        return o
+
+    def spider_opened(self, spider):
+        for attribute in self.attributes:
+            current = getattr(spider, attribute, None)
+            if isinstance(current, set):
+                name = self.store.key(spider.name, attribute)
+                setattr(spider, attribute, SharedSet(self.store, name, current))
+
+
+class CompactSeenSets:
+    """Swap the spider's seen-sets (SEEN_SET_ATTRIBUTES) for fingerprint sets or Bloom filters.
+
+    Runs after SharedSeenSets: sets that already live in the shared store are left alone.
+    The memory each one ends up using is reported as ``seen_sets/<attribute>/bytes``.
+    """
+
+    def __init__(self, backend, attributes, error_rate, capacity, stats):
+        self.backend = backend
+        self.attributes = attributes
+        self.error_rate = error_rate
+        self.capacity = capacity
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        backend = settings.get("SEEN_SET_BACKEND")
+        if backend in (None, "", "set"):
+            raise NotConfigured
+        compact_set(backend)  # an unknown backend fails here, at startup
+        o = cls(
+            backend,
+            settings.getlist("SEEN_SET_ATTRIBUTES"),
+            settings.getfloat("SEEN_SET_ERROR_RATE"),
+            settings.getint("SEEN_SET_CAPACITY"),
+            crawler.stats,
+        )
+        crawler.signals.connect(o.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def spider_opened(self, spider):
+        for attribute in self.attributes:
+            current = getattr(spider, attribute, None)
+            if isinstance(current, set):
+                setattr(spider, attribute, compact_set(self.backend, self.error_rate, self.capacity, current))
+
+    def spider_closed(self, spider):
+        for attribute in self.attributes:
+            seen = getattr(spider, attribute, None)
+            if hasattr(seen, "nbytes"):
+                self.stats.set_value(f"seen_sets/{attribute}/keys", len(seen))
+                self.stats.set_value(f"seen_sets/{attribute}/bytes", seen.nbytes)
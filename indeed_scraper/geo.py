@@ -0,0 +1,246 @@
+"""Offline location normalization against the bundled ``gazetteer.tsv``.
+
+The boards write locations every way there is: "Hybrid work in New York, NY
+10036", "Remote in Oakland, CA, Berkeley, CA", "100% remote", "Calgary
+Alberta Canada", RemoteOK's bare country. ``normalize_location`` turns any
+of them into a ``Location``::
+
+    Location(city="New York", region="NY", country="US", remote=False, places=(Place(...), ...))
+
+``places`` holds every place the string names; ``city``/``region``/``country``
+are the values all of them share (None where they differ or are unknown),
+so "Remote in AZ, NM, TX" is country US with no region. ``remote`` is True
+for fully remote postings; hybrid ones are not.
+
+The gazetteer (countries, their main regions, a few hundred cities) is
+loaded once into a ``Gazetteer``: a sorted list of normalized names searched
+by bisection, which also answers "is any name longer than this prefix", so
+an unpunctuated "calgary alberta canada" is split on its longest known
+names. Results are memoized per distinct location string.
+"""
+import bisect
+import pkgutil
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from indeed_scraper.utils.normalize import normalize_text
+
+Place = namedtuple("Place", "city region country")
+Location = namedtuple("Location", "city region country remote places")
+GazetteerEntry = namedtuple("GazetteerEntry", "kind country region name")
+
+UNKNOWN = Location(None, None, None, False, ())
+
+REMOTE_MARKERS = ("remote", "anywhere", "worldwide", "work from home", "wfh", "distributed")
+# Words around the place names ("Hybrid Remote in", "· On-site") that are not part of them
+NOISE_WORDS = {
+    "remote", "hybrid", "work", "in", "on", "site", "onsite", "anywhere", "worldwide", "the",
+    "world", "from", "home", "wfh", "fully", "distributed", "only", "based", "and", "or",
+}
+# Kinds tried for an ambiguous bare name ("Georgia", "New York", "Delhi"), in order
+KIND_PRIORITY = ("region", "country", "city")
+
+_PARENTHESES = re.compile(r"\([^)]*\)")
+# lowercase "or"/"and" only: "OR" is Oregon
+_SEPARATORS = re.compile(r"\s*(?:[,;|/·•&]|\s-\s|\sand\s|\sor\s)\s*")
+_ISO_REGION_PREFIX = re.compile(r"\b[A-Z]{2}-(?=[A-Z][a-z])")
+
+
+class Gazetteer:
+    def __init__(self, entries):
+        names = {}
+        self.codes = {}
+        for entry, aliases in entries:
+            for name in (entry.name, *aliases):
+                key = normalize_text(name)
+                if key and entry not in names.setdefault(key, []):
+                    names[key].append(entry)
+            if entry.kind == "region":
+                self.codes.setdefault(entry.region, []).append(entry)
+        self.keys = sorted(names)
+        self.values = [tuple(names[key]) for key in self.keys]
+        self.countries = {entry.country for entry, _ in entries if entry.kind == "country"}
+
+    @classmethod
+    def from_tsv(cls, text):
+        entries = []
+        for line in text.splitlines():
+            if not line.strip() or line.startswith("#"):
+                continue
+            kind, country, region, name, *aliases = line.split("\t")
+            aliases = aliases[0].split("|") if aliases and aliases[0] else []
+            entries.append((GazetteerEntry(kind, country, region or None, name), aliases))
+        return cls(entries)
+
+    def lookup(self, name):
+        """Entries called ``name`` (any spelling that normalizes the same), best first."""
+        key = normalize_text(name)
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.values[i]
+        return ()
+
+    def longest_prefix(self, tokens, start):
+        """(end, entries) of the longest name made of tokens[start:end], or (start, ())."""
+        best = (start, ())
+        prefix = ""
+        for end in range(start + 1, len(tokens) + 1):
+            prefix = f"{prefix} {tokens[end - 1]}" if prefix else tokens[end - 1]
+            i = bisect.bisect_left(self.keys, prefix)
+            if i == len(self.keys) or not self.keys[i].startswith(prefix):
+                break  # no name goes on like this
+            if self.keys[i] == prefix:
+                best = (end, self.values[i])
+        return best
+
+    def country_code(self, value):
+        """ISO code for a country name, alias or code ("United Kingdom", "UK", "gb"), or None."""
+        if value.upper() in self.countries:
+            return value.upper()
+        return next((e.country for e in self.lookup(value) if e.kind == "country"), None)
+
+    def region(self, value, country=None):
+        """(country, region code) for a region name or code, or None."""
+        candidates = self.codes.get(value.upper(), []) + [e for e in self.lookup(value) if e.kind == "region"]
+        return next(((e.country, e.region) for e in candidates if country in (None, e.country)), None)
+
+    def city_name(self, value):
+        """The gazetteer's name for a city ("NYC" → "New York"), or None."""
+        return next((e.name for e in self.lookup(value) if e.kind == "city"), None)
+
+    # --- parsing ---
+
+    def normalize(self, value):
+        text = _PARENTHESES.sub(" ", str(value or ""))
+        words = f" {normalize_text(text)} "
+        remote = any(f" {marker} " in words for marker in REMOTE_MARKERS) and " hybrid " not in words
+        parts = [part for raw in _SEPARATORS.split(_ISO_REGION_PREFIX.sub("", text)) for part in self._parts(raw)]
+        places = []
+        for place in self._group(parts):
+            if place is not None and place not in places:
+                places.append(place)
+        if not places:
+            return Location(None, None, None, remote, ())
+        return Location(*(_shared(p[i] for p in places) for i in range(3)), remote, tuple(places))
+
+    def _parts(self, raw):
+        """(text, entries) for each place name in one separator-delimited chunk."""
+        tokens = raw.split()
+        # strip "Hybrid Remote in", "· On-site", ZIP codes; keep all-caps codes ("IN", "OR")
+        while tokens and _is_noise(tokens[0]):
+            tokens.pop(0)
+        while tokens and _is_noise(tokens[-1]):
+            tokens.pop()
+        if not tokens:
+            return []
+        text = " ".join(tokens)
+        if text.isupper() and len(text) <= 3:
+            entries = tuple(self.codes.get(text, ())) + self.lookup(text)
+            return [(text, entries)] if entries else []
+        entries = self.lookup(text)
+        if entries:
+            return [(text, entries)]
+        # "Calgary Alberta Canada": only if the whole chunk splits into known names
+        names = normalize_text(text).split()
+        parts, start = [], 0
+        while start < len(names):
+            end, entries = self.longest_prefix(names, start)
+            if not entries:
+                return [(text, ())]
+            parts.append((" ".join(names[start:end]), entries))
+            start = end
+        return parts
+
+    def _group(self, parts):
+        """Fold the parts into places: "City, Region, Country" runs, left to right."""
+        foreign = any(entries and all(e.kind == "country" and e.country != "US" for e in entries)
+                      for _, entries in parts)
+        current = {}
+        for i, (text, entries) in enumerate(parts):
+            following = parts[i + 1][1] if i + 1 < len(parts) else ()
+            kind = _kind(entries, following, foreign)
+            if kind == "country":
+                if "country" in current:
+                    yield self._place(current)
+                    current = {}
+                current["country"] = next(e.country for e in entries if e.kind == "country")
+                yield self._place(current)
+                current = {}
+            elif kind == "region":
+                if "region" in current:
+                    yield self._place(current)
+                    current = {}
+                current["region"] = [e for e in entries if e.kind == "region"]
+            elif ("city" in current and "region" not in current and not entries
+                  and any(e.kind == "country" for e in following)):
+                current["region"] = text  # "Athens, Attica, Greece": a region we do not know
+            else:
+                if current:
+                    yield self._place(current)
+                current = {"city": (text, [e for e in entries if e.kind == "city"])}
+        if current:
+            yield self._place(current)
+
+    def _place(self, current):
+        country = current.get("country")
+        regions = current.get("region") or []
+        text, cities = current.get("city", (None, []))
+        region = None
+        if isinstance(regions, str):
+            region, regions = (regions if country else None), []
+        region_entry = next((r for r in regions if country in (None, r.country)), None)
+        city = next((
+            c for c in cities
+            if country in (None, c.country)
+            and (region_entry is None or (c.country, c.region) == (region_entry.country, region_entry.region))
+        ), None)
+        if city is not None:
+            return Place(city.name, region_entry.region if region_entry else region or city.region, city.country)
+        if region_entry is not None:
+            return Place(_clean_city(text), region_entry.region, region_entry.country)
+        if country is not None:
+            return Place(_clean_city(text), region, country)
+        return None  # a name we cannot place anywhere ("Zencastr")
+
+
+def _is_noise(token):
+    if token.isdigit():
+        return True
+    return normalize_text(token) in NOISE_WORDS and not (token.isupper() and len(token) <= 3)
+
+
+def _kind(entries, following, foreign):
+    kinds = {e.kind for e in entries}
+    if not kinds:
+        return None
+    if "city" in kinds and any(e.kind in ("region", "country") for e in following):
+        return "city"  # "New York, NY", "Washington, DC"
+    if "country" in kinds and foreign:
+        return "country"  # "Cyprus, Armenia, Georgia"
+    return next(kind for kind in KIND_PRIORITY if kind in kinds)
+
+
+def _clean_city(text):
+    if not text:
+        return None
+    return text.title() if text.isupper() and len(text) > 3 else text
+
+
+def _shared(values):
+    values = set(values)
+    return values.pop() if len(values) == 1 else None
+
+
+@lru_cache(maxsize=None)
+def load_gazetteer():
+    """The bundled gazetteer, parsed and indexed once per process."""
+    return Gazetteer.from_tsv(pkgutil.get_data("indeed_scraper", "gazetteer.tsv").decode("utf-8"))
+
+
+@lru_cache(maxsize=65536)
+def normalize_location(value):
+    """Normalize one location string to a ``Location`` (memoized per distinct string)."""
+    if not value:
+        return UNKNOWN
+    return load_gazetteer().normalize(value)
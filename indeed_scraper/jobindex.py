@@ -0,0 +1,202 @@
+"""On-disk inverted index over every job we have scraped.
+
+Title, company and location tokens go into a ``postings`` table clustered by
+token, so a term lookup is a B-tree range scan. Parsed salary bounds and the
+posted date live on the ``docs`` table with their own indexes and serve as
+numeric/date side indexes for range filters.
+
+Locations are normalized against the gazetteer (``indeed_scraper.geo``):
+every place a posting names gets a row in ``places``, keyed by
+(country, region, city), so a geo filter is a prefix range scan of that key
+rather than a match on the raw location text. The shared city/region/country
+and the remote flag are kept on ``docs`` as well.
+"""
+import sqlite3
+from datetime import date
+
+from indeed_scraper.geo import normalize_location
+from indeed_scraper.utils.normalize import parse_posted, parse_salary, tokenize
+
+INDEXED_FIELDS = ("title", "company", "location")
+# Added to docs after the first release; indexes built before get them on open
+GEO_COLUMNS = {"city": "TEXT", "region": "TEXT", "country": "TEXT", "remote": "INTEGER"}
+
+
+class JobIndex:
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS docs (
+                doc_id INTEGER PRIMARY KEY,
+                key TEXT UNIQUE NOT NULL,
+                source TEXT,
+                title TEXT,
+                company TEXT,
+                location TEXT,
+                salary TEXT,
+                salary_min REAL,
+                salary_max REAL,
+                posted TEXT,
+                indexed_on TEXT,
+                city TEXT,
+                region TEXT,
+                country TEXT,
+                remote INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS docs_salary ON docs (salary_max);
+            CREATE INDEX IF NOT EXISTS docs_posted ON docs (posted);
+            CREATE TABLE IF NOT EXISTS postings (
+                token TEXT NOT NULL,
+                field TEXT NOT NULL,
+                doc_id INTEGER NOT NULL,
+                PRIMARY KEY (token, field, doc_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS places (
+                country TEXT NOT NULL,
+                region TEXT NOT NULL,
+                city TEXT NOT NULL COLLATE NOCASE,
+                doc_id INTEGER NOT NULL,
+                PRIMARY KEY (country, region, city, doc_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS places_city ON places (city);
+            CREATE INDEX IF NOT EXISTS places_doc ON places (doc_id);
+            """
+        )
+        self._add_geo_columns()
+
+    def _add_geo_columns(self):
+        columns = {row["name"] for row in self.db.execute("PRAGMA table_info(docs)")}
+        missing = [name for name in GEO_COLUMNS if name not in columns]
+        if not missing:
+            return
+        for name in missing:
+            self.db.execute(f"ALTER TABLE docs ADD COLUMN {name} {GEO_COLUMNS[name]}")
+        rows = self.db.execute("SELECT doc_id, location FROM docs").fetchall()
+        for row in rows:
+            self._set_location(row["doc_id"], row["location"])
+        self.db.commit()
+
+    def _set_location(self, doc_id, location):
+        location = normalize_location(location)
+        self.db.execute(
+            "UPDATE docs SET city = ?, region = ?, country = ?, remote = ? WHERE doc_id = ?",
+            (location.city, location.region, location.country, int(location.remote), doc_id),
+        )
+        self.db.execute("DELETE FROM places WHERE doc_id = ?", (doc_id,))
+        self.db.executemany(
+            "INSERT OR IGNORE INTO places (country, region, city, doc_id) VALUES (?, ?, ?, ?)",
+            ((place.country, place.region or "", place.city or "", doc_id) for place in location.places),
+        )
+
+    def add(self, job, source=None, today=None, backfill=False, scraped_on=None):
+        """Insert or refresh one job (a dict/ItemAdapter with the usual item fields).
+
+        A ``backfill`` job (read from a CSV) was scraped on ``scraped_on``; when
+        that is unknown, relative posted values ("Today", "9d") are left empty.
+        """
+        key = job.get("url")
+        if not key:
+            return None
+        today = today or date.today()
+        salary = job.get("salary") or job.get("salary_range") or ""
+        salary_min, salary_max = parse_salary(salary)
+        if backfill:
+            posted = parse_posted(job.get("posted"), scraped_on, relative=scraped_on is not None)
+        else:
+            posted = parse_posted(job.get("posted"), today)
+        values = (
+            source,
+            job.get("title") or "",
+            job.get("company") or "",
+            job.get("location") or "",
+            salary,
+            salary_min,
+            salary_max,
+            posted.isoformat() if posted else None,
+            today.isoformat(),
+        )
+        row = self.db.execute("SELECT doc_id FROM docs WHERE key = ?", (key,)).fetchone()
+        if row:
+            doc_id = row[0]
+            self.db.execute(
+                """
+                UPDATE docs SET source = ?, title = ?, company = ?, location = ?, salary = ?,
+                    salary_min = ?, salary_max = ?, posted = COALESCE(posted, ?), indexed_on = ?
+                WHERE doc_id = ?
+                """,
+                values + (doc_id,),
+            )
+            self.db.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        else:
+            doc_id = self.db.execute(
+                """
+                INSERT INTO docs (source, title, company, location, salary, salary_min, salary_max, posted, indexed_on, key)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                values + (key,),
+            ).lastrowid
+        self.db.executemany(
+            "INSERT OR IGNORE INTO postings (token, field, doc_id) VALUES (?, ?, ?)",
+            ((token, field, doc_id) for field in INDEXED_FIELDS for token in set(tokenize(job.get(field)))),
+        )
+        self._set_location(doc_id, job.get("location"))
+        return doc_id
+
+    def commit(self):
+        self.db.commit()
+
+    def search(self, terms=(), salary_disclosed=False, min_salary=None,
+               posted_since=None, source=None, country=None, region=None, city=None,
+               remote=None, limit=50):
+        """Return matching docs, newest first.
+
+        ``terms`` is a list of (field, text) pairs; field ``None`` matches any of
+        title/company/location. All tokens of all terms must match (AND).
+        ``country``/``region``/``city`` are gazetteer values (see ``geo``) that
+        one of the posting's places must have; ``remote`` is True/False/None.
+        """
+        postings_sql, params = [], []
+        for field, text in terms:
+            for token in tokenize(text):
+                if field:
+                    postings_sql.append("SELECT doc_id FROM postings WHERE token = ? AND field = ?")
+                    params += [token, field]
+                else:
+                    postings_sql.append("SELECT doc_id FROM postings WHERE token = ?")
+                    params.append(token)
+
+        where = []
+        if postings_sql:
+            where.append("doc_id IN (" + " INTERSECT ".join(postings_sql) + ")")
+        geo = [(column, value) for column, value in (("country", country), ("region", region), ("city", city)) if value]
+        if geo:
+            where.append("doc_id IN (SELECT doc_id FROM places WHERE " + " AND ".join(f"{c} = ?" for c, _ in geo) + ")")
+            params += [value for _, value in geo]
+        if remote is not None:
+            where.append("remote = ?")
+            params.append(int(remote))
+        if salary_disclosed:
+            where.append("salary_max IS NOT NULL")
+        if min_salary is not None:
+            where.append("salary_max >= ?")
+            params.append(min_salary)
+        if posted_since is not None:
+            where.append("posted >= ?")
+            params.append(posted_since.isoformat())
+        if source:
+            where.append("source = ?")
+            params.append(source)
+
+        sql = "SELECT * FROM docs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY posted DESC, doc_id DESC LIMIT ?"
+        params.append(limit)
+        return self.db.execute(sql, params).fetchall()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
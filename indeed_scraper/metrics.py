@@ -0,0 +1,118 @@
+"""Per-crawler metric registry with Prometheus textfile and JSON renderers.
+
+The registry is shared between the MetricsExporter extension (downloads,
+credits, export) and CallbackMetricsMiddleware (parse time, items per page);
+both look it up with ``registry_for(crawler)``.
+"""
+import bisect
+import math
+import weakref
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000)
+PARSE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 30, 50, 100)
+
+HELP = {
+    "scraper_download_latency_seconds": "Download latency reported by Scrapy, per provider and target site",
+    "scraper_response_bytes": "Response body size, per provider and target site",
+    "scraper_responses_total": "Responses received, per provider, target site and status",
+    "scraper_credits_total": "Provider credits spent (estimated from request parameters)",
+    "scraper_parse_seconds": "Time spent inside spider callbacks",
+    "scraper_items_per_page": "Items yielded per response, per callback",
+    "scraper_cards_dropped_total": "Job cards skipped by the parse loops, per reason",
+    "scraper_items_total": "Items scraped",
+}
+
+_registries = weakref.WeakKeyDictionary()
+
+
+def registry_for(crawler):
+    if crawler not in _registries:
+        _registries[crawler] = MetricsRegistry()
+    return _registries[crawler]
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, labels=(), value=1):
+        key = (name, tuple(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, labels=(), value=0):
+        self.counters[(name, tuple(labels))] = value
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, tuple(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def to_prometheus(self, const_labels=()):
+        lines, seen = [], set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_labels(const_labels + labels)} {value}")
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            header(name, "histogram")
+            base = const_labels + labels
+            for bound, total in histogram.cumulative():
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                lines.append(f"{name}_bucket{_labels(base + (('le', le),))} {total}")
+            lines.append(f"{name}_sum{_labels(base)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(base)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        counters, histograms = {}, {}
+        for (name, labels), value in self.counters.items():
+            counters.setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), histogram in self.histograms.items():
+            histograms.setdefault(name, []).append({
+                "labels": dict(labels),
+                "buckets": {("+Inf" if b == math.inf else b): n for b, n in histogram.cumulative()},
+                "sum": histogram.sum,
+                "count": histogram.count,
+                "mean": histogram.sum / histogram.count if histogram.count else None,
+            })
+        return {"counters": counters, "histograms": histograms}
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
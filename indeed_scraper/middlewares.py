@@ -3,10 +3,17 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+from time import perf_counter
+
 from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
 
 # useful for handling different item types with a single interface
-from itemadapter import ItemAdapter
+from itemadapter import ItemAdapter, is_item
+
+from indeed_scraper.metrics import COUNT_BUCKETS, PARSE_BUCKETS, registry_for
+from indeed_scraper.providers import provider_for, request_credits
+from indeed_scraper.sharedstore import store_for
 
 
 class IndeedScraperSpiderMiddleware:
@@ -98,3 +105,94 @@ class IndeedScraperDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info("Spider opened: %s" % spider.name)
+
+
+def callback_name(response):
+    callback = getattr(response.request, "callback", None) if response.request else None
+    return getattr(callback, "__name__", None) or "parse"
+
+
+class CallbackMetricsMiddleware:
+    # Times each spider callback (only the time spent inside the callback's own
+    # generator, not downstream middlewares/pipelines) and counts the items it
+    # yields per response. Results go to the registry MetricsExporter writes out.
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("METRICS_ENABLED"):
+            raise NotConfigured
+        return cls(registry_for(crawler))
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def process_spider_output(self, response, result, spider):
+        labels = (("callback", callback_name(response)),)
+        elapsed, items = 0.0, 0
+        iterator = iter(result)
+        while True:
+            started = perf_counter()
+            try:
+                output = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                elapsed += perf_counter() - started
+            if is_item(output):
+                items += 1
+            yield output
+        self._record(labels, elapsed, items)
+
+    async def process_spider_output_async(self, response, result, spider):
+        labels = (("callback", callback_name(response)),)
+        elapsed, items = 0.0, 0
+        iterator = result.__aiter__()
+        while True:
+            started = perf_counter()
+            try:
+                output = await iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                elapsed += perf_counter() - started
+            if is_item(output):
+                items += 1
+            yield output
+        self._record(labels, elapsed, items)
+
+    def _record(self, labels, elapsed, items):
+        self.registry.observe("scraper_parse_seconds", labels, elapsed, PARSE_BUCKETS)
+        self.registry.observe("scraper_items_per_page", labels, items, COUNT_BUCKETS)
+
+
+class SharedBudgetMiddleware:
+    """Reserve each provider request's credits against SHARED_CREDIT_BUDGET before it goes out.
+
+    The budget is one counter in the shared store, so it caps all workers (and
+    all spiders) using that store together; each spider's max_api_calls still
+    applies per process.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        store = store_for(crawler)
+        budget = crawler.settings.getint("SHARED_CREDIT_BUDGET")
+        if store is None or budget <= 0:
+            raise NotConfigured
+        return cls(store, budget, crawler.stats)
+
+    def __init__(self, store, budget, stats):
+        self.store = store
+        self.budget = budget
+        self.stats = stats
+        self.key = store.key("credits")
+
+    def process_request(self, request, spider):
+        if provider_for(request.url) == "direct":
+            return None
+        credits = request_credits(request.url)
+        if self.store.incr(self.key, credits, limit=self.budget) is None:
+            self.stats.inc_value("shared/budget/refused")
+            raise IgnoreRequest(f"Shared credit budget exhausted ({self.budget} credits)")
+        self.stats.inc_value("shared/budget/credits", credits)
+        return None
@@ -0,0 +1,215 @@
+"""A local stand-in for ScraperAPI, ZenRows and ScrapingBee, for offline and load testing.
+
+``MockProvider`` is a Twisted web resource that answers the providers' query
+interfaces under one prefix each::
+
+    /scraperapi/?api_key=...&url=...
+    /zenrows/v1/?apikey=...&url=...
+    /scrapingbee/api/v1/?api_key=...&url=...
+
+It serves the fixture page for the target's site (``fixtures/<site>.html``).
+``{{key}}`` in a fixture becomes a hash of the target URL, so every query gets
+its own job URLs, and ``{{today}}``/``{{now}}`` become the current date/time.
+Each response is delayed by a latency sampled from a distribution, with extra
+latency for rendered requests. A share of requests fail (500, no credits) or
+come back blocked (a challenge page without cards), as do base-tier fetches of
+sites that only list jobs after JavaScript has run (``render_required``). Past the per-provider
+concurrency limit the server answers 429, like the real APIs. Responses are
+gzip-compressed for clients that send ``Accept-Encoding: gzip``.
+
+With MOCK_PROVIDER_URL set, the project's download handler
+(``connections.ProviderDownloadHandler``) sends every provider request to
+the mock server. Request and response keep the real
+provider URL, so fingerprints, budgets and metrics behave as in production.
+Start a server with ``scrapy mockprovider``, or let ``scrapy loadtest`` run
+one in-process.
+"""
+import hashlib
+import json
+import math
+import os
+import random
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlencode, urlsplit
+
+from twisted.web import resource, server
+
+from indeed_scraper.providers import PROVIDER_HOSTS, provider_for, request_credits, request_tier, site_for
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+API_KEY_PARAMS = {"scraperapi": "api_key", "zenrows": "apikey", "scrapingbee": "api_key"}
+COST_HEADERS = {"zenrows": "X-Request-Cost", "scrapingbee": "Spb-cost"}  # ScraperAPI sends none
+_HOSTS = {provider: host for host, provider in PROVIDER_HOSTS.items()}
+
+
+def latency_distribution(spec, rng=random):
+    """Sampler for a latency spec in seconds.
+
+    ``fixed:S``, ``uniform:LO,HI``, ``exp:MEAN`` or ``lognormal:MEDIAN,SIGMA``.
+    """
+    kind, _, args = spec.partition(":")
+    try:
+        values = [float(v) for v in args.split(",")] if args else []
+    except ValueError:
+        raise ValueError(f"Bad latency spec: {spec!r}")
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: rng.uniform(*values)
+    if kind == "exp" and len(values) == 1 and values[0] > 0:
+        return lambda: rng.expovariate(1 / values[0])
+    if kind == "lognormal" and len(values) == 2 and values[0] > 0:
+        mu = math.log(values[0])
+        return lambda: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Bad latency spec: {spec!r}")
+
+
+def load_fixtures(directory=None):
+    """``{site: page template}`` from ``<site>.html`` files, plus ``blocked.html``."""
+    directory = directory or FIXTURES_DIR
+    pages = {}
+    for name in os.listdir(directory):
+        if name.endswith(".html"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                pages[name[:-5]] = f.read()
+    return pages
+
+
+def mock_url(base, url):
+    """``url`` (a provider API URL) as served by the mock server at ``base``."""
+    parts = urlsplit(url)
+    return f"{base}/{provider_for(url)}{parts.path}?{parts.query}"
+
+
+class MockProvider(resource.Resource):
+    isLeaf = True
+
+    def __init__(self, latency="lognormal:0.3,0.5", render_latency="lognormal:1.5,0.4", error_rate=0.0,
+                 block_rate=0.0, concurrency=0, fixtures_dir=None, render_required=(), seed=None):
+        super().__init__()
+        self.random = random.Random(seed)
+        self.latency = latency_distribution(latency, self.random)
+        self.render_latency = latency_distribution(render_latency, self.random)
+        self.error_rate = error_rate
+        self.block_rate = block_rate
+        self.concurrency = concurrency
+        self.render_required = set(render_required)
+        self.pages = load_fixtures(fixtures_dir)
+        self.blocked_page = self.pages.pop("blocked", "<html><body>Access denied</body></html>")
+        self.active = Counter()
+        self.stats = Counter()
+
+    def page(self, target):
+        template = self.pages.get(site_for(target))
+        if template is None:
+            return None
+        now = datetime.now(timezone.utc)
+        return (
+            template.replace("{{key}}", hashlib.sha1(target.encode()).hexdigest()[:10])
+            .replace("{{today}}", now.strftime("%Y-%m-%d"))
+            .replace("{{now}}", now.strftime("%Y-%m-%dT%H:%M:%SZ"))
+        )
+
+    def render_GET(self, request):
+        path = request.path.decode()
+        if path == "/_stats":
+            request.setHeader(b"Content-Type", b"application/json")
+            return json.dumps({"active": dict(self.active), **self.stats}).encode()
+
+        provider, _, rest = path.lstrip("/").partition("/")
+        params = {k.decode(): v[-1].decode() for k, v in request.args.items()}
+        if provider not in API_KEY_PARAMS:
+            return self._refuse(request, provider, 404, "unknown provider")
+        if not params.get(API_KEY_PARAMS[provider]):
+            return self._refuse(request, provider, 401, "missing API key")
+        if not params.get("url"):
+            return self._refuse(request, provider, 400, "missing url parameter")
+        if self.concurrency and self.active[provider] >= self.concurrency:
+            return self._refuse(request, provider, 429, "concurrency limit reached")
+
+        # price and time the request as the real provider would
+        api_url = f"https://{_HOSTS[provider]}/{rest}?{urlencode(params)}"
+        rendered = "render" in request_tier(api_url)
+        delay = self.latency() + (self.render_latency() if rendered else 0)
+
+        roll = self.random.random()
+        credits = request_credits(api_url)
+        if roll < self.error_rate:
+            status, body, credits = 500, "provider error", 0
+        elif roll < self.error_rate + self.block_rate or (not rendered and site_for(params["url"]) in self.render_required):
+            status, body = 200, self.blocked_page
+            self.stats["blocked"] += 1
+        else:
+            body = self.page(params["url"])
+            status = 200 if body is not None else 404
+            if body is None:
+                body, credits = "no fixture for this site", 0
+
+        from twisted.internet import reactor
+
+        self.active[provider] += 1
+        call = reactor.callLater(max(0.0, delay), self._respond, request, provider, status, body, credits)
+        request.notifyFinish().addBoth(self._finished, provider, call)
+        return server.NOT_DONE_YET
+
+    def _refuse(self, request, provider, status, message):
+        self.stats[f"{provider}/{status}"] += 1
+        request.setResponseCode(status)
+        return json.dumps({"error": message}).encode()
+
+    def _respond(self, request, provider, status, body, credits):
+        self.stats[f"{provider}/{status}"] += 1
+        self.stats["credits"] += credits
+        request.setResponseCode(status)
+        request.setHeader(b"Content-Type", b"text/html; charset=utf-8")
+        if provider in COST_HEADERS:
+            request.setHeader(COST_HEADERS[provider], str(credits))
+        request.write(body.encode())
+        request.finish()
+
+    def _finished(self, result, provider, call):
+        self.active[provider] -= 1
+        if call.active():
+            # the client went away before the response was due
+            call.cancel()
+
+
+def listen(mock, port=0, interface="127.0.0.1"):
+    """Serve ``mock`` on the running reactor; returns the listening port."""
+    from twisted.internet import reactor
+
+    # gzip-encoded when the client accepts it, like the real APIs
+    site = server.Site(resource.EncodingResourceWrapper(mock, [server.GzipEncoderFactory()]))
+    site.noisy = False
+    return reactor.listenTCP(port, site, backlog=1024, interface=interface)
+
+
+def add_mock_options(parser):
+    """Mock server options shared by ``scrapy mockprovider`` and ``scrapy loadtest``."""
+    parser.add_argument("--latency", default="lognormal:0.3,0.5",
+                        help="response latency: fixed:S, uniform:LO,HI, exp:MEAN or lognormal:MEDIAN,SIGMA (default: %(default)s)")
+    parser.add_argument("--render-latency", default="lognormal:1.5,0.4",
+                        help="extra latency for rendered requests, same forms (default: %(default)s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failing with 500 (default: 0)")
+    parser.add_argument("--block-rate", type=float, default=0.0, help="share of requests answered with a challenge page (default: 0)")
+    parser.add_argument("--provider-concurrency", type=int, default=0,
+                        help="concurrent requests per provider before 429s, 0 = unlimited (default: 0)")
+    parser.add_argument("--fixtures", metavar="DIR", help="directory of <site>.html pages (default: the bundled fixtures)")
+    parser.add_argument("--render-required", action="append", default=[], metavar="SITE",
+                        help="site whose pages have no cards unless rendered, e.g. remote.co (repeatable)")
+    parser.add_argument("--seed", type=int, help="random seed, for repeatable runs")
+
+
+def mock_from_options(opts):
+    return MockProvider(
+        latency=opts.latency,
+        render_latency=opts.render_latency,
+        error_rate=opts.error_rate,
+        block_rate=opts.block_rate,
+        concurrency=opts.provider_concurrency,
+        fixtures_dir=opts.fixtures,
+        render_required=opts.render_required,
+        seed=opts.seed,
+    )
@@ -0,0 +1,98 @@
+"""Opt-in parsing in a process pool, off the reactor thread (PARSE_OFFLOAD_ENABLED).
+
+A spider lists the pure extraction step of its callbacks::
+
+    offload_extractors = {"parse": spec_extractor("remote_co")}
+
+Each value is a picklable ``f(body, url, encoding)``. ``ParseOffloadMiddleware``
+runs it in a worker process on every response headed for that callback and
+stores the result in ``request.meta["offloaded"]``. The reactor keeps
+downloading meanwhile. At most PARSE_OFFLOAD_MAX_INFLIGHT pages are in the
+pool at once; further responses wait for a slot. The callback picks the
+result up with ``offloaded()``, which runs the extraction inline instead when
+offloading is off or the worker failed::
+
+    page = offloaded(response, SPEC.extract, response)
+
+Only the extraction moves. Dedup, stats and pagination stay in the callback,
+on the spider's own state.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import TextResponse
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet.defer import Deferred, DeferredSemaphore
+
+
+def offloaded(response, extract, *args):
+    """The result a worker computed for ``response``, else ``extract(*args)`` computed here."""
+    result = response.meta.pop("offloaded", None)
+    return result if result is not None else extract(*args)
+
+
+def _deferred_from_future(future):
+    from twisted.internet import reactor
+
+    d = Deferred()
+
+    def done(f):
+        error = f.exception()
+        if error is not None:
+            reactor.callFromThread(d.errback, error)
+        else:
+            reactor.callFromThread(d.callback, f.result())
+
+    future.add_done_callback(done)
+    return d
+
+
+class ParseOffloadMiddleware:
+    # Downloader middleware at a low order, so that it sees a response last:
+    # after render escalation has kept it and the checkpoint has saved it.
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("PARSE_OFFLOAD_ENABLED"):
+            raise NotConfigured
+        workers = settings.getint("PARSE_OFFLOAD_WORKERS") or os.cpu_count() or 1
+        o = cls(workers, settings.getint("PARSE_OFFLOAD_MAX_INFLIGHT") or 2 * workers, crawler.stats)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def __init__(self, workers, max_inflight, stats):
+        self.pool = ProcessPoolExecutor(workers)
+        self.slots = DeferredSemaphore(max_inflight)
+        self.stats = stats
+
+    def extractor_for(self, request, spider):
+        extractors = getattr(spider, "offload_extractors", None)
+        callback = request.callback
+        # a rendered re-fetch answers its probe's request: that one is parsed on the way up
+        if request.meta.get("render_escalated"):
+            return None
+        if not extractors or callback is None or getattr(callback, "__self__", None) is not spider:
+            return None
+        return extractors.get(callback.__name__)
+
+    async def process_response(self, request, response, spider):
+        extract = self.extractor_for(request, spider)
+        if extract is None or not isinstance(response, TextResponse) or response.status >= 400:
+            return response
+        await maybe_deferred_to_future(self.slots.acquire())
+        try:
+            future = self.pool.submit(extract, response.body, response.url, response.encoding)
+            request.meta["offloaded"] = await maybe_deferred_to_future(_deferred_from_future(future))
+            self.stats.inc_value("offload/pages")
+        except Exception as e:
+            # the callback parses it inline instead
+            self.stats.inc_value(f"offload/errors/{type(e).__name__}")
+        finally:
+            self.slots.release()
+        return response
+
+    def spider_closed(self, spider):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -4,10 +4,203 @@
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
 
+import os
+
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from indeed_scraper.aggregates import Aggregates
+from indeed_scraper.changelog import ChangeLog, search_key
+from indeed_scraper.dedup import LSHIndex, cluster_id_for
+from indeed_scraper.geo import load_gazetteer, normalize_location
+from indeed_scraper.jobindex import JobIndex
+from indeed_scraper.utils.storage import data_dir, data_file
 
 
 class IndeedScraperPipeline:
     def process_item(self, item, spider):
         return item
+
+
+class LocationPipeline:
+    """Add ``city``/``region``/``country``/``remote`` columns normalized from ``location`` (LOCATION_NORMALIZE_ENABLED)."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("LOCATION_NORMALIZE_ENABLED"):
+            raise NotConfigured
+        load_gazetteer()  # index it now rather than on the first item
+        return cls(crawler.stats)
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        location = normalize_location(adapter.get("location"))
+        adapter["city"] = location.city or ""
+        adapter["region"] = location.region or ""
+        adapter["country"] = location.country or ""
+        adapter["remote"] = location.remote
+        self.stats.inc_value("location/placed" if location.places else "location/unplaced")
+        if location.remote:
+            self.stats.inc_value("location/remote")
+        return item
+
+
+class NearDuplicatePipeline:
+    """Tag each item with a ``cluster_id`` shared by near-duplicates across boards (DEDUP_ENABLED)."""
+
+    def __init__(self, path, threshold):
+        self.path = path
+        self.threshold = threshold
+        self.index = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("DEDUP_ENABLED"):
+            raise NotConfigured
+        path = data_file(settings.get("DEDUP_INDEX_PATH"), "dedup.sqlite")
+        return cls(path, settings.getfloat("DEDUP_THRESHOLD"))
+
+    def open_spider(self, spider):
+        self.index = LSHIndex(self.path, threshold=self.threshold)
+
+    def close_spider(self, spider):
+        self.index.close()
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        key = adapter.get("url")
+        if key:
+            cluster_id = self.index.add(
+                key,
+                adapter.get("title"),
+                adapter.get("company"),
+                adapter.get("location"),
+                source=spider.name,
+            )
+            adapter["cluster_id"] = cluster_id
+            if cluster_id != cluster_id_for(key):
+                spider.crawler.stats.inc_value("dedup/near_duplicates")
+        return item
+
+
+class SearchIndexPipeline:
+    """Keep the local search index (``scrapy search``) up to date as items land (SEARCH_INDEX_ENABLED)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.index = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("SEARCH_INDEX_ENABLED"):
+            raise NotConfigured
+        return cls(data_file(settings.get("SEARCH_INDEX_PATH"), "jobs_index.sqlite"))
+
+    def open_spider(self, spider):
+        self.index = JobIndex(self.path)
+
+    def close_spider(self, spider):
+        self.index.close()
+
+    def process_item(self, item, spider):
+        if self.index.add(ItemAdapter(item), source=spider.name):
+            self.index.commit()
+            spider.crawler.stats.inc_value("search_index/items")
+        return item
+
+
+class AggregatesPipeline:
+    """Fold each new posting into the aggregate tables read by ``scrapy report`` (AGGREGATES_ENABLED)."""
+
+    def __init__(self, path, accuracy, flush_items, stats):
+        self.path = path
+        self.accuracy = accuracy
+        self.flush_items = flush_items
+        self.stats = stats
+        self.aggregates = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("AGGREGATES_ENABLED"):
+            raise NotConfigured
+        return cls(
+            data_file(settings.get("AGGREGATES_PATH"), "aggregates.sqlite"),
+            settings.getfloat("AGGREGATES_SKETCH_ACCURACY"),
+            max(1, settings.getint("AGGREGATES_FLUSH_ITEMS")),
+            crawler.stats,
+        )
+
+    def open_spider(self, spider):
+        self.aggregates = Aggregates(self.path, self.accuracy)
+
+    def close_spider(self, spider):
+        self.aggregates.close()
+
+    def process_item(self, item, spider):
+        if self.aggregates.add(ItemAdapter(item), source=spider.name):
+            self.stats.inc_value("aggregates/items")
+            if self.stats.get_value("aggregates/items") % self.flush_items == 0:
+                self.aggregates.flush()
+        return item
+
+
+class ChangelogPipeline:
+    """Append each run's new, updated and expired postings to <spider>[.<search>].changes.jsonl (CHANGELOG_ENABLED)."""
+
+    def __init__(self, directory, expire_runs, stats, crawl=None, worker=None, workers=None, partial=False):
+        self.directory = directory
+        self.expire_runs = expire_runs
+        self.partial = partial
+        self.stats = stats
+        self.crawl = crawl
+        self.worker = worker
+        self.workers = workers
+        self.changelog = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("CHANGELOG_ENABLED"):
+            raise NotConfigured
+        shared = settings.get("SHARED_STORE_URL") and settings.get("SHARED_RUN_ID")
+        o = cls(
+            data_dir(settings.get("CHANGELOG_DIR"), "changelog"),
+            settings.getint("CHANGELOG_EXPIRE_RUNS"),
+            crawler.stats,
+            crawl=settings.get("SHARED_RUN_ID") if shared else None,
+            worker=settings.get("SHARED_WORKER") or os.getpid(),
+            workers=settings.getint("SHARED_WORKERS") or None,
+            partial=not settings.getbool("CHANGELOG_EXPIRE"),
+        )
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def open_spider(self, spider):
+        name = search_key(spider)
+        self.changelog = ChangeLog(
+            os.path.join(self.directory, f"{name}.sqlite"),
+            os.path.join(self.directory, f"{name}.changes.jsonl"),
+            self.expire_runs,
+            crawl=self.crawl,
+            workers=self.workers,
+            partial=self.partial,
+        )
+
+    def spider_closed(self, spider, reason):
+        # close_spider() is not told why the spider closed; expiry depends on it
+        counts = self.changelog.close(reason, self.worker)
+        self.stats.set_value("changelog/run", self.changelog.run)
+        for op, count in counts.items():
+            self.stats.set_value(f"changelog/{op}", count)
+
+    def process_item(self, item, spider):
+        self.changelog.add(ItemAdapter(item))
+        return item
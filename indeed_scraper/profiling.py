@@ -0,0 +1,269 @@
+"""Opt-in profiling of spider callbacks and item pipeline stages (PROFILING_ENABLED).
+
+Every callback invocation and pipeline ``process_item`` call is timed with
+``perf_counter``. A PROFILING_SAMPLE_RATE fraction of them additionally runs
+under ``cProfile`` and, with PROFILING_TRACEMALLOC, a tracemalloc snapshot
+diff. Reports are written per callback/stage to PROFILING_DIR when the
+spider closes. With profiling disabled none of this is installed.
+"""
+import cProfile
+import inspect
+import io
+import json
+import os
+import pstats
+import random
+import tracemalloc
+import weakref
+from collections import deque
+from time import perf_counter
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.pipelines import ItemPipelineManager
+from scrapy.utils.defer import deferred_f_from_coro_f
+from twisted.internet.defer import Deferred
+
+from indeed_scraper.middlewares import callback_name
+from indeed_scraper.utils.storage import data_dir
+
+_profilers = weakref.WeakKeyDictionary()
+
+
+def profiler_for(crawler):
+    """The crawler's Profiler, or None when profiling is off."""
+    if not crawler.settings.getbool("PROFILING_ENABLED"):
+        return None
+    if crawler not in _profilers:
+        _profilers[crawler] = Profiler.from_crawler(crawler)
+    return _profilers[crawler]
+
+
+class _Stage:
+    __slots__ = ("calls", "total", "max", "sampled", "profile", "allocations")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.sampled = 0
+        self.profile = None
+        self.allocations = {}
+
+    def record(self, elapsed):
+        self.calls += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+
+class Profiler:
+    def __init__(self, directory, sample_rate, use_tracemalloc, top_n):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.use_tracemalloc = use_tracemalloc
+        self.top_n = top_n
+        self.stages = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        o = cls(
+            data_dir(settings.get("PROFILING_DIR"), "profiles"),
+            settings.getfloat("PROFILING_SAMPLE_RATE"),
+            settings.getbool("PROFILING_TRACEMALLOC"),
+            settings.getint("PROFILING_TOP_N"),
+        )
+        crawler.signals.connect(o.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def stage(self, kind, name):
+        key = (kind, name)
+        if key not in self.stages:
+            self.stages[key] = _Stage()
+        return self.stages[key]
+
+    def sample(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _start_sample(self, stage):
+        stage.sampled += 1
+        if stage.profile is None:
+            stage.profile = cProfile.Profile()
+        snapshot = tracemalloc.take_snapshot() if self.use_tracemalloc and tracemalloc.is_tracing() else None
+        return snapshot
+
+    def _finish_sample(self, stage, snapshot):
+        if snapshot is None:
+            return
+        for diff in tracemalloc.take_snapshot().compare_to(snapshot, "lineno")[: self.top_n]:
+            where = str(diff.traceback)
+            stage.allocations[where] = stage.allocations.get(where, 0) + diff.size_diff
+
+    def wrap_callback_output(self, name, result):
+        """Re-yield a callback's output, timing (and maybe profiling) only the callback's own work."""
+        stage = self.stage("callback", name)
+        sampled = self.sample()
+        snapshot = self._start_sample(stage) if sampled else None
+        elapsed = 0.0
+        iterator = iter(result)
+        try:
+            while True:
+                if sampled:
+                    stage.profile.enable()
+                started = perf_counter()
+                try:
+                    output = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += perf_counter() - started
+                    if sampled:
+                        stage.profile.disable()
+                yield output
+        finally:
+            stage.record(elapsed)
+            if sampled:
+                self._finish_sample(stage, snapshot)
+
+    async def wrap_callback_output_async(self, name, result):
+        # Only the time spent inside the callback counts; sampling is skipped
+        # because a profiler left enabled across awaits would capture the reactor.
+        stage = self.stage("callback", name)
+        elapsed = 0.0
+        iterator = result.__aiter__()
+        try:
+            while True:
+                started = perf_counter()
+                try:
+                    output = await iterator.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    elapsed += perf_counter() - started
+                yield output
+        finally:
+            stage.record(elapsed)
+
+    def wrap_pipeline(self, pipe):
+        name = type(pipe).__name__
+        process_item = pipe.process_item
+        # as for async callbacks, coroutine stages are timed but never sampled:
+        # their work runs after process_item() returns, outside the profiler
+        coroutine = inspect.iscoroutinefunction(process_item)
+
+        def timed_process_item(item, spider):
+            stage = self.stage("pipeline", name)
+            sampled = not coroutine and self.sample()
+            snapshot = self._start_sample(stage) if sampled else None
+            started = perf_counter()
+            if sampled:
+                stage.profile.enable()
+            try:
+                result = process_item(item, spider)
+            finally:
+                if sampled:
+                    stage.profile.disable()
+            if isinstance(result, Deferred):
+                # async stages: wall time until the Deferred fires; the profile covers the synchronous part
+                def done(value):
+                    stage.record(perf_counter() - started)
+                    if sampled:
+                        self._finish_sample(stage, snapshot)
+                    return value
+
+                return result.addBoth(done)
+            if inspect.isawaitable(result):
+                async def awaited():
+                    try:
+                        return await result
+                    finally:
+                        stage.record(perf_counter() - started)
+                        if sampled:
+                            self._finish_sample(stage, snapshot)
+
+                return awaited()
+            stage.record(perf_counter() - started)
+            if sampled:
+                self._finish_sample(stage, snapshot)
+            return result
+
+        return timed_process_item
+
+    def spider_opened(self, spider):
+        if self.use_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+
+    def spider_closed(self, spider, reason):
+        summary = {}
+        for (kind, name), stage in sorted(self.stages.items()):
+            summary[f"{kind}:{name}"] = {
+                "calls": stage.calls,
+                "total_seconds": stage.total,
+                "mean_seconds": stage.total / stage.calls if stage.calls else None,
+                "max_seconds": stage.max,
+                "sampled": stage.sampled,
+            }
+            self._write_report(spider, kind, name, stage)
+        with open(os.path.join(self.directory, f"{spider.name}.summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        if self.use_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _write_report(self, spider, kind, name, stage):
+        lines = [
+            f"{kind} {name} ({spider.name})",
+            f"calls={stage.calls} total={stage.total:.4f}s "
+            f"mean={stage.total / max(stage.calls, 1) * 1000:.2f}ms max={stage.max * 1000:.2f}ms "
+            f"sampled={stage.sampled}",
+            "",
+        ]
+        if stage.profile is not None:
+            out = io.StringIO()
+            pstats.Stats(stage.profile, stream=out).sort_stats("cumulative").print_stats(self.top_n)
+            lines += ["cProfile (sampled calls, cumulative):", out.getvalue()]
+        if stage.allocations:
+            lines.append("tracemalloc (sampled calls, net bytes allocated by line):")
+            top = sorted(stage.allocations.items(), key=lambda kv: -abs(kv[1]))[: self.top_n]
+            lines += [f"  {size:>12,d}  {where}" for where, size in top]
+        path = os.path.join(self.directory, f"{spider.name}.{kind}.{name}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+class ProfilingMiddleware:
+    # Spider middleware that hands each callback's output to the Profiler.
+    # Keep it at a high order so it sits right next to the spider.
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        profiler = profiler_for(crawler)
+        if profiler is None:
+            raise NotConfigured
+        return cls(profiler)
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def process_spider_output(self, response, result, spider):
+        return self.profiler.wrap_callback_output(callback_name(response), result)
+
+    def process_spider_output_async(self, response, result, spider):
+        return self.profiler.wrap_callback_output_async(callback_name(response), result)
+
+
+class ProfilingItemPipelineManager(ItemPipelineManager):
+    """ITEM_PROCESSOR that times every pipeline's process_item when profiling is on."""
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        manager = super().from_crawler(crawler)
+        profiler = profiler_for(crawler)
+        if profiler is not None:
+            manager.methods["process_item"] = deque(
+                deferred_f_from_coro_f(profiler.wrap_pipeline(pipe))
+                for pipe in manager.middlewares
+                if hasattr(pipe, "process_item")
+            )
+        return manager
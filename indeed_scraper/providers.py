@@ -0,0 +1,102 @@
+"""What we know about the proxy APIs the spiders go through.
+
+Every spider builds provider URLs with the real target in a ``url`` query
+parameter. The helpers here recover the provider, the target page and the
+credit cost from such a URL, so that stats, budgets and dedup can reason
+about the page actually fetched rather than the API endpoint.
+"""
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+PROVIDER_HOSTS = {
+    "api.scraperapi.com": "scraperapi",
+    "api.zenrows.com": "zenrows",
+    "app.scrapingbee.com": "scrapingbee",
+}
+
+# Credits charged per successful request, by provider and feature flags.
+# Figures come from each provider's public pricing page.
+CREDIT_COSTS = {
+    "scraperapi": {"base": 1, "render": 10, "premium": 10, "premium+render": 25, "ultra_premium": 30, "ultra_premium+render": 75},
+    "zenrows": {"base": 1, "render": 5, "premium": 10, "premium+render": 25},
+    "scrapingbee": {"base": 1, "render": 5, "premium": 10, "premium+render": 25},
+    "direct": {"base": 0},
+}
+
+# Typical seconds per request by pricing tier, for planning a crawl before any
+# latency has been recorded (rendered pages wait on a headless browser).
+TYPICAL_LATENCY_SECONDS = {
+    "base": 4, "render": 15, "premium": 8, "premium+render": 25, "ultra_premium": 12, "ultra_premium+render": 30,
+}
+
+_TRUE = {"true", "1", "yes"}
+
+# Parameters that buy a provider's expensive tiers (JS rendering, premium IPs,
+# browser waits), and the values that switch them off for a base-tier fetch.
+# ZenRows only accepts proxy_country together with premium_proxy.
+EXPENSIVE_PARAMS = {
+    "scraperapi": {"render": "false", "premium": "false", "ultra_premium": None},
+    "zenrows": {"js_render": None, "premium_proxy": None, "wait": None, "wait_for": None, "js_instructions": None, "proxy_country": None},
+    "scrapingbee": {"render_js": "false", "premium_proxy": None, "stealth_proxy": None, "wait": None, "wait_for": None},
+}
+
+
+def provider_for(url):
+    return PROVIDER_HOSTS.get(urlsplit(url).hostname or "", "direct")
+
+
+def provider_params(url):
+    return dict(parse_qsl(urlsplit(url).query, keep_blank_values=True))
+
+
+def target_url(url):
+    """The page a provider URL fetches (the URL itself for direct requests)."""
+    if provider_for(url) == "direct":
+        return url
+    return provider_params(url).get("url", url)
+
+
+def site_for(url):
+    host = urlsplit(target_url(url)).hostname or ""
+    return host[4:] if host.startswith("www.") else host
+
+
+def request_tier(url):
+    """Pricing tier of a provider URL: base, render, premium, premium+render, ..."""
+    provider = provider_for(url)
+    if provider == "direct":
+        return "base"
+    params = {k: v.lower() for k, v in provider_params(url).items()}
+    if provider == "scraperapi":
+        render = params.get("render") in _TRUE
+        premium = "ultra_premium" if params.get("ultra_premium") in _TRUE else (
+            "premium" if params.get("premium") in _TRUE else None
+        )
+    elif provider == "zenrows":
+        render = params.get("js_render") in _TRUE
+        premium = "premium" if params.get("premium_proxy") in _TRUE else None
+    else:
+        # ScrapingBee renders JavaScript unless told otherwise
+        render = params.get("render_js", "true") in _TRUE
+        premium = "premium" if params.get("premium_proxy") in _TRUE or params.get("stealth_proxy") in _TRUE else None
+    if premium and render:
+        return f"{premium}+render"
+    return premium or ("render" if render else "base")
+
+
+def request_credits(url):
+    costs = CREDIT_COSTS[provider_for(url)]
+    return costs.get(request_tier(url), costs["base"])
+
+
+def base_tier_url(url):
+    """``url`` with rendering and premium proxies switched off (None = drop the parameter)."""
+    provider = provider_for(url)
+    if provider == "direct":
+        return url
+    params = provider_params(url)
+    for name, value in EXPENSIVE_PARAMS[provider].items():
+        if value is None:
+            params.pop(name, None)
+        elif name in params or provider == "scrapingbee":
+            params[name] = value
+    return urlsplit(url)._replace(query=urlencode(params)).geturl()
@@ -0,0 +1,227 @@
+"""Yield-driven recrawling: crawl the (site, query) pairs where new jobs actually appear.
+
+With RECRAWL_ENABLED, ``YieldRecorder`` notes after every crawl how many of
+its jobs had never been seen before (by URL, across all queries), how many
+pages it fetched and how long it had been since the same (site, query) was
+last crawled. ``YieldHistory`` keeps these as exponentially decaying totals
+(RECRAWL_HALFLIFE days), so a query that dried up stops being favoured.
+
+New postings of a (site, query) are modelled as arriving at a rate of λ per
+hour, with a Gamma posterior over λ::
+
+    λ ~ Gamma(PRIOR_JOBS + new jobs, PRIOR_HOURS + hours covered)
+
+Each cycle ``RecrawlPlanner`` draws one λ per pair (Thompson sampling: a
+query with little history gets an occasional optimistic draw and is tried
+again), expects ``λ × hours since its last crawl`` new jobs to be waiting,
+and turns that into a page depth with the pair's jobs-per-page rate. Pairs
+are funded in order of expected new jobs per credit until the cycle budget
+is spent; pairs expected to have less than RECRAWL_MIN_EXPECTED new jobs
+are skipped. A pair that was never crawled is funded first, whatever its
+draw.
+
+``scrapy recrawl`` prints the plan for a cycle and, with ``--run``, runs it.
+"""
+import math
+import random
+import sqlite3
+import time
+
+from itemadapter import ItemAdapter
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from indeed_scraper.extensions import FREE_RESPONSE_FLAGS
+from indeed_scraper.providers import site_for
+from indeed_scraper.utils.storage import data_file
+
+# Gamma prior: one new job per day until the pair has history of its own
+PRIOR_JOBS = 1.0
+PRIOR_HOURS = 24.0
+# a first crawl covers the boards' "posted in the last 24h" window
+FIRST_CRAWL_HOURS = 24.0
+# jobs per page assumed before a pair has been crawled
+DEFAULT_JOBS_PER_PAGE = 10.0
+# seen job URLs are forgotten after this long; boards stop listing them well before
+SEEN_RETENTION_DAYS = 90
+
+
+class YieldHistory:
+    def __init__(self, path, halflife_days=14):
+        self.decay = math.log(2) / (halflife_days * 86400)
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS arms (
+                site TEXT NOT NULL,
+                query TEXT NOT NULL,
+                spider TEXT NOT NULL,
+                new_jobs REAL NOT NULL DEFAULT 0,
+                hours REAL NOT NULL DEFAULT 0,
+                jobs REAL NOT NULL DEFAULT 0,
+                pages REAL NOT NULL DEFAULT 0,
+                crawls INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                last_crawl REAL,
+                PRIMARY KEY (site, query)
+            );
+            CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, first_seen REAL NOT NULL) WITHOUT ROWID;
+            """
+        )
+
+    def arm(self, site, query, now=None):
+        """Decayed totals of a (site, query) as of ``now``, or None if it was never crawled."""
+        row = self.db.execute("SELECT * FROM arms WHERE site = ? AND query = ?", (site, query)).fetchone()
+        if row is None:
+            return None
+        arm = dict(row)
+        factor = math.exp(-self.decay * max(0.0, (now or time.time()) - arm["updated_at"]))
+        for field in ("new_jobs", "hours", "jobs", "pages"):
+            arm[field] *= factor
+        return arm
+
+    def arms(self):
+        return [dict(row) for row in self.db.execute("SELECT * FROM arms ORDER BY site, query")]
+
+    def check_and_add(self, key, now=None):
+        """True if ``key`` had not been seen before (it is now)."""
+        cursor = self.db.execute("INSERT OR IGNORE INTO seen (key, first_seen) VALUES (?, ?)", (key, now or time.time()))
+        return cursor.rowcount == 1
+
+    def record(self, site, query, spider, new_jobs, jobs, pages, started_at, now=None):
+        now = now or time.time()
+        arm = self.arm(site, query, now)
+        if arm is None or arm["last_crawl"] is None:
+            hours = FIRST_CRAWL_HOURS
+            arm = {"new_jobs": 0.0, "hours": 0.0, "jobs": 0.0, "pages": 0.0, "crawls": 0}
+        else:
+            # the jobs found were posted since the previous crawl started
+            hours = max(0.0, started_at - arm["last_crawl"]) / 3600
+        self.db.execute(
+            """
+            INSERT OR REPLACE INTO arms (site, query, spider, new_jobs, hours, jobs, pages, crawls, updated_at, last_crawl)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                site, query, spider,
+                arm["new_jobs"] + new_jobs, arm["hours"] + hours,
+                arm["jobs"] + jobs, arm["pages"] + pages,
+                arm["crawls"] + 1, now, started_at,
+            ),
+        )
+        self.db.execute("DELETE FROM seen WHERE first_seen < ?", (now - SEEN_RETENTION_DAYS * 86400,))
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+class RecrawlPlanner:
+    def __init__(self, history, min_expected=0.5, rng=None):
+        self.history = history
+        self.min_expected = min_expected
+        self.rng = rng or random.Random()
+
+    def estimate(self, site, query, now):
+        """(sampled λ per hour, hours since the last crawl, jobs per page) for a (site, query)."""
+        arm = self.history.arm(site, query, now)
+        if arm is None or arm["last_crawl"] is None:
+            new_jobs, hours, elapsed, per_page = 0.0, 0.0, FIRST_CRAWL_HOURS, DEFAULT_JOBS_PER_PAGE
+        else:
+            new_jobs, hours = arm["new_jobs"], arm["hours"]
+            elapsed = max(0.0, now - arm["last_crawl"]) / 3600
+            per_page = (arm["jobs"] + DEFAULT_JOBS_PER_PAGE) / (arm["pages"] + 1)
+        rate = self.rng.gammavariate(PRIOR_JOBS + new_jobs, 1 / (PRIOR_HOURS + hours))
+        return rate, elapsed, max(per_page, 1.0)
+
+    def plan(self, candidates, budget, now=None):
+        """Decide this cycle's crawls.
+
+        ``candidates`` are dicts with site, query, spider, credits (per page)
+        and max_pages. Returns them with ``expected`` new jobs, ``pages`` and
+        ``decision`` ("crawl", "skip" or "budget") filled in, best first.
+        """
+        now = now or time.time()
+        rows = []
+        for candidate in candidates:
+            rate, elapsed, per_page = self.estimate(candidate["site"], candidate["query"], now)
+            expected = rate * elapsed
+            pages = max(1, min(candidate["max_pages"], math.ceil(expected / per_page)))
+            untried = self.history.arm(candidate["site"], candidate["query"], now) is None
+            rows.append({**candidate, "rate": rate, "expected": expected, "pages": pages, "untried": untried})
+        # pairs without history go first: their yield is only learnt by crawling them once
+        rows.sort(key=lambda row: (row["untried"], row["expected"] / (row["pages"] * max(row["credits"], 1))), reverse=True)
+
+        remaining = budget if budget > 0 else math.inf
+        for row in rows:
+            if row["expected"] < self.min_expected and not row["untried"]:
+                row["decision"] = "skip"
+                continue
+            cost = row["pages"] * row["credits"]
+            if cost > remaining:
+                # a shallower crawl still fits
+                row["pages"] = int(remaining // max(row["credits"], 1))
+                if row["pages"] < 1:
+                    row["decision"] = "budget"
+                    continue
+                cost = row["pages"] * row["credits"]
+            row["decision"] = "crawl"
+            remaining -= cost
+        return rows
+
+
+class YieldRecorder:
+    """Record the new-job yield of each crawl for RecrawlPlanner (RECRAWL_ENABLED)."""
+
+    def __init__(self, history, stats):
+        self.history = history
+        self.stats = stats
+        self.site = None
+        self.pages = 0
+        self.jobs = 0
+        self.new_jobs = 0
+        self.started_at = time.time()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("RECRAWL_ENABLED"):
+            raise NotConfigured
+        history = YieldHistory(
+            data_file(settings.get("RECRAWL_HISTORY_PATH"), "recrawl.sqlite"),
+            settings.getfloat("RECRAWL_HALFLIFE"),
+        )
+        o = cls(history, crawler.stats)
+        crawler.signals.connect(o.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(o.response_received, signal=signals.response_received)
+        crawler.signals.connect(o.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(o.spider_closed, signal=signals.spider_closed)
+        return o
+
+    def spider_opened(self, spider):
+        self.started_at = time.time()
+
+    def response_received(self, response, request, spider):
+        if FREE_RESPONSE_FLAGS.intersection(response.flags):
+            return
+        self.pages += 1
+        if self.site is None:
+            self.site = site_for(request.url)
+
+    def item_scraped(self, item, spider):
+        self.jobs += 1
+        key = ItemAdapter(item).get("url")
+        if key and self.history.check_and_add(key):
+            self.new_jobs += 1
+            self.stats.inc_value("recrawl/new_jobs")
+
+    def spider_closed(self, spider, reason):
+        if self.pages:
+            self.history.record(
+                self.site or spider.name, getattr(spider, "search_query", ""), spider.name,
+                self.new_jobs, self.jobs, self.pages, self.started_at,
+            )
+        self.history.close()
@@ -0,0 +1,243 @@
+"""Adaptive render escalation: pay for JS rendering only where a page needs it.
+
+Spiders still build their provider URLs with the tier they may need (e.g.
+``render=true`` for remote.co and RemoteOK, ``js_render`` + ``premium_proxy``
++ ``wait`` for indeed_zenrows). ``RenderProbeMiddleware`` schedules the
+base-tier version of such a request instead: no rendering, no premium
+proxy. ``RenderEscalationMiddleware`` then checks the response cheaply: are
+there cards of the site's spec, or JobPosting structured data? Only when
+neither is there is the page fetched again as the spider asked.
+
+Outcomes are remembered per (site, path) in RENDER_MEMORY_PATH. A path that
+needed rendering goes straight to the rendered fetch on later runs. Each
+observation loses half its weight every RENDER_MEMORY_HALFLIFE days, so a
+path that needed rendering is probed cheaply again once the evidence has
+faded.
+
+An escalated page costs two provider calls, but it stays one request: the
+rendered fetch is downloaded by the middleware itself and its response
+answers the scheduled request. The scheduler, dupe filter, checkpoint,
+CLOSESPIDER_PAGECOUNT and the spiders' ``api_calls`` see the page once;
+the extra calls are ``render/escalated`` and their credits
+``render/probe_credits_lost``.
+"""
+import json
+import math
+import os
+import time
+import weakref
+from urllib.parse import urlsplit
+
+from scrapy import Request, signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import TextResponse
+from scrapy.utils.defer import maybe_deferred_to_future
+
+from indeed_scraper.providers import base_tier_url, provider_for, request_credits, request_tier, site_for, target_url
+from indeed_scraper.sitespec import spec_for_site
+from indeed_scraper.utils.storage import data_file
+
+# statuses worth a rendered retry; 5xx and 404 are not going to be fixed by a browser
+_ESCALATE_STATUSES = {200, 403, 503}
+
+_memories = weakref.WeakKeyDictionary()
+
+
+def has_listings(response):
+    """True if ``response`` has job cards of its site's spec or JobPosting structured data."""
+    if not isinstance(response, TextResponse):
+        return False
+    if b"JobPosting" in response.body:
+        return True
+    spec = spec_for_site(site_for(response.url))
+    return spec is not None and bool(spec.cards(response.selector.root))
+
+
+class RenderMemory:
+    """Exponentially decaying counts of "needed rendering" vs "fine without" per key."""
+
+    def __init__(self, path, halflife_days):
+        self.path = path
+        self.decay = math.log(2) / (halflife_days * 86400)
+        self.entries = {}
+        self.changed = set()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def _decayed(self, key, now):
+        need, plain, updated_at = self.entries.get(key, (0.0, 0.0, now))
+        factor = math.exp(-self.decay * max(0.0, now - updated_at))
+        return need * factor, plain * factor
+
+    def needs_render(self, key):
+        need, plain = self._decayed(key, time.time())
+        return need >= 0.5 and need > plain
+
+    def escalation_rate(self, key):
+        """Share of ``key``'s observations that needed rendering, else of its site's; 1.0 without any."""
+        now = time.time()
+        need, plain = self._decayed(key, now)
+        if need + plain < 0.5:
+            site = key.split("/", 1)[0] + "/"
+            for other in self.entries:
+                if other.startswith(site):
+                    other_need, other_plain = self._decayed(other, now)
+                    need += other_need
+                    plain += other_plain
+        return need / (need + plain) if need + plain >= 0.5 else 1.0
+
+    def record(self, key, needed):
+        now = time.time()
+        need, plain = self._decayed(key, now)
+        self.entries[key] = (need + needed, plain + (not needed), now)
+        self.changed.add(key)
+
+    def save(self):
+        if not self.changed:
+            return
+        # merge with what other crawls wrote meanwhile: for each key the newer entry wins
+        ours = {key: self.entries[key] for key in self.changed}
+        self.load()
+        for key, entry in ours.items():
+            if key not in self.entries or self.entries[key][2] <= entry[2]:
+                self.entries[key] = entry
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.changed.clear()
+
+
+def memory_for(crawler):
+    """The crawler's RenderMemory, saved when its spider closes; None when escalation is off."""
+    settings = crawler.settings
+    if not settings.getbool("RENDER_ESCALATION_ENABLED"):
+        return None
+    if crawler not in _memories:
+        memory = _memories[crawler] = RenderMemory(
+            data_file(settings.get("RENDER_MEMORY_PATH"), "render_memory.json"),
+            settings.getfloat("RENDER_MEMORY_HALFLIFE"),
+        )
+        crawler.signals.connect(memory.save, signal=signals.spider_closed, weak=False)
+    return _memories[crawler]
+
+
+def memory_key(url):
+    return f"{site_for(url)}{urlsplit(target_url(url)).path}"
+
+
+def escalates(url):
+    """True if RenderProbeMiddleware may send ``url`` at the base tier first."""
+    return provider_for(url) != "direct" and request_tier(url) != "base"
+
+
+def expected_credits(memory, url):
+    """Credits a request for ``url`` is expected to cost with render escalation, rounded up.
+
+    A path remembered as needing rendering is fetched rendered straight away.
+    Any other is probed, plus the rendered fetch weighted by how often the
+    path (or, with no history, its site) needed it. With nothing known the
+    rendered fetch is assumed, so plans are not priced optimistically.
+    """
+    key = memory_key(url)
+    if not escalates(url) or memory.needs_render(key):
+        return request_credits(url)
+    return math.ceil(request_credits(base_tier_url(url)) + memory.escalation_rate(key) * request_credits(url))
+
+
+class RenderProbeMiddleware:
+    # Spider middleware: swaps each provider request the spider yields (start
+    # requests included) for its base-tier probe, unless the path is known to
+    # need rendering. The full-tier URL travels in meta["render_url"].
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        memory = memory_for(crawler)
+        if memory is None:
+            raise NotConfigured
+        return cls(memory)
+
+    def __init__(self, memory):
+        self.memory = memory
+
+    def probe(self, output):
+        if not isinstance(output, Request):
+            return output
+        meta = output.meta
+        if "render_url" in meta or meta.get("dont_escalate") or not escalates(output.url):
+            return output
+        if self.memory.needs_render(memory_key(output.url)):
+            return output
+        return output.replace(url=base_tier_url(output.url), meta={**meta, "render_url": output.url})
+
+    async def process_start(self, start):
+        async for output in start:
+            yield self.probe(output)
+
+    def process_start_requests(self, start_requests, spider):
+        for output in start_requests:
+            yield self.probe(output)
+
+    def process_spider_output(self, response, result, spider):
+        for output in result:
+            yield self.probe(output)
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for output in result:
+            yield self.probe(output)
+
+
+class RenderEscalationMiddleware:
+    # Downloader middleware. It sits below CheckpointReplayMiddleware and
+    # CoalescingMiddleware: replayed responses skip it, and coalesced waiters
+    # are only handed the response it has kept or fetched rendered.
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        memory = memory_for(crawler)
+        if memory is None:
+            raise NotConfigured
+        return cls(crawler, memory)
+
+    def __init__(self, crawler, memory):
+        self.crawler = crawler
+        self.memory = memory
+        self.stats = crawler.stats
+
+    def process_request(self, request, spider):
+        # counted here rather than by RenderProbeMiddleware: only requests that go out
+        meta = request.meta
+        if "render_url" in meta:
+            self.stats.inc_value("render/probes")
+        elif escalates(request.url) and not (meta.get("dont_escalate") or meta.get("render_escalated")):
+            self.stats.inc_value("render/remembered")
+
+    async def process_response(self, request, response, spider):
+        full_url = request.meta.get("render_url")
+        if full_url is None or {"checkpoint", "coalesced"}.intersection(response.flags):
+            return response
+        if response.status not in _ESCALATE_STATUSES:
+            return response
+        key = memory_key(full_url)
+        if has_listings(response):
+            self.memory.record(key, False)
+            self.stats.inc_value("render/probe_ok")
+            self.stats.inc_value("render/credits_saved", request_credits(full_url) - request_credits(request.url))
+            return response
+        self.memory.record(key, True)
+        self.stats.inc_value("render/escalated")
+        self.stats.inc_value("render/probe_credits_lost", request_credits(request.url))
+        meta = {k: v for k, v in request.meta.items() if k != "render_url"}
+        rendered = request.replace(url=full_url, meta={**meta, "render_escalated": True, "dont_coalesce": True})
+        # downloaded here instead of going back through the scheduler, so the page
+        # stays one request; the middlewares below see the rendered fetch as usual
+        result = await maybe_deferred_to_future(self.crawler.engine.downloader.fetch(rendered, spider))
+        if isinstance(result, Request):
+            return result  # a redirect or retry below asked for another request
+        return result.replace(request=request)
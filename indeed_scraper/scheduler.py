@@ -0,0 +1,97 @@
+"""Scheduler whose queue and dupe filter live in the shared store (SHARED_STORE_URL).
+
+Every worker pushes the requests its callbacks produce to one queue per spider
+and pops whatever is next, so N processes started with the same store split
+the crawl between them. A request is queued at most once across all workers
+(unless it has ``dont_filter``); fingerprints go to a store set.
+
+Without SHARED_STORE_URL the stock Scrapy scheduler is used.
+"""
+import logging
+import pickle
+from time import monotonic
+
+from scrapy import signals
+from scrapy.core.scheduler import BaseScheduler, Scheduler
+from scrapy.dupefilters import BaseDupeFilter
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.request import request_from_dict
+
+from indeed_scraper.sharedstore import store_for
+
+logger = logging.getLogger(__name__)
+
+
+class SharedDupeFilter(BaseDupeFilter):
+    def __init__(self, store, name, fingerprinter):
+        self.store = store
+        self.name = name
+        self.fingerprinter = fingerprinter
+
+    def fingerprint(self, request):
+        return self.fingerprinter.fingerprint(request).hex()
+
+    def request_seen(self, request):
+        return not self.store.add(self.name, self.fingerprint(request))
+
+
+class SharedScheduler(BaseScheduler):
+    @classmethod
+    def from_crawler(cls, crawler):
+        store = store_for(crawler)
+        if store is None:
+            return Scheduler.from_crawler(crawler)
+        o = cls(crawler, store, crawler.settings.getfloat("SHARED_IDLE_TIMEOUT"))
+        crawler.signals.connect(o.spider_idle, signal=signals.spider_idle)
+        return o
+
+    def __init__(self, crawler, store, idle_timeout):
+        self.crawler = crawler
+        self.store = store
+        self.stats = crawler.stats
+        self.idle_timeout = idle_timeout
+        self.idle_since = None
+        self.spider = None
+        self.df = None
+
+    def open(self, spider):
+        self.spider = spider
+        self.queue_key = self.store.key(spider.name, "queue")
+        self.df = SharedDupeFilter(
+            self.store, self.store.key(spider.name, "requests"), self.crawler.request_fingerprinter
+        )
+
+    def close(self, reason):
+        self.df.close(reason)
+
+    def has_pending_requests(self):
+        return self.store.size(self.queue_key) > 0
+
+    def enqueue_request(self, request):
+        if not request.dont_filter and self.df.request_seen(request):
+            logger.debug("Filtered request already queued by a worker: %(request)s", {"request": request})
+            self.stats.inc_value("shared/dupefilter/filtered")
+            return False
+        payload = pickle.dumps(request.to_dict(spider=self.spider), protocol=4)
+        self.store.push(self.queue_key, payload, request.priority)
+        self.stats.inc_value("shared/enqueued")
+        return True
+
+    def next_request(self):
+        payload = self.store.pop(self.queue_key)
+        if payload is None:
+            return None
+        self.stats.inc_value("shared/dequeued")
+        return request_from_dict(pickle.loads(payload), spider=self.spider)
+
+    def spider_idle(self, spider):
+        # Other workers may still be fetching pages whose callbacks will queue more
+        # requests, so an empty queue only ends this worker after SHARED_IDLE_TIMEOUT
+        # seconds. (No in-flight counter: a crashed worker would keep it up forever.)
+        if self.has_pending_requests():
+            self.idle_since = None
+            raise DontCloseSpider
+        if self.idle_since is None:
+            self.idle_since = monotonic()
+        if monotonic() - self.idle_since < self.idle_timeout:
+            raise DontCloseSpider
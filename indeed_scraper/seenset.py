@@ -0,0 +1,215 @@
+"""Compact stand-ins for the spiders' ``seen_urls`` / ``visited_pages`` sets.
+
+A Python set of Indeed tracking URLs costs ~400 bytes per key (the string
+plus its slot). Both classes here keep only hashes of the members and
+answer the same calls the spiders make on a set (``x in s``, ``s.add(x)``,
+``len(s)``) plus ``check_and_add``, like ``SharedSet``:
+
+- ``FingerprintSet``: 64-bit BLAKE2b fingerprints in an open-addressing
+  table (``array('Q')``, at most 3/4 full), 11-21 bytes per key. Two
+  different URLs collide with probability ~n²/2⁶⁵: about one in 10⁷ at a
+  million keys.
+- ``ScalableBloomFilter``: a chain of Bloom filters, each twice the size of
+  the one before with a tighter error rate, so the overall false-positive
+  rate stays under ``error_rate`` however many keys arrive. Around 4 bytes
+  per key at 0.1%, but every lookup walks all the filters: slower.
+
+A false positive makes a spider treat a new URL as already seen, i.e. skip
+one job or page. Neither structure can list its members.
+
+``nbytes`` is the memory held by the hash storage, ``to_bytes()`` /
+``from_bytes()`` let checkpoints save and restore them.
+"""
+import hashlib
+import math
+import struct
+from array import array
+
+_LN2_SQUARED = math.log(2) ** 2
+
+
+def _digest(member):
+    if isinstance(member, str):
+        member = member.encode("utf-8")
+    return hashlib.blake2b(member, digest_size=16).digest()
+
+
+class FingerprintSet:
+    MAX_LOAD = 0.75
+
+    def __init__(self, capacity=1024):
+        size = 16
+        while size * self.MAX_LOAD < capacity:
+            size *= 2
+        self._slots = array("Q", bytes(8 * size))
+        self._mask = size - 1
+        self._count = 0
+
+    @staticmethod
+    def fingerprint(member):
+        # 0 marks an empty slot
+        return int.from_bytes(_digest(member)[:8], "little") or 1
+
+    def _find(self, fingerprint):
+        slots, mask = self._slots, self._mask
+        i = fingerprint & mask
+        while True:
+            slot = slots[i]
+            if slot == 0 or slot == fingerprint:
+                return i
+            i = (i + 1) & mask
+
+    def _insert(self, fingerprint):
+        i = self._find(fingerprint)
+        if self._slots[i]:
+            return False
+        self._slots[i] = fingerprint
+        self._count += 1
+        if self._count > self.MAX_LOAD * len(self._slots):
+            self._grow()
+        return True
+
+    def _grow(self):
+        old = self._slots
+        self._slots = array("Q", bytes(16 * len(old)))
+        self._mask = len(self._slots) - 1
+        for fingerprint in old:
+            if fingerprint:
+                self._slots[self._find(fingerprint)] = fingerprint
+
+    def __contains__(self, member):
+        return self._slots[self._find(self.fingerprint(member))] != 0
+
+    def add(self, member):
+        self._insert(self.fingerprint(member))
+
+    def check_and_add(self, member):
+        """True if ``member`` was new (and is now in the set)."""
+        return self._insert(self.fingerprint(member))
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        return len(self._slots) * self._slots.itemsize
+
+    def to_bytes(self):
+        return array("Q", (f for f in self._slots if f)).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data):
+        fingerprints = array("Q")
+        fingerprints.frombytes(data)
+        o = cls(len(fingerprints))
+        for fingerprint in fingerprints:
+            o._insert(fingerprint)
+        return o
+
+
+class _BloomStage:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = max(64, math.ceil(-capacity * math.log(error_rate) / _LN2_SQUARED))
+        self.hashes = max(1, math.ceil(-math.log2(error_rate)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def contains(self, h1, h2):
+        array, bits = self.array, self.bits
+        for i in range(self.hashes):
+            p = (h1 + i * h2) % bits
+            if not array[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+    def add(self, h1, h2):
+        array, bits = self.array, self.bits
+        for i in range(self.hashes):
+            p = (h1 + i * h2) % bits
+            array[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, error_rate=0.001, capacity=1024):
+        if not 0 < error_rate < 1:
+            raise ValueError(f"error_rate must be between 0 and 1, got {error_rate}")
+        self.error_rate = error_rate
+        self.initial_capacity = capacity
+        self._stages = []
+        self._count = 0
+
+    def _add_stage(self):
+        # stage i gets error_rate * (1 - r) * r**i; the sum over all stages stays under error_rate
+        n = len(self._stages)
+        self._stages.append(_BloomStage(
+            self.initial_capacity * self.GROWTH ** n,
+            self.error_rate * (1 - self.TIGHTENING) * self.TIGHTENING ** n,
+        ))
+
+    @staticmethod
+    def _hash_pair(member):
+        h1, h2 = struct.unpack("<QQ", _digest(member))
+        return h1, h2 | 1
+
+    def __contains__(self, member):
+        h1, h2 = self._hash_pair(member)
+        return any(stage.contains(h1, h2) for stage in self._stages)
+
+    def add(self, member):
+        self.check_and_add(member)
+
+    def check_and_add(self, member):
+        """True if ``member`` was new (and is now in the filter); False may be a false positive."""
+        h1, h2 = self._hash_pair(member)
+        if any(stage.contains(h1, h2) for stage in self._stages):
+            return False
+        if not self._stages or self._stages[-1].count >= self._stages[-1].capacity:
+            self._add_stage()
+        self._stages[-1].add(h1, h2)
+        self._count += 1
+        return True
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        return sum(len(stage.array) for stage in self._stages)
+
+    def to_bytes(self):
+        header = struct.pack("<dQQ", self.error_rate, self.initial_capacity, len(self._stages))
+        return header + b"".join(struct.pack("<Q", stage.count) + bytes(stage.array) for stage in self._stages)
+
+    @classmethod
+    def from_bytes(cls, data):
+        error_rate, capacity, stages = struct.unpack_from("<dQQ", data)
+        o = cls(error_rate, capacity)
+        offset = struct.calcsize("<dQQ")
+        for _ in range(stages):
+            o._add_stage()
+            stage = o._stages[-1]
+            (stage.count,) = struct.unpack_from("<Q", data, offset)
+            offset += 8
+            stage.array[:] = data[offset:offset + len(stage.array)]
+            offset += len(stage.array)
+            o._count += stage.count
+        return o
+
+
+def compact_set(backend, error_rate=0.001, capacity=1024, initial=()):
+    """A new compact set of the SEEN_SET_BACKEND kind, holding ``initial``."""
+    if backend == "bloom":
+        seen = ScalableBloomFilter(error_rate, capacity)
+    elif backend == "fingerprint":
+        seen = FingerprintSet(capacity)
+    else:
+        raise ValueError(f"Unknown seen-set backend: {backend!r} (use set, fingerprint or bloom)")
+    for member in initial:
+        seen.add(member)
+    return seen
@@ -11,9 +11,15 @@ BOT_NAME = "indeed_scraper"
 
 SPIDER_MODULES = ["indeed_scraper.spiders"]
 NEWSPIDER_MODULE = "indeed_scraper.spiders"
+COMMANDS_MODULE = "indeed_scraper.commands"
+# Imports a spider's module only when that spider runs (see spiderloader.py)
+SPIDER_LOADER_CLASS = "indeed_scraper.spiderloader.LazySpiderLoader"
 
 ADDONS = {}
 
+# Fingerprint provider requests by their target page, not the API URL (see coalesce.py)
+REQUEST_FINGERPRINTER_CLASS = "indeed_scraper.coalesce.TargetRequestFingerprinter"
+
 FEED_URI = 'jobs.csv'
 FEED_FORMAT = 'csv'
 
@@ -43,27 +49,204 @@ DOWNLOAD_DELAY = 1
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-#SPIDER_MIDDLEWARES = {
+SPIDER_MIDDLEWARES = {
 #    "indeed_scraper.middlewares.IndeedScraperSpiderMiddleware": 543,
-#}
+    "indeed_scraper.checkpoint.CheckpointMiddleware": 100,
+    "indeed_scraper.render.RenderProbeMiddleware": 500,
+    "indeed_scraper.middlewares.CallbackMetricsMiddleware": 900,
+    "indeed_scraper.profiling.ProfilingMiddleware": 950,
+}
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
+DOWNLOADER_MIDDLEWARES = {
 #    "indeed_scraper.middlewares.IndeedScraperDownloaderMiddleware": 543,
-#}
+    "indeed_scraper.offload.ParseOffloadMiddleware": 30,
+    "indeed_scraper.checkpoint.CheckpointReplayMiddleware": 40,
+    "indeed_scraper.coalesce.CoalescingMiddleware": 41,
+    "indeed_scraper.render.RenderEscalationMiddleware": 42,
+    "indeed_scraper.middlewares.SharedBudgetMiddleware": 50,
+    "indeed_scraper.transfer.TransferMiddleware": 55,
+}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
+EXTENSIONS = {
 #    "scrapy.extensions.telnet.TelnetConsole": None,
-#}
+    "indeed_scraper.extensions.MetricsExporter": 500,
+    "indeed_scraper.extensions.ApiCallRefunds": 505,
+    "indeed_scraper.extensions.SharedSeenSets": 510,
+    "indeed_scraper.archive.RawPageArchive": 520,
+    "indeed_scraper.recrawl.YieldRecorder": 530,
+    "indeed_scraper.extensions.CompactSeenSets": 540,
+    "indeed_scraper.cardcache.CardExtractionCache": 550,
+}
+
+# Per-spider metrics (latency/size histograms, parse time, items per page,
+# dropped cards, credits) written as <spider>.prom and <spider>.json
+METRICS_ENABLED = True
+METRICS_DIR = None  # defaults to .scrapy/indeed_scraper/metrics
+METRICS_FLUSH_INTERVAL = 0  # seconds between mid-run flushes, 0 = only at close
+
+# Structured spider events: events/<name> counters, lazily formatted log lines
+# (sampled per event), and a ring buffer written to EVENTS_DIR only when a run fails
+EVENTS_SAMPLE_RATES = {}  # event -> fraction of occurrences logged, e.g. {"api_call": 0.1}
+EVENTS_BUFFER_SIZE = 2000
+EVENTS_DIR = None  # defaults to .scrapy/indeed_scraper/events
+
+# Opt-in profiling of spider callbacks and pipelines, reports per callback/stage
+PROFILING_ENABLED = False
+PROFILING_DIR = None  # defaults to .scrapy/indeed_scraper/profiles
+PROFILING_SAMPLE_RATE = 0.1  # fraction of calls run under cProfile
+PROFILING_TRACEMALLOC = False
+PROFILING_TOP_N = 25
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
-#ITEM_PIPELINES = {
+# Times each pipeline's process_item when PROFILING_ENABLED is set (plain pipeline manager otherwise)
+ITEM_PROCESSOR = "indeed_scraper.profiling.ProfilingItemPipelineManager"
+
+# Optional pipelines stay disabled until their *_ENABLED setting is switched on
+ITEM_PIPELINES = {
 #    "indeed_scraper.pipelines.IndeedScraperPipeline": 300,
-#}
+    "indeed_scraper.pipelines.LocationPipeline": 350,
+    "indeed_scraper.pipelines.NearDuplicatePipeline": 400,
+    "indeed_scraper.pipelines.SearchIndexPipeline": 500,
+    "indeed_scraper.pipelines.AggregatesPipeline": 550,
+    "indeed_scraper.pipelines.ChangelogPipeline": 600,
+    "indeed_scraper.stream.StreamingItemPipeline": 700,
+}
+
+# Location normalization against the bundled gazetteer (adds city, region, country
+# and remote columns to items; the search index normalizes locations either way)
+LOCATION_NORMALIZE_ENABLED = False
+
+# Cross-board near-duplicate clustering (adds a cluster_id column to items)
+DEDUP_ENABLED = False
+DEDUP_INDEX_PATH = None  # defaults to .scrapy/indeed_scraper/dedup.sqlite
+DEDUP_THRESHOLD = 0.6
+
+# Local inverted index queried with `scrapy search` (build from CSVs with `scrapy index`)
+SEARCH_INDEX_ENABLED = False
+SEARCH_INDEX_PATH = None  # defaults to .scrapy/indeed_scraper/jobs_index.sqlite
+
+# Precomputed jobs/salary aggregates per source, company, title, country and day,
+# read with `scrapy report` (backfill from CSVs with `scrapy report --add`)
+AGGREGATES_ENABLED = False
+AGGREGATES_PATH = None  # defaults to .scrapy/indeed_scraper/aggregates.sqlite
+AGGREGATES_SKETCH_ACCURACY = 0.01  # relative error of the salary medians/percentiles
+AGGREGATES_FLUSH_ITEMS = 100  # items between writes to the tables
+
+# Per-run delta feed: new, updated (title/salary/location) and expired postings
+# appended to <CHANGELOG_DIR>/<spider>[.<search>].changes.jsonl, kept apart per -a search_query/search_location;
+# the workers of one `scrapy workers` run share a run and expire once, when the last one closes
+CHANGELOG_ENABLED = False
+CHANGELOG_DIR = None  # defaults to .scrapy/indeed_scraper/changelog
+CHANGELOG_EXPIRE_RUNS = 3  # completed runs (finished or page-capped) in a row without a posting before it counts as expired
+CHANGELOG_EXPIRE = True  # False for runs that cover only part of a search; `scrapy recrawl` sets it
+
+# Stream items as NDJSON while the crawl runs: unix:///path.sock, pipe:///path.fifo
+# or http://host:port/path. The crawl pauses while STREAM_BUFFER_ITEMS lines are unsent
+STREAM_URL = None
+STREAM_BUFFER_ITEMS = 1000
+STREAM_BATCH_ITEMS = 100  # lines per write/POST at most
+STREAM_RECONNECT_DELAY = 2
+STREAM_PAUSE_TIMEOUT = 60  # seconds the crawl waits for a stalled consumer before dropping lines instead
+STREAM_CLOSE_TIMEOUT = 30  # seconds to flush at the end before dropping the rest
+
+# Multi-worker crawling: workers started with the same SHARED_STORE_URL share one
+# request queue, dupe filter, seen-sets and credit budget.
+# sqlite:///path/frontier.sqlite for processes on one host, redis://host:6379/0 across hosts
+SCHEDULER = "indeed_scraper.scheduler.SharedScheduler"  # stock scheduler while SHARED_STORE_URL is unset
+SHARED_STORE_URL = None
+SHARED_STORE_PREFIX = "indeed_scraper"  # key namespace, change it to keep separate crawls apart
+SHARED_RUN_ID = None  # keys go under <prefix>:<run id>; `scrapy workers` sets a new one per run
+SHARED_CREDIT_BUDGET = 0  # credits across all workers, 0 = no shared cap
+SHARED_SPIDER_SETS = ["seen_urls", "visited_pages"]
+SHARED_IDLE_TIMEOUT = 60  # seconds a worker waits on an empty queue for other workers' pages
+SHARED_WORKER = None  # set by `scrapy workers` to each worker's number
+SHARED_WORKERS = None  # set by `scrapy workers` to the number of workers in the run
+
+# Memory-bounded seen-sets: "fingerprint" keeps 64-bit hashes (no false positives in
+# practice), "bloom" a scalable Bloom filter (~4 bytes/key), "set" the plain Python sets
+SEEN_SET_BACKEND = "set"
+SEEN_SET_ATTRIBUTES = ["seen_urls", "visited_pages"]
+SEEN_SET_ERROR_RATE = 0.001  # bloom only: overall false-positive rate
+SEEN_SET_CAPACITY = 1024  # keys before the first resize (fingerprint) or the first extra filter (bloom)
+
+# Merge concurrent requests of a crawl for the same target page into one download;
+# late arrivals within COALESCE_TTL share it as well (2xx pages with listings only)
+COALESCE_ENABLED = True
+COALESCE_TTL = 60
+
+# Try provider requests without JS rendering/premium proxies first and re-fetch them
+# as the spider built them only when no cards or JobPosting data came back
+RENDER_ESCALATION_ENABLED = True
+RENDER_MEMORY_PATH = None  # defaults to .scrapy/indeed_scraper/render_memory.json
+RENDER_MEMORY_HALFLIFE = 7  # days until a remembered outcome counts half
+
+# Crash-safe checkpoints: a killed run resumes from <CHECKPOINT_DIR>/<spider>.sqlite
+# (frontier, paid responses, unexported items, spider counters) on the next start
+CHECKPOINT_ENABLED = False
+CHECKPOINT_DIR = None  # defaults to .scrapy/indeed_scraper/checkpoints
+CHECKPOINT_SPIDER_STATE = ["api_calls", "pageCount", "page_count", "jobs_scraped", "seen_urls", "visited_pages"]
+
+# Append-only archive of every fetched page (compressed WARC-like records plus an
+# index by site, target URL and fetch time); re-parse it with `scrapy reparse`
+ARCHIVE_ENABLED = False
+ARCHIVE_DIR = None  # defaults to .scrapy/indeed_scraper/archive
+
+# Run the spiders' card extraction in a process pool so the reactor keeps downloading
+PARSE_OFFLOAD_ENABLED = False
+PARSE_OFFLOAD_WORKERS = 0  # 0 = one per CPU
+PARSE_OFFLOAD_MAX_INFLIGHT = 0  # pages in the pool at once; 0 = twice the workers
+
+# Reuse the extracted record of a job card whose HTML (and site spec) is unchanged
+# since an earlier crawl; the least recently seen cards are evicted past the size
+CARD_CACHE_ENABLED = False
+CARD_CACHE_PATH = None  # defaults to .scrapy/indeed_scraper/cards.sqlite
+CARD_CACHE_SIZE = 200000  # cards kept
+
+# Yield-driven recrawling: record how many never-seen jobs each (site, query) crawl
+# finds, and let `scrapy recrawl` pick each cycle's queries and depths from it
+RECRAWL_ENABLED = False
+RECRAWL_HISTORY_PATH = None  # defaults to .scrapy/indeed_scraper/recrawl.sqlite
+RECRAWL_HALFLIFE = 14  # days until a crawl's yield counts half
+RECRAWL_CYCLE_BUDGET = 0  # credits per `scrapy recrawl` cycle, 0 = no cap
+RECRAWL_MIN_EXPECTED = 0.5  # skip queries expected to have fewer new jobs waiting
+
+# Connections to the provider APIs: a warm keep-alive pool per host (pre-warmed at
+# spider open), one TLS context and resumable session per host, optional HTTP/2
+DOWNLOAD_HANDLERS = {"https": "indeed_scraper.connections.ProviderDownloadHandler"}
+DOWNLOADER_CLIENTCONTEXTFACTORY = "indeed_scraper.connections.SessionReusingContextFactory"
+PROVIDER_POOL_SIZE = 0  # idle connections kept per host, 0 = CONCURRENT_REQUESTS
+PROVIDER_POOL_IDLE_TIMEOUT = 240  # seconds an idle connection is kept
+PROVIDER_PREWARM_CONNECTIONS = 2  # opened to the spider's provider at open, 0 = off
+PROVIDER_HTTP2_ENABLED = False  # multiplex provider requests over HTTP/2 (needs the h2 package)
+
+# Response transfer: compression is negotiated by Scrapy's HttpCompressionMiddleware
+# (gzip, deflate, br with brotli installed). Bodies over a site's cap fail (before and
+# after decompression); wire vs decoded bytes are counted per site under transfer/
+COMPRESSION_ENABLED = True
+SITE_DOWNLOAD_MAXSIZE = {
+    "remoteok.com": 16 * 1024 * 1024,
+    "indeed.com": 8 * 1024 * 1024,
+    "ziprecruiter.com": 8 * 1024 * 1024,
+    "remote.co": 8 * 1024 * 1024,
+    "weworkremotely.com": 8 * 1024 * 1024,
+}
+# Stop a download once the listing is complete: the body ends after the tag holding
+# the <count>-th <marker> (the next-page link, or the card after the last one read)
+DOWNLOAD_TRUNCATE_ENABLED = False
+DOWNLOAD_TRUNCATE_AFTER = {
+    "indeed.com": ["job_seen_beacon", 6],  # the spec reads 5 cards
+    "remote.co": ["next page-numbers", 1],
+    "weworkremotely.com": ['rel="next"', 1],
+}
+
+# Offline testing: with MOCK_PROVIDER_URL set, provider API requests go to a local
+# mock server (`scrapy mockprovider`, `scrapy loadtest`) instead of the real APIs
+MOCK_PROVIDER_URL = None  # e.g. http://127.0.0.1:8099
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
@@ -0,0 +1,235 @@
+"""State shared between crawler processes: sets, bounded counters and request queues.
+
+Two backends implement the same small interface:
+
+``SQLiteStore``  ``sqlite:///path/to/frontier.sqlite`` — processes on one host
+                 (and the local stand-in for tests)
+``RedisStore``   ``redis://host:6379/0`` — workers on several hosts; needs the
+                 optional ``redis`` package
+
+Every operation is atomic across processes, so a check-and-add on a set or a
+reservation against a counter can't be won by two workers.
+"""
+import sqlite3
+import weakref
+from urllib.parse import urlsplit
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from indeed_scraper.utils.storage import data_file
+
+
+_stores = weakref.WeakKeyDictionary()
+
+
+def store_for(crawler):
+    """The crawler's shared store (one connection per crawler), or None when SHARED_STORE_URL is unset."""
+    if crawler not in _stores:
+        store = store_from_settings(crawler.settings)
+        if store is not None:
+            crawler.signals.connect(store.close, signal=signals.engine_stopped)
+        _stores[crawler] = store
+    return _stores[crawler]
+
+
+def store_from_settings(settings):
+    """The store named by SHARED_STORE_URL, or None when sharing is off."""
+    url = settings.get("SHARED_STORE_URL")
+    if not url:
+        return None
+    prefix = settings.get("SHARED_STORE_PREFIX")
+    run_id = settings.get("SHARED_RUN_ID")
+    # every key of a run (queue, dupe filter, seen-sets, credits) is under its run id
+    return open_store(url, f"{prefix}:{run_id}" if run_id else prefix)
+
+
+def open_store(url, prefix="indeed_scraper"):
+    scheme = urlsplit(url).scheme
+    if scheme == "sqlite":
+        # sqlite:///abs/path, sqlite://relative/path, or sqlite:// for the default file
+        path = url[len("sqlite://"):] or None
+        return SQLiteStore(data_file(path, "frontier.sqlite"), prefix)
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisStore(url, prefix)
+    raise NotConfigured(f"Unsupported SHARED_STORE_URL scheme: {url!r}")
+
+
+class SQLiteStore:
+    def __init__(self, path, prefix="indeed_scraper"):
+        self.path = path
+        self.prefix = prefix
+        # autocommit mode; writes take the lock up front with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS members (name TEXT, member TEXT, PRIMARY KEY (name, member)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                payload BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS queue_order ON queue (name, priority DESC, id);
+            """
+        )
+
+    def key(self, *parts):
+        return ":".join((self.prefix,) + parts)
+
+    def _write(self, fn):
+        cursor = self.conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(cursor)
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+        cursor.execute("COMMIT")
+        return result
+
+    # --- sets ---
+
+    def add(self, name, member):
+        """Add ``member``; True if it was not there before."""
+        cursor = self.conn.execute("INSERT OR IGNORE INTO members VALUES (?, ?)", (name, member))
+        return cursor.rowcount == 1
+
+    def contains(self, name, member):
+        row = self.conn.execute("SELECT 1 FROM members WHERE name = ? AND member = ?", (name, member)).fetchone()
+        return row is not None
+
+    def count(self, name):
+        return self.conn.execute("SELECT COUNT(*) FROM members WHERE name = ?", (name,)).fetchone()[0]
+
+    # --- counters ---
+
+    def incr(self, name, amount=1, limit=None):
+        """Add ``amount``; returns the new value, or None (and changes nothing) if it would pass ``limit``."""
+
+        def reserve(cursor):
+            row = cursor.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+            value = (row[0] if row else 0) + amount
+            if limit is not None and value > limit:
+                return None
+            cursor.execute("INSERT OR REPLACE INTO counters VALUES (?, ?)", (name, value))
+            return value
+
+        return self._write(reserve)
+
+    def get(self, name):
+        row = self.conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    # --- queues ---
+
+    def push(self, name, payload, priority=0):
+        self.conn.execute("INSERT INTO queue (name, priority, payload) VALUES (?, ?, ?)", (name, priority, payload))
+
+    def pop(self, name):
+        def take(cursor):
+            row = cursor.execute(
+                "SELECT id, payload FROM queue WHERE name = ? ORDER BY priority DESC, id LIMIT 1", (name,)
+            ).fetchone()
+            if row is None:
+                return None
+            cursor.execute("DELETE FROM queue WHERE id = ?", (row[0],))
+            return row[1]
+
+        return self._write(take)
+
+    def size(self, name):
+        return self.conn.execute("SELECT COUNT(*) FROM queue WHERE name = ?", (name,)).fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+# INCRBY that backs out again when the result would pass the limit (ARGV[2], -1 = none)
+_RESERVE_SCRIPT = """
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+local limit = tonumber(ARGV[2])
+if limit >= 0 and value > limit then
+    redis.call('DECRBY', KEYS[1], ARGV[1])
+    return -1
+end
+return value
+"""
+
+
+class RedisStore:
+    """Same interface over Redis: sets, string counters and one sorted set per queue."""
+
+    def __init__(self, url, prefix="indeed_scraper"):
+        try:
+            import redis
+        except ImportError:
+            raise NotConfigured("SHARED_STORE_URL points at Redis but the redis package is not installed")
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+        self._reserve = self.client.register_script(_RESERVE_SCRIPT)
+
+    def key(self, *parts):
+        return ":".join((self.prefix,) + parts)
+
+    def add(self, name, member):
+        return self.client.sadd(name, member) == 1
+
+    def contains(self, name, member):
+        return bool(self.client.sismember(name, member))
+
+    def count(self, name):
+        return self.client.scard(name)
+
+    def incr(self, name, amount=1, limit=None):
+        value = self._reserve(keys=[name], args=[amount, -1 if limit is None else limit])
+        return None if value == -1 else value
+
+    def get(self, name):
+        return int(self.client.get(name) or 0)
+
+    def push(self, name, payload, priority=0):
+        # score orders by priority (high first); the zero-padded sequence keeps FIFO within one
+        seq = self.client.incr(name + ":seq")
+        self.client.zadd(name, {b"%016d:" % seq + payload: -priority})
+
+    def pop(self, name):
+        popped = self.client.zpopmin(name)
+        if not popped:
+            return None
+        return popped[0][0].split(b":", 1)[1]
+
+    def size(self, name):
+        return self.client.zcard(name)
+
+    def close(self):
+        self.client.close()
+
+
+class SharedSet:
+    """A set-like view of one store set, so spiders' ``x in seen`` / ``seen.add(x)`` go through the store.
+
+    ``check_and_add`` does both in one atomic step.
+    """
+
+    def __init__(self, store, name, initial=()):
+        self.store = store
+        self.name = name
+        for member in initial:
+            store.add(name, member)
+
+    def __contains__(self, member):
+        return self.store.contains(self.name, member)
+
+    def add(self, member):
+        self.store.add(self.name, member)
+
+    def check_and_add(self, member):
+        """True if ``member`` was new (and is now in the set)."""
+        return self.store.add(self.name, member)
+
+    def __len__(self):
+        return self.store.count(self.name)
+
@@ -0,0 +1,208 @@
+"""Declarative site specs compiled to lxml XPath plans.
+
+A spec (``indeed_scraper/sitespecs/<name>.json``) declares, for one board:
+
+``cards``/``cards_xpath``
+    CSS (or XPath) selecting the job cards; ``max_cards`` caps how many are read.
+``fields``
+    Ordered mapping of item field -> field spec. The order is the column order
+    of the yielded items. A field spec has:
+
+    ``select``    fallback chain; each entry is a CSS string (first match), or
+                  ``{"css"|"xpath": ..., "all": true}`` to join every match with spaces,
+                  or ``{"css"|"xpath": ..., "list": true}`` to keep all matches for ``pick``
+    ``pick``      ``{"contains_any": [...]}`` keeps the first listed value containing any needle
+    ``skip_if_prefix`` ``{"<reason>": ["/prefix", ...]}`` drops the card when the raw value matches
+    ``normalize`` ``["urljoin"]`` resolves against ``base_url`` (values are always stripped)
+    ``default``   used when nothing matched; ``"@today"`` is today's YYYY-MM-DD
+    ``const``     fixed value, no selection
+    ``required``  drop the card (reason ``no_<field>``) when the value is empty
+    ``output``    ``false`` to extract a helper field without yielding it
+``next_page``
+    Optional field spec for the pagination link.
+
+Specs are compiled once (CSS is translated and every expression is compiled to
+an ``lxml.etree.XPath``), then each page is handled on the already-parsed tree
+without any per-card CSS translation or Selector wrapping. With a
+``card_cache`` (see cardcache.py), cards seen before are not extracted again.
+"""
+import hashlib
+import json
+import os
+import pkgutil
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache, partial
+from urllib.parse import urljoin, urlsplit
+
+from lxml import etree, html
+from parsel import Selector
+from parsel.csstranslator import HTMLTranslator
+
+_translator = HTMLTranslator()
+
+TODAY = "@today"
+
+
+def _compile(css=None, xpath=None):
+    if css is not None:
+        xpath = _translator.css_to_xpath(css, prefix="descendant-or-self::")
+    return etree.XPath(xpath, smart_strings=False)
+
+
+def _text(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, etree._Element):
+        return "".join(value.itertext())
+    return str(value)
+
+
+class _Alternative:
+    __slots__ = ("xpath", "mode")
+
+    def __init__(self, entry):
+        if isinstance(entry, str):
+            entry = {"css": entry}
+        self.xpath = _compile(entry.get("css"), entry.get("xpath"))
+        self.mode = "all" if entry.get("all") else ("list" if entry.get("list") else "first")
+
+    def evaluate(self, node):
+        matches = self.xpath(node)
+        if not isinstance(matches, list):
+            matches = [matches] if matches else []
+        if self.mode == "first":
+            return _text(matches[0]).strip() if matches else ""
+        parts = [p.strip() for p in map(_text, matches) if p.strip()]
+        return parts if self.mode == "list" else " ".join(parts)
+
+
+class FieldSpec:
+    def __init__(self, name, spec, base_url):
+        self.name = name
+        self.base_url = base_url
+        self.const = spec.get("const")
+        self.alternatives = [_Alternative(entry) for entry in spec.get("select", [])]
+        self.pick = spec.get("pick", {}).get("contains_any")
+        self.skip = [
+            (reason, tuple(prefixes)) for reason, prefixes in spec.get("skip_if_prefix", {}).items()
+        ]
+        self.urljoin = "urljoin" in spec.get("normalize", [])
+        self.default = spec.get("default", "")
+        self.required = spec.get("required", False)
+        self.output = spec.get("output", True)
+
+    def extract(self, node, today=None):
+        """Return (value, skip_reason); an ``@today`` default is ``today`` (default: today's date)."""
+        if self.const is not None:
+            return self.const, None
+        value = ""
+        for alternative in self.alternatives:
+            value = alternative.evaluate(node)
+            if self.pick is not None and isinstance(value, list):
+                value = next((v for v in value if any(n in v for n in self.pick)), "")
+            if value:
+                break
+        if isinstance(value, list):
+            value = " ".join(value)
+        for reason, prefixes in self.skip:
+            if value.startswith(prefixes):
+                return value, reason
+        if not value:
+            if self.required:
+                return value, f"no_{self.name}"
+            default = self.default
+            if default == TODAY:
+                return today or datetime.now().strftime("%Y-%m-%d"), None
+            return default, None
+        if self.urljoin:
+            value = urljoin(self.base_url, value)
+        return value, None
+
+
+class PageResult:
+    __slots__ = ("records", "dropped", "card_count", "next_url")
+
+    def __init__(self, records, dropped, card_count, next_url):
+        self.records = records
+        self.dropped = dropped
+        self.card_count = card_count
+        self.next_url = next_url
+
+
+class SiteSpec:
+    card_cache = None  # a cardcache.CardCache while CardExtractionCache has one open
+
+    def __init__(self, spec):
+        self.name = spec["name"]
+        self.fingerprint = hashlib.blake2b(json.dumps(spec, sort_keys=True).encode("utf-8"), digest_size=8).digest()
+        self.base_url = spec.get("base_url", "")
+        host = urlsplit(self.base_url).hostname or ""
+        self.site = host[4:] if host.startswith("www.") else host
+        self.cards = _compile(spec.get("cards"), spec.get("cards_xpath"))
+        self.max_cards = spec.get("max_cards")
+        self.fields = [FieldSpec(name, field, self.base_url) for name, field in spec["fields"].items()]
+        self.next_page = FieldSpec("next_page", spec["next_page"], self.base_url) if spec.get("next_page") else None
+        self.dated = [field.name for field in self.fields if field.default == TODAY and field.output]
+
+    def extract_card(self, card, today=None):
+        """(record, skip_reason) for one card element."""
+        record = {}
+        for field in self.fields:
+            value, reason = field.extract(card, today)
+            if reason:
+                return None, reason
+            if field.output:
+                record[field.name] = value
+        return record, None
+
+    def extract_tree(self, root, max_cards=None):
+        cards = self.cards(root)
+        limit = max_cards or self.max_cards
+        records, dropped = [], Counter()
+        read = cards[:limit] if limit else cards
+        results = self.card_cache.extract(self, read) if self.card_cache is not None else map(self.extract_card, read)
+        for record, reason in results:
+            if reason:
+                dropped[reason] += 1
+            else:
+                records.append(record)
+        next_url = self.next_page.extract(root)[0] if self.next_page else None
+        return PageResult(records, dropped, len(cards), next_url or None)
+
+    def extract(self, response, max_cards=None):
+        """Run the plan on a Scrapy response, reusing the tree its selector already parsed."""
+        return self.extract_tree(response.selector.root, max_cards)
+
+    def extract_html(self, body, max_cards=None):
+        """Same as extract() for a raw HTML string/bytes (no Scrapy response needed)."""
+        return self.extract_tree(html.fromstring(body), max_cards)
+
+
+@lru_cache(maxsize=None)
+def load_spec(name):
+    """Load and compile ``sitespecs/<name>.json`` (cached, so each spec compiles once)."""
+    data = pkgutil.get_data("indeed_scraper", f"sitespecs/{name}.json")
+    return SiteSpec(json.loads(data))
+
+
+@lru_cache(maxsize=None)
+def spec_for_site(site):
+    """The spec whose ``base_url`` is on ``site`` (e.g. "remote.co"), or None."""
+    for filename in sorted(os.listdir(os.path.join(os.path.dirname(__file__), "sitespecs"))):
+        if filename.endswith(".json"):
+            spec = load_spec(filename[:-5])
+            if spec.site == site:
+                return spec
+    return None
+
+
+def _extract_body(name, body, url, encoding):
+    # parsed the way response.selector parses, so results match extract(response)
+    root = Selector(text=body.decode(encoding, "replace"), base_url=url).root
+    return load_spec(name).extract_tree(root)
+
+
+def spec_extractor(name):
+    """A picklable ``f(body, url, encoding) -> PageResult`` for the process pool (see offload.py)."""
+    return partial(_extract_body, name)
@@ -0,0 +1,80 @@
+"""Spider loader that imports a spider module only when that spider is run.
+
+Scrapy's default loader imports every module under SPIDER_MODULES to build its
+name -> class map, so `scrapy crawl indeed` also pays for (or fails on) the
+imports of every other spider. This loader reads the ``name = "..."`` class
+attribute from each module's source with ``ast`` instead, and imports just
+the module of the requested spider.
+"""
+import ast
+import importlib
+import pkgutil
+import warnings
+from importlib.util import find_spec
+
+from scrapy.spiderloader import SpiderLoader
+from scrapy.utils.spider import iter_spider_classes
+
+
+def _spider_names(source):
+    """(class name, spider name) for classes that assign a literal ``name`` in their body."""
+    for node in ast.parse(source).body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        for stmt in node.body:
+            if (
+                isinstance(stmt, ast.Assign)
+                and any(isinstance(t, ast.Name) and t.id == "name" for t in stmt.targets)
+                and isinstance(stmt.value, ast.Constant)
+                and isinstance(stmt.value.value, str)
+            ):
+                yield node.name, stmt.value.value
+
+
+class LazySpiderLoader(SpiderLoader):
+    def _load_all_spiders(self):
+        self._modules = {}
+        for package in self.spider_modules:
+            for module_name in self._iter_module_names(package):
+                spec = find_spec(module_name)
+                if spec is None or spec.origin is None or not spec.origin.endswith(".py"):
+                    continue
+                with open(spec.origin, encoding="utf-8") as f:
+                    source = f.read()
+                for _, spider_name in _spider_names(source):
+                    if spider_name in self._modules:
+                        warnings.warn(
+                            f"There are several spiders with the same name {spider_name!r} "
+                            f"({self._modules[spider_name]} and {module_name}); this can cause unexpected behavior.",
+                            category=UserWarning,
+                        )
+                    self._modules[spider_name] = module_name
+
+    @staticmethod
+    def _iter_module_names(package):
+        module = importlib.import_module(package)
+        yield package
+        if hasattr(module, "__path__"):
+            for info in pkgutil.walk_packages(module.__path__, package + "."):
+                yield info.name
+
+    def _import(self, spider_name):
+        module = importlib.import_module(self._modules[spider_name])
+        for spcls in iter_spider_classes(module):
+            self._spiders.setdefault(spcls.name, spcls)
+
+    def load(self, spider_name):
+        if spider_name not in self._spiders and spider_name in self._modules:
+            self._import(spider_name)
+        return super().load(spider_name)
+
+    def list(self):
+        return list(self._modules)
+
+    def find_by_request(self, request):
+        # needs every spider's allowed_domains, so this one imports everything
+        for spider_name in self._modules:
+            if spider_name not in self._spiders:
+                self._import(spider_name)
+        return super().find_by_request(request)
+
@@ -1,8 +1,10 @@
 import scrapy
-from urllib.parse import urlencode, urljoin
+from urllib.parse import urlencode
 import os
-from datetime import datetime
-import inspect
+
+from indeed_scraper.events import events_for
+from indeed_scraper.offload import offloaded
+from indeed_scraper.sitespec import load_spec, spec_extractor
 
 headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
@@ -12,6 +14,7 @@ headers = {
 
 API_KEY = os.getenv("SCRAPER_API_KEY", "your_fallback_api_key")
 MAX_API_CALLS = 5
+SPEC = load_spec("indeed")
 
 
 def get_proxy_url(url):
@@ -40,6 +43,9 @@ def get_proxy_url(url):
 
 class IndeedSpider(scrapy.Spider):
     name = "indeed"
+    max_api_calls = MAX_API_CALLS
+    single_call = True  # one results page per run: parse() ignores responses after a second call
+    offload_extractors = {"parse": spec_extractor("indeed")}  # used with PARSE_OFFLOAD_ENABLED
 
     # CUSTOM SCRAPY SETTINGS (Disable retries & robots.txt)
     
@@ -62,138 +68,68 @@ class IndeedSpider(scrapy.Spider):
         self.visited_pages = set()  # Added to prevent duplicate pagination calls
 
     def start_requests(self):
-        search_query = "Python Developer"
-        search_location = "New York, NY"
+        search_query = getattr(self, "search_query", "Python Developer")
+        search_location = getattr(self, "search_location", "New York, NY")
         #Added 24 hrs filter
         indeed_url = f"https://www.indeed.com/jobs?q={search_query}&l={search_location}&fromage=1"
         yield from self.make_api_request(indeed_url, self.parse)
 
-    def make_api_request(self, url, callback, **kwargs):
-        if self.api_calls >= MAX_API_CALLS:
-            self.log(f"⛔ API limit reached ({self.api_calls}/{MAX_API_CALLS}). Stopping crawl.")
+    def make_api_request(self, url, callback, origin="start_requests", **kwargs):
+        if self.api_calls >= self.max_api_calls:
+            events_for(self).info("api_limit", "⛔ API limit reached ({calls}/{limit}). Stopping crawl.", calls=self.api_calls, limit=self.max_api_calls)
             return
 
         self.api_calls += 1
-        self.log(f"📡 API Call #{self.api_calls}: {url}")
-        # this will show which function triggered each call
-        stack = [f"{frame.function}()" for frame in inspect.stack()[1:4]]
-        self.log(f"🧭 Call triggered from: {' → '.join(stack)}")
+        events_for(self).debug("api_call", "📡 API Call #{n}: {url}", n=self.api_calls, url=url)
+        # provenance travels in request.meta instead of walking the call stack
+        events_for(self).debug("api_call_origin", "🧭 Call triggered from: {origin}() → {callback}()", origin=origin, callback=callback.__name__)
 
         yield scrapy.Request(
             get_proxy_url(url),
             callback=callback,
             errback=self.handle_error,
             headers=headers,
-            dont_filter=True,                   # avoid duplicate filtering
-            meta={"dont_redirect": True,},       # disable redirects (each costs credits)
+            meta={"dont_redirect": True, "origin": origin},       # disable redirects (each costs credits)
             **kwargs,
         )
 
     def parse(self, response):
         self.pageCount += 1
-        if self.api_calls > 1:
-            self.log("⛔ Preventing further requests (single-call mode enforced)")
+        if self.single_call and self.api_calls > 1:
+            events_for(self).debug("single_call_mode", "⛔ Preventing further requests (single-call mode enforced)")
             return
 
         
-        self.log(f"--- Fetched page {self.pageCount}: {response.url} (status {response.status})")
-
-        # Use both div.job_seen_beacon and attribute fallbacks for reliability
-        job_cards = response.css('div.job_seen_beacon, a.tapItem')
+        events_for(self).debug("page_fetched", "--- Fetched page {n}: {url} (status {status})", n=self.pageCount, url=response.url, status=response.status)
 
-        if not job_cards:
-            self.log("⚠ No job cards found — check HTML structure.")
+        page = offloaded(response, SPEC.extract, response)
+        if not page.card_count:
+            events_for(self).warning("no_cards", "⚠ No job cards found — check HTML structure: {url}", url=response.url)
             return
         else:
-            self.log(f"✅ Found {len(job_cards)} job cards.")
-
-        for card in job_cards[:5]:
-            title = (
-                card.css("h2.jobTitle span::text").get()
-                or card.css("h2 span::text").get()
-                or card.css("a[aria-label]::attr(aria-label)").get()
-            )
-            company = card.css("span.companyName::text, span[data-testid='company-name']::text").get()
-            # Capture multiline locations (e.g., "New York, NY" + "Remote")
-            location_parts = card.css("div.companyLocation *::text, div[data-testid='text-location'] *::text").getall()
-            location = " ".join(p.strip() for p in location_parts if p.strip())
-            
-
-
-            # --- Salary Extraction ---
-            salary_parts = card.css(
-                "div[id='salaryInfoAndJobType'] span::text, "
-                "div[data-testid='attribute_snippet_text']::text, "
-                "div[data-testid='jobsearch-OtherJobDetailsContainer'] span::text, "
-                "div[data-testid='salary-snippet-container'] span::text, "
-                "span.css-1oc7tea::text, "
-                "span[data-testid='attribute_snippet_text']::text"
-            ).getall()
-            
-            salary = " ".join(p.strip() for p in salary_parts if p.strip())
-            
-            # --- Debug: if no salary found, dump the salary-related HTML ---
-            if not salary:
-                raw_salary_html = card.css(
-                    "div[id='salaryInfoAndJobType'], "
-                    "div[data-testid='jobsearch-OtherJobDetailsContainer'], "
-                    "div[data-testid='attribute_snippet_text'], "
-                    "div[data-testid='salary-snippet-container'], "
-                    "span.css-1oc7tea"
-                ).get()
-            
-                if raw_salary_html:
-                    self.log(f"🧩 Salary HTML found but not parsed correctly: {raw_salary_html[:200]}...")
-                else:
-                    self.log("⚠️ No salary HTML detected in this job card snippet.")
-            
-            # --- Backup extraction ---
-            if not salary:
-                salary = card.xpath(
-                    ".//*[contains(text(), '$') or contains(text(), 'hour') or contains(text(), 'year')]/text()"
-                ).get(default="").strip()
-            
-            if not salary:
-                salary = "Not disclosed"
-
-
-
-
-
-            posted = datetime.now().strftime("%Y-%m-%d")
-            job_url = card.css("a::attr(href)").get()
-
-            if not job_url:
-                continue
+            events_for(self).debug("cards_found", "✅ Found {count} job cards.", count=page.card_count)
+        for reason, count in page.dropped.items():
+            self.crawler.stats.inc_value(f"cards/dropped/{reason}", count)
 
-            if job_url.startswith("/pagead/clk"):
-                self.log(f"⛔ Skipping ad URL: {job_url}")
-                continue
-            elif job_url.startswith("/"):
-                job_url = urljoin("https://www.indeed.com",job_url)
+        for job in page.records:
+            if job["salary"] == "Not disclosed":
+                self.crawler.stats.inc_value("indeed/salary_missing")
 
-            if job_url in self.seen_urls:
+            if job["url"] in self.seen_urls:
+                self.crawler.stats.inc_value("cards/dropped/duplicate")
                 continue
-            if job_url not in self.seen_urls:
-                self.seen_urls.add(job_url)
-
-            yield {
-                "title": (title or "").strip(),
-                "company": (company or "").strip(),
-                "location": (location or "").strip(),
-                "salary": (salary or "").strip(),
-                "posted": posted,
-                "url": job_url,
-            }
+            self.seen_urls.add(job["url"])
+
+            yield job
     
-        self.log(f"📌 Items yielded from page: {len(self.seen_urls)}")
+        events_for(self).debug("page_done", "📌 Items yielded from page: {count}", count=len(self.seen_urls))
 
         # ⚡ No pagination calls — single API hit behavior (like WWR)
-        self.log("✅ Completed single batch scrape (no further pagination).")
+        events_for(self).debug("batch_done", "✅ Completed single batch scrape (no further pagination).")
 
     def handle_error(self, failure):
-        self.log(f"❌ Request failed: {failure.request.url}")
+        events_for(self).request_failed(failure)
 
     def closed(self, reason):
-        self.log(f"🧾 Total ScraperAPI calls made: {self.api_calls}/{MAX_API_CALLS}")
-        self.log(f"📊 Total unique jobs scraped: {len(self.seen_urls)}")
+        events_for(self).info("calls_total", "🧾 Total ScraperAPI calls made: {calls}/{limit}", calls=self.api_calls, limit=self.max_api_calls)
+        events_for(self).info("jobs_total", "📊 Total unique jobs scraped: {count}", count=len(self.seen_urls))
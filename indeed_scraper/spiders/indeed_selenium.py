@@ -1,10 +1,11 @@
 import scrapy
 from datetime import datetime
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-from indeed_scraper.utils.selenium_driver import get_driver
-
 
+# bs4 and selenium/webdriver_manager are imported inside the methods that use
+# them: they are only installed where this spider actually runs, and this
+# module is still imported without running it (`scrapy fetch`/`parse` via
+# find_by_request, or Scrapy's stock SpiderLoader).
 
 
 class IndeedSeleniumSpider(scrapy.Spider):
@@ -15,6 +16,8 @@ class IndeedSeleniumSpider(scrapy.Spider):
         search_location = "New York, NY"
         indeed_url = f"https://www.indeed.com/jobs?q={search_query}&l={search_location}&fromage=1"
 
+        from indeed_scraper.utils.selenium_driver import get_driver
+
         self.log(f"🌐 Fetching jobs with Selenium: {indeed_url}")
         driver = get_driver()
         driver.get(indeed_url)
@@ -26,6 +29,8 @@ class IndeedSeleniumSpider(scrapy.Spider):
         yield from self.parse_html(html, indeed_url)
 
     def parse_html(self, html, url):
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(html, "html.parser")
         job_cards = soup.select("div.job_seen_beacon, a.tapItem")
 
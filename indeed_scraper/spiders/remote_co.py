@@ -1,10 +1,15 @@
 import scrapy
-from urllib.parse import urlencode, urljoin
+from urllib.parse import urlencode
 import os
 from datetime import datetime, timedelta
 
+from indeed_scraper.events import events_for
+from indeed_scraper.offload import offloaded
+from indeed_scraper.sitespec import load_spec, spec_extractor
+
 API_KEY = os.getenv("SCRAPER_API_KEY", "your_fallback_api_key")
 MAX_API_CALLS = 3  # Remote.co is light, so a few API calls max
+SPEC = load_spec("remote_co")
 
 
 def get_proxy_url(url):
@@ -22,6 +27,9 @@ def get_proxy_url(url):
 
 class RemoteCoSpider(scrapy.Spider):
     name = "remote_co"
+    max_api_calls = MAX_API_CALLS
+    offload_extractors = {"parse": spec_extractor("remote_co")}  # used with PARSE_OFFLOAD_ENABLED
+    max_pages = MAX_API_CALLS  # follows the next-page link until the call budget runs out
 
     custom_settings = {
         "RETRY_ENABLED": False,
@@ -40,114 +48,85 @@ class RemoteCoSpider(scrapy.Spider):
         self.cutoff_date = datetime.utcnow() - timedelta(days=1)  # ✅ Only jobs <= 24h old
 
     def start_requests(self):
-        query = "salesforce developer"
+        query = getattr(self, "search_query", "salesforce developer")
         start_url = f"https://remote.co/remote-jobs/search/?search_keywords={query.replace(' ', '+')}"
         yield from self.make_api_request(start_url, self.parse)
 
-    def make_api_request(self, url, callback, **kwargs):
-        if self.api_calls >= MAX_API_CALLS:
-            self.log(f"⛔ API limit reached ({self.api_calls}/{MAX_API_CALLS}). Stopping crawl.")
+    def make_api_request(self, url, callback, origin="start_requests", **kwargs):
+        if self.api_calls >= self.max_api_calls:
+            events_for(self).info("api_limit", "⛔ API limit reached ({calls}/{limit}). Stopping crawl.", calls=self.api_calls, limit=self.max_api_calls)
             return
 
         self.api_calls += 1
-        self.log(f"📡 API Call #{self.api_calls}: {url}")
+        events_for(self).debug("api_call", "📡 API Call #{n}: {url}", n=self.api_calls, url=url)
+        events_for(self).debug("api_call_origin", "🧭 Call triggered from: {origin}() → {callback}()", origin=origin, callback=callback.__name__)
 
         target = get_proxy_url(url)
         yield scrapy.Request(
             target,
             callback=callback,
             errback=self.handle_error,
-            dont_filter=True,
-            meta={"dont_redirect": True},
+            meta={"dont_redirect": True, "origin": origin},
             **kwargs,
         )
 
     def parse(self, response):
         self.page_count += 1
-        self.log(f"✅ Fetched page {self.page_count}: {response.url} (status {response.status})")
-
-        job_cards = response.css("div#job-table-wrapper div.sc-hxaYUE.knZTmB")  # Remote.co uses div.card for job entries
+        events_for(self).debug("page_fetched", "✅ Fetched page {n}: {url} (status {status})", n=self.page_count, url=response.url, status=response.status)
 
-        if not job_cards:
-            self.log("⚠ No job cards found — check HTML structure or blocking")
+        page = offloaded(response, SPEC.extract, response)
+        if not page.card_count:
+            events_for(self).warning("no_cards", "⚠ No job cards found — check HTML structure or blocking: {url}", url=response.url)
             return
         else:
-            self.log(f"✅ Found {len(job_cards)} job cards.")
+            events_for(self).debug("cards_found", "✅ Found {count} job cards.", count=page.card_count)
+        for reason, count in page.dropped.items():
+            self.crawler.stats.inc_value(f"cards/dropped/{reason}", count)
 
         items_scraped = 0
-        for card in job_cards[:30]:
-            title = card.css("a.sc-lcUlUk span.sc-fLdTid.hxOunA::text").get()
-            posted = card.css("a.sc-lcUlUk span.sc-kQZgv.gVdgMf::text").get()
-            job_url = card.css("a.sc-lcUlUk::attr(href)").get()
-            if not job_url:
-                continue
-            
-            # ✅ Fix: Always build full URL using remote.co, not response.urljoin()
-            if job_url.startswith("/"):
-                job_url = f"https://remote.co{job_url}"
-            elif not job_url.startswith("http"):
-                job_url = f"https://remote.co/{job_url}"
-
-            tags = card.css("ul.sc-bBUFSZ.kSPuZK li::text").getall()
-            location = card.css("div.sc-fPcgZv.fSjLPq span.sc-kXbFWK.jgBZbs::text").get()
-
-            # Basic tag filtering
-            job_type = next((t for t in tags if "Full-Time" in t or "Part-Time" in t or "Freelance" in t or "Contract" in t), "Not specified")
-            salary = next((t for t in tags if "$" in t or "Annually" in t or "Hourly" in t), "Not disclosed")
-            company = "Remote.co Listing"  # or set to "Not specified"
+        for job in page.records:
             # ✅ 24-hour filter logic
-            posted_text = (posted or "").strip().lower()
-            include_job = False
-
-            if any(k in posted_text for k in ["hour", "today", "just posted", "minutes ago"]):
-                include_job = True
-            elif "day" in posted_text:
-                try:
-                    days_ago = int([s for s in posted_text.split() if s.isdigit()][0])
-                    if days_ago <= 1:
-                        include_job = True
-                except Exception:
-                    pass
-            else:
-                # fallback: if it's a date, check if within 24 hours
-                try:
-                    posted_date = datetime.strptime(posted_text, "%Y-%m-%d")
-                    include_job = posted_date >= self.cutoff_date
-                except Exception:
-                    include_job = False
-
-            if not include_job:
+            if not self.is_recent(job["posted"]):
+                self.crawler.stats.inc_value("cards/dropped/too_old")
                 continue  # Skip anything older than 24 hours
 
-            if not job_url or job_url in self.seen_urls:
+            if job["url"] in self.seen_urls:
+                self.crawler.stats.inc_value("cards/dropped/duplicate")
                 continue
-            self.seen_urls.add(job_url)
-
-            yield {
-                "title": (title or "").strip(),
-                "company": (company or "").strip(),
-                "location": (location or "").strip(),
-                "posted": posted.strip(),
-                "type": job_type.strip(),
-                "url": job_url,
-            }
+            self.seen_urls.add(job["url"])
+
+            yield job
             items_scraped += 1
 
-        self.log(f"📌 Items yielded from page: {items_scraped}")
+        events_for(self).debug("page_done", "📌 Items yielded from page: {count}", count=items_scraped)
 
         # Pagination
-        next_page = response.css("a.next.page-numbers::attr(href)").get()
-        if next_page and self.api_calls < MAX_API_CALLS:
-            next_url = urljoin("https://remote.co", next_page)
+        next_url = page.next_url
+        if next_url and self.api_calls < self.max_api_calls:
             if next_url not in self.visited_pages:
                 self.visited_pages.add(next_url)
-                yield from self.make_api_request(next_url, self.parse)
+                yield from self.make_api_request(next_url, self.parse, origin="parse")
+
+    def is_recent(self, posted):
+        posted_text = posted.lower()
+        if any(k in posted_text for k in ["hour", "today", "just posted", "minutes ago"]):
+            return True
+        if "day" in posted_text:
+            try:
+                days_ago = int([s for s in posted_text.split() if s.isdigit()][0])
+                return days_ago <= 1
+            except Exception:
+                return False
+        # fallback: if it's a date, check if within 24 hours
+        try:
+            posted_date = datetime.strptime(posted_text, "%Y-%m-%d")
+            return posted_date >= self.cutoff_date
+        except Exception:
+            return False
 
     def handle_error(self, failure):
-        req = getattr(failure, "request", None)
-        url = req.url if req is not None else "unknown"
-        self.log(f"❌ Request failed: {url}")
+        events_for(self).request_failed(failure)
 
     def closed(self, reason):
-        self.log(f"🧾 Total API calls made: {self.api_calls}/{MAX_API_CALLS}")
-        self.log(f"📊 Total unique jobs scraped: {len(self.seen_urls)}")
+        events_for(self).info("calls_total", "🧾 Total API calls made: {calls}/{limit}", calls=self.api_calls, limit=self.max_api_calls)
+        events_for(self).info("jobs_total", "📊 Total unique jobs scraped: {count}", count=len(self.seen_urls))
@@ -5,10 +5,27 @@ import json
 import re  # ✅ FIX: Added missing import for regex
 from datetime import datetime, timedelta, timezone
 
+from indeed_scraper.events import events_for
+from indeed_scraper.offload import offloaded
+
 API_KEY = os.getenv("SCRAPER_API_KEY", "your_fallback_api_key")
 MAX_API_CALLS = 3  # Keep calls low, similar to Remote.co
 
 
+JOB_BLOCK_RE = re.compile(r'<script type="application/ld\+json">\s*(\{.*?\})\s*</script>', re.DOTALL)
+
+
+def extract_job_blocks(body, url=None, encoding="utf-8"):
+    """Decoded JSON-LD blocks of a page, None for each block that is not valid JSON."""
+    blocks = []
+    for block in JOB_BLOCK_RE.findall(body.decode(encoding, "replace")):
+        try:
+            blocks.append(json.loads(block))
+        except json.JSONDecodeError:
+            blocks.append(None)
+    return blocks
+
+
 def get_proxy_url(url):
     payload = {
         "api_key": API_KEY,
@@ -24,6 +41,8 @@ def get_proxy_url(url):
 
 class RemoteOKSpider(scrapy.Spider):
     name = "remoteok"
+    max_api_calls = MAX_API_CALLS
+    offload_extractors = {"parse": extract_job_blocks}  # used with PARSE_OFFLOAD_ENABLED
 
     custom_settings = {
         "RETRY_ENABLED": False,
@@ -43,110 +62,106 @@ class RemoteOKSpider(scrapy.Spider):
         self.cutoff_time = datetime.now(timezone.utc) - timedelta(hours=24)
 
     def start_requests(self):
-        query = "Java"
+        query = getattr(self, "search_query", "Java")
         start_url = f"https://remoteok.com/remote-{query.replace(' ', '-')}-jobs"
         yield from self.make_api_request(start_url, self.parse)
 
-    def make_api_request(self, url, callback, **kwargs):
-        if self.api_calls >= MAX_API_CALLS:
-            self.log(f"⛔ API limit reached ({self.api_calls}/{MAX_API_CALLS}). Stopping crawl.")
+    def make_api_request(self, url, callback, origin="start_requests", **kwargs):
+        if self.api_calls >= self.max_api_calls:
+            events_for(self).info("api_limit", "⛔ API limit reached ({calls}/{limit}). Stopping crawl.", calls=self.api_calls, limit=self.max_api_calls)
             return
 
         self.api_calls += 1
-        self.log(f"📡 API Call #{self.api_calls}: {url}")
+        events_for(self).debug("api_call", "📡 API Call #{n}: {url}", n=self.api_calls, url=url)
+        events_for(self).debug("api_call_origin", "🧭 Call triggered from: {origin}() → {callback}()", origin=origin, callback=callback.__name__)
 
         target = get_proxy_url(url)
         yield scrapy.Request(
             target,
             callback=callback,
             errback=self.handle_error,
-            dont_filter=True,
-            meta={"dont_redirect": True},
+            meta={"dont_redirect": True, "origin": origin},
             **kwargs,
         )
 
     def parse(self, response):
         self.page_count += 1
-        self.log(f"✅ Fetched page {self.page_count}: {response.url} (status {response.status})")
-
-        # ✅ Debug dump (helpful if 0 jobs found)
-        with open("remoteok_debug.html", "wb") as f:
-            f.write(response.body)
+        events_for(self).debug("page_fetched", "✅ Fetched page {n}: {url} (status {status})", n=self.page_count, url=response.url, status=response.status)
 
         # ✅ Extract embedded job data JSON blocks
-        json_blocks = re.findall(
-            r'<script type="application/ld\+json">\s*(\{.*?\})\s*</script>',
-            response.text,
-            re.DOTALL,
-        )
+        json_blocks = offloaded(response, extract_job_blocks, response.body, response.url, response.encoding)
 
         if not json_blocks:
-            self.log("⚠ No JSON job blocks found — check remoteok_debug.html for actual HTML.")
+            # ✅ Debug dump, only for the pages that need a look
+            with open("remoteok_debug.html", "wb") as f:
+                f.write(response.body)
+            events_for(self).warning("no_cards", "⚠ No JSON job blocks found — check remoteok_debug.html for actual HTML: {url}", url=response.url)
             return
 
-        self.log(f"✅ Found {len(json_blocks)} JSON job entries")
+        events_for(self).debug("cards_found", "✅ Found {count} JSON job entries", count=len(json_blocks))
         items_scraped = 0
 
-        for block in json_blocks:
+        for data in json_blocks:
+            if data is None:
+                self.crawler.stats.inc_value("cards/dropped/bad_json")
+                continue
+            date_posted = data.get("datePosted")
+
+            # ✅ Skip if no date
+            if not date_posted:
+                self.crawler.stats.inc_value("cards/dropped/no_date")
+                continue
+
             try:
-                data = json.loads(block)
-                date_posted = data.get("datePosted")
-
-                # ✅ Skip if no date
-                if not date_posted:
-                    continue
-
-                try:
-                    posted_time = datetime.fromisoformat(date_posted.replace("Z", "+00:00"))
-                except ValueError:
-                    continue
-
-                # ✅ Apply 24-hour filter
-                if posted_time < self.cutoff_time:
-                    continue
-                title = (data.get("title") or "").strip()
-                company = (data.get("hiringOrganization", {}).get("name") or "").strip()
-                location = (
-                    data.get("jobLocation", [{}])[0]
-                    .get("address", {})
-                    .get("addressCountry", "Remote")
-                )
-                job_url = data.get("hiringOrganization", {}).get("url") or ""
-                salary_info = data.get("baseSalary", {}).get("value", {})
-                min_salary = salary_info.get("minValue")
-                max_salary = salary_info.get("maxValue")
-                currency = data.get("baseSalary", {}).get("currency", "")
-
-                if not title or not company:
-                    continue
-                if job_url in self.seen_urls:
-                    continue
-                self.seen_urls.add(job_url)
-
-                yield {
-                    "title": title,
-                    "company": company,
-                    "location": location,
-                    "salary_range": (
-                        f"{min_salary}-{max_salary} {currency}"
-                        if min_salary
-                        else "Not specified"
-                    ),
-                    "posted": posted_time.strftime("%Y-%m-%d %H:%M:%S UTC"),
-                    "url": job_url or response.url,
-                }
-                items_scraped += 1
-
-            except json.JSONDecodeError:
+                posted_time = datetime.fromisoformat(date_posted.replace("Z", "+00:00"))
+            except ValueError:
+                self.crawler.stats.inc_value("cards/dropped/bad_date")
                 continue
 
-        self.log(f"📌 Jobs yielded from page: {items_scraped}")
+            # ✅ Apply 24-hour filter
+            if posted_time < self.cutoff_time:
+                self.crawler.stats.inc_value("cards/dropped/too_old")
+                continue
+            title = (data.get("title") or "").strip()
+            company = (data.get("hiringOrganization", {}).get("name") or "").strip()
+            location = (
+                data.get("jobLocation", [{}])[0]
+                .get("address", {})
+                .get("addressCountry", "Remote")
+            )
+            job_url = data.get("hiringOrganization", {}).get("url") or ""
+            salary_info = data.get("baseSalary", {}).get("value", {})
+            min_salary = salary_info.get("minValue")
+            max_salary = salary_info.get("maxValue")
+            currency = data.get("baseSalary", {}).get("currency", "")
+
+            if not title or not company:
+                self.crawler.stats.inc_value("cards/dropped/missing_fields")
+                continue
+            if job_url in self.seen_urls:
+                self.crawler.stats.inc_value("cards/dropped/duplicate")
+                continue
+            self.seen_urls.add(job_url)
+
+            yield {
+                "title": title,
+                "company": company,
+                "location": location,
+                "salary_range": (
+                    f"{min_salary}-{max_salary} {currency}"
+                    if min_salary
+                    else "Not specified"
+                ),
+                "posted": posted_time.strftime("%Y-%m-%d %H:%M:%S UTC"),
+                "url": job_url or response.url,
+            }
+            items_scraped += 1
+
+        events_for(self).debug("page_done", "📌 Jobs yielded from page: {count}", count=items_scraped)
 
     def handle_error(self, failure):
-        req = getattr(failure, "request", None)
-        url = req.url if req else "unknown"
-        self.log(f"❌ Request failed: {url}")
+        events_for(self).request_failed(failure)
 
     def closed(self, reason):
-        self.log(f"🧾 Total API calls made: {self.api_calls}/{MAX_API_CALLS}")
-        self.log(f"📊 Total unique jobs scraped: {len(self.seen_urls)}")
+        events_for(self).info("calls_total", "🧾 Total API calls made: {calls}/{limit}", calls=self.api_calls, limit=self.max_api_calls)
+        events_for(self).info("jobs_total", "📊 Total unique jobs scraped: {count}", count=len(self.seen_urls))
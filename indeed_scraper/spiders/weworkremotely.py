@@ -1,11 +1,14 @@
 import scrapy
-from urllib.parse import urlencode, urljoin
+from urllib.parse import urlencode
 import os
-from datetime import datetime
+
+from indeed_scraper.events import events_for
+from indeed_scraper.offload import offloaded
+from indeed_scraper.sitespec import load_spec, spec_extractor
 
 API_KEY = os.getenv("SCRAPER_API_KEY", "your_fallback_api_key")
 MAX_API_CALLS = 5
-
+SPEC = load_spec("weworkremotely")
 
 
 def get_proxy_url(url):
@@ -24,6 +27,9 @@ def get_proxy_url(url):
 
 class WeWorkRemotelySpider(scrapy.Spider):
     name = "weworkremotely"
+    max_api_calls = MAX_API_CALLS
+    offload_extractors = {"parse": spec_extractor("weworkremotely")}  # used with PARSE_OFFLOAD_ENABLED
+    max_pages = MAX_API_CALLS  # follows rel=next links until the call budget runs out
 
     custom_settings = {
         "RETRY_ENABLED": False,
@@ -41,18 +47,19 @@ class WeWorkRemotelySpider(scrapy.Spider):
         self.seen_urls = set()
 
     def start_requests(self):
-        query = "rails developer"
+        query = getattr(self, "search_query", "rails developer")
         # Add the 'Past 24 Hours' filter to the search URL
         start_url = f"https://weworkremotely.com/remote-jobs/search?term={query.replace(' ', '+')}&sort=Past+24+Hours"
         yield from self.make_api_request(start_url, self.parse)
 
-    def make_api_request(self, url, callback, **kwargs):
-        if self.api_calls >= MAX_API_CALLS:
-            self.log(f"⛔ API limit reached ({self.api_calls}/{MAX_API_CALLS}). Stopping crawl.")
+    def make_api_request(self, url, callback, origin="start_requests", **kwargs):
+        if self.api_calls >= self.max_api_calls:
+            events_for(self).info("api_limit", "⛔ API limit reached ({calls}/{limit}). Stopping crawl.", calls=self.api_calls, limit=self.max_api_calls)
             return
 
         self.api_calls += 1
-        self.log(f"📡 API Call #{self.api_calls}: {url}")
+        events_for(self).debug("api_call", "📡 API Call #{n}: {url}", n=self.api_calls, url=url)
+        events_for(self).debug("api_call_origin", "🧭 Call triggered from: {origin}() → {callback}()", origin=origin, callback=callback.__name__)
 
         target = get_proxy_url(url)
 
@@ -60,76 +67,46 @@ class WeWorkRemotelySpider(scrapy.Spider):
             target,
             callback=callback,
             errback=self.handle_error,
-            dont_filter=True,
-            meta={"dont_redirect": True},
+            meta={"dont_redirect": True, "origin": origin},
             **kwargs,
         )
 
     def parse(self, response):
         self.page_count += 1
-        self.log(f"--- Fetched page {self.page_count}: {response.url} (status {response.status})")
+        events_for(self).debug("page_fetched", "--- Fetched page {n}: {url} (status {status})", n=self.page_count, url=response.url, status=response.status)
 
-        # WWR common patterns: job listings are anchors under job lists; fallback selectors included
-        job_cards = response.css("li.new-listing-container:not(.feature--ad)")
-
-        if not job_cards:
-            self.log("⚠ No job cards found — check HTML structure or blocking")
+        page = offloaded(response, SPEC.extract, response)
+        if not page.card_count:
+            events_for(self).warning("no_cards", "⚠ No job cards found — check HTML structure or blocking: {url}", url=response.url)
             return
         else:
-            self.log(f"✅ Found {len(job_cards)} job cards (raw).")
+            events_for(self).debug("cards_found", "✅ Found {count} job cards (raw).", count=page.card_count)
+        for reason, count in page.dropped.items():
+            self.crawler.stats.inc_value(f"cards/dropped/{reason}", count)
 
         items_scraped = 0
-        for card in job_cards[:30]:
-            # The `card` might be <article> or <li> or <a> — find the link first
-            href = card.css("a[href^='/remote-jobs/']::attr(href)").get()
-            if not href:
-                continue
-            # Build absolute URL
-            job_url = urljoin("https://weworkremotely.com", href)
-
+        for job in page.records:
             # Skip duplicates
-            if job_url in self.seen_urls:
+            if job["url"] in self.seen_urls:
+                self.crawler.stats.inc_value("cards/dropped/duplicate")
                 continue
-            self.seen_urls.add(job_url)
-
-            # Title, company, location, date
-            title = card.css("h3.new-listing__header__title::text").get()
-            company = card.css("p.new-listing__company-name::text").get()
-            location = card.css("p.new-listing__company-headquarters::text").get()
-            posted = card.css("p.new-listing__header__icons__date::text").get()
-            posted = posted.strip() if posted else datetime.now().strftime("%Y-%m-%d")
-            categories = card.css("div.new-listing__categories p::text").getall()
-            salary = next((c.strip() for c in categories if "$" in c), "Not disclosed")
-
-            
-
-            yield {
-                "title": (title or "").strip(),
-                "company": (company or "").strip(),
-                "location": (location or "").strip(),
-                "posted": posted,
-                "salary": salary,
-                "url": job_url,
-            }
+            self.seen_urls.add(job["url"])
+
+            yield job
             items_scraped += 1
 
-        self.log(f"📌 Items yielded from page: {items_scraped}")
+        events_for(self).debug("page_done", "📌 Items yielded from page: {count}", count=items_scraped)
 
-         # Pagination (if any)
-        next_page = response.css("a[rel='next']::attr(href)").get()
-        if next_page and self.api_calls < MAX_API_CALLS:
-            next_url = urljoin("https://weworkremotely.com", next_page)
+        # Pagination (if any)
+        next_url = page.next_url
+        if next_url and self.api_calls < self.max_api_calls:
             if next_url not in self.visited_pages:
                 self.visited_pages.add(next_url)
-                yield from self.make_api_request(next_url, self.parse)
-
-        
+                yield from self.make_api_request(next_url, self.parse, origin="parse")
 
     def handle_error(self, failure):
-        req = getattr(failure, "request", None)
-        url = req.url if req is not None else "unknown"
-        self.log(f"❌ Request failed: {url}")
+        events_for(self).request_failed(failure)
 
     def closed(self, reason):
-        self.log(f"🧾 Total API calls made: {self.api_calls}/{MAX_API_CALLS}")
-        self.log(f"📊 Total unique jobs scraped: {len(self.seen_urls)}")
+        events_for(self).info("calls_total", "🧾 Total API calls made: {calls}/{limit}", calls=self.api_calls, limit=self.max_api_calls)
+        events_for(self).info("jobs_total", "📊 Total unique jobs scraped: {count}", count=len(self.seen_urls))
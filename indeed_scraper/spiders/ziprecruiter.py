@@ -3,11 +3,23 @@ from urllib.parse import urlencode
 import os
 from datetime import datetime
 from scrapy.exceptions import CloseSpider
-import inspect
+
+from indeed_scraper.events import events_for
+from indeed_scraper.sitespec import load_spec
+from indeed_scraper.utils.structured import (
+    format_salary,
+    iter_dicts_with,
+    iter_hydration,
+    iter_job_postings,
+    iter_json_ld,
+    job_posting_location,
+    job_posting_salary,
+)
 
 API_KEY = os.getenv("SCRAPER_API_KEY", "your_fallback_api_key")
 MAX_API_CALLS = 5
 MAX_JOBS=5
+SPEC = load_spec("ziprecruiter")
 
 
 def get_proxy_url(url):
@@ -27,6 +39,8 @@ def get_proxy_url(url):
 
 class ZipRecruiterSpider(scrapy.Spider):
     name = "ziprecruiter"
+    max_api_calls = MAX_API_CALLS
+    single_call = True  # one results page per run: parse() ignores responses after a second call
     custom_settings = {
         "ROBOTSTXT_OBEY": False,
         "DOWNLOAD_DELAY": 1,
@@ -42,29 +56,29 @@ class ZipRecruiterSpider(scrapy.Spider):
         self.jobs_scraped = 0
 
     def start_requests(self):
-        search_query = "Python Developer"
-        search_location = "New York, NY"
+        search_query = getattr(self, "search_query", "Python Developer")
+        search_location = getattr(self, "search_location", "New York, NY")
 
         # ZipRecruiter Search URL
         zr_url = f"https://www.ziprecruiter.com/jobs-search?search={search_query.replace(' ', '+')}&location={search_location.replace(' ', '+')}&days=1"
         yield from self.make_api_request(zr_url, self.parse)
 
-    def make_api_request(self, url, callback, **kwargs):
-        if self.api_calls >= MAX_API_CALLS:
-            self.log(f"⛔ API limit reached ({self.api_calls}/{MAX_API_CALLS}). Stopping crawl.")
+    def make_api_request(self, url, callback, origin="start_requests", **kwargs):
+        if self.api_calls >= self.max_api_calls:
+            events_for(self).info("api_limit", "⛔ API limit reached ({calls}/{limit}). Stopping crawl.", calls=self.api_calls, limit=self.max_api_calls)
             return
 
         self.api_calls += 1
-        self.log(f"📡 API Call #{self.api_calls}: {url}")
-        stack = [f"{frame.function}()" for frame in inspect.stack()[1:4]]
-        self.log(f"🧭 Call triggered from: {' → '.join(stack)}")
+        events_for(self).debug("api_call", "📡 API Call #{n}: {url}", n=self.api_calls, url=url)
+        # provenance travels in request.meta instead of walking the call stack
+        events_for(self).debug("api_call_origin", "🧭 Call triggered from: {origin}() → {callback}()", origin=origin, callback=callback.__name__)
         yield scrapy.Request(
             get_proxy_url(url),
             callback=callback,
             errback=self.handle_error,
-            dont_filter=True,
             meta={
                 "dont_redirect": True,
+                "origin": origin,
                 "handle_httpstatus_list": [301, 302, 303, 307, 308],
             },
             **kwargs,
@@ -73,81 +87,111 @@ class ZipRecruiterSpider(scrapy.Spider):
 
     def parse(self, response):
         self.pageCount += 1
-        if self.api_calls > 1:
-            self.log(f"--- Fetched page {self.pageCount}: {response.url} (status {response.status})")
+        if self.single_call and self.api_calls > 1:
+            events_for(self).debug("page_fetched", "--- Fetched page {n}: {url} (status {status})", n=self.pageCount, url=response.url, status=response.status)
             return
-        self.log(f"✅ Fetched page {self.pageCount}: {response.url} (status {response.status})")
-    
-        # --- Job Card Detection ---
-        job_cards = response.css("div.flex.flex-col")
-    
-        if not job_cards:
-            self.log("⚠ No job cards found — check HTML structure.")
+        events_for(self).debug("page_fetched", "✅ Fetched page {n}: {url} (status {status})", n=self.pageCount, url=response.url, status=response.status)
+
+        # --- Structured data first (JSON-LD, then hydration JSON); CSS only as a fallback ---
+        jobs, path = self.extract_structured(response)
+        if not jobs:
+            jobs, path = self.extract_cards(response), "css"
+        self.crawler.stats.inc_value(f"ziprecruiter/extract_path/{path}")
+
+        if not jobs:
+            events_for(self).warning("no_cards", "⚠ No job cards found — check HTML structure: {url}", url=response.url)
             return
-        self.log(f"✅ Found {len(job_cards)} job cards.")
-    
-        for card in job_cards[:10]:
-            # --- Job Title ---
-            title = (
-                card.css("h2::text").get()
-                or card.css("h2[aria-label]::attr(aria-label)").get()
-                or card.css("button[aria-label]::attr(aria-label)").get()
-            )
-            title = (title or "").strip()
-    
-            # --- Company Name ---
-            company = card.css("a[data-testid='job-card-company']::text").get()
-            company = (company or "").strip() or "Unknown company"
-    
-            # --- Location ---
-            location_parts = card.css("a[data-testid='job-card-location']::text, p span::text").getall()
-            location = " ".join(p.strip() for p in location_parts if p.strip())
-            if not location:
-                location = "Not specified"
-    
-            # --- Salary ---
-            salary_parts = card.css(
-                "span[data-testid='job-card-salary']::text, "
-                "div[data-testid='salary_estimate']::text, "
-                "span[data-testid='estimated-salary']::text"
-            ).getall()
-            salary = " ".join(p.strip() for p in salary_parts if p.strip())
-            if not salary:
-                salary = "Not disclosed"
-    
-            # --- Posted Date ---
-            posted = datetime.now().strftime("%Y-%m-%d")
-    
+        events_for(self).debug("cards_found", "✅ Found {count} jobs ({path}).", count=len(jobs), path=path)
+
+        for job in jobs[:10]:
             # --- Job URL ---
-            job_url = card.css("a[data-testid='job-card-company']::attr(href)").get()
+            job_url = job["url"]
             if job_url and job_url.startswith("/"):
                 job_url = f"https://www.ziprecruiter.com{job_url}"
             elif not job_url:
+                self.crawler.stats.inc_value("cards/dropped/no_url")
                 continue
-    
+
             # --- Skip Duplicates ---
             if job_url in self.seen_urls:
+                self.crawler.stats.inc_value("cards/dropped/duplicate")
                 continue
             self.seen_urls.add(job_url)
-    
+
             # --- Yield Structured Job Data ---
             yield {
-                "title": title or "No title",
-                "company": company or "Unknown company",
-                "location": location,
-                "salary": salary,
-                "posted": posted,
+                "title": job["title"] or "No title",
+                "company": job["company"] or "Unknown company",
+                "location": job["location"] or "Not specified",
+                "salary": job["salary"] or "Not disclosed",
+                "posted": job["posted"] or datetime.now().strftime("%Y-%m-%d"),
                 "url": job_url,
             }
-    
-
-
 
+    def extract_structured(self, response):
+        """Jobs from the page's embedded JSON, decoded once per script block; ([], None) if there are none."""
+        jobs = [
+            self.job_from_posting(posting)
+            for data in iter_json_ld(response)
+            for posting in iter_job_postings(data)
+        ]
+        if jobs:
+            return jobs, "json_ld"
+
+        jobs = [
+            self.job_from_hydration(card)
+            for data in iter_hydration(response)
+            for card in iter_dicts_with(data, ("title", "company"))
+        ]
+        jobs = [job for job in jobs if job["url"]]
+        if jobs:
+            return jobs, "hydration"
+        return [], None
+
+    @staticmethod
+    def job_from_posting(posting):
+        organization = posting.get("hiringOrganization") or {}
+        if isinstance(organization, str):
+            organization = {"name": organization}
+        return {
+            "title": (posting.get("title") or "").strip(),
+            "company": (organization.get("name") or "").strip(),
+            "location": job_posting_location(posting),
+            "salary": job_posting_salary(posting),
+            "posted": (posting.get("datePosted") or "")[:10],
+            "url": posting.get("url") or "",
+        }
+
+    @staticmethod
+    def job_from_hydration(card):
+        # ZipRecruiter's job-card state: nested company/location objects and annual pay bounds
+        def name_of(value, *keys):
+            if isinstance(value, dict):
+                return next((value[k] for k in keys if value.get(k)), "")
+            return value or ""
+
+        pay = card.get("pay") or {}
+        salary = card.get("salary") or ""
+        if isinstance(pay, dict) and (pay.get("minAnnual") or pay.get("maxAnnual")):
+            salary = format_salary(pay.get("minAnnual"), pay.get("maxAnnual"), "YEAR")
+        return {
+            "title": str(card.get("title") or "").strip(),
+            "company": str(name_of(card.get("company"), "canonicalDisplayName", "displayName", "name")).strip(),
+            "location": str(name_of(card.get("location"), "displayName", "name")).strip(),
+            "salary": salary if isinstance(salary, str) else "",
+            "posted": str(card.get("postedDate") or card.get("datePosted") or "")[:10],
+            "url": card.get("jobUrl") or card.get("rawCanonicalZipJobPageUrl") or card.get("url") or "",
+        }
+
+    def extract_cards(self, response):
+        # Fallback: the ziprecruiter site spec selects only the innermost flex-col
+        # containers holding a company link, so nested layout divs don't produce phantom cards
+        return SPEC.extract(response).records
 
     def handle_error(self, failure):
-        self.log(f"❌ Request failed: {failure.request.url}")
+        events_for(self).request_failed(failure)
 
     def closed(self, reason):
-        self.log(f"🧾 Total ScraperAPI calls made: {self.api_calls}/{MAX_API_CALLS}")
-        self.log(f"📊 Total unique jobs scraped: {len(self.seen_urls)}")
-        self.log(f"🚪 Spider closed due to: {reason}")
+        events_for(self).info("calls_total", "🧾 Total ScraperAPI calls made: {calls}/{limit}", calls=self.api_calls, limit=self.max_api_calls)
+        events_for(self).info("jobs_total", "📊 Total unique jobs scraped: {count}", count=len(self.seen_urls))
+        events_for(self).info("closed", "🚪 Spider closed due to: {reason}", reason=reason)
@@ -0,0 +1,283 @@
+"""Stream items as NDJSON to a local consumer while the crawl runs (STREAM_URL).
+
+``StreamingItemPipeline`` serializes every item to one JSON line and hands
+it to a writer thread, which sends it to::
+
+    unix:///run/jobs.sock          a Unix stream socket (the consumer listens)
+    pipe:///tmp/jobs.fifo          a named pipe (the consumer reads)
+    http://127.0.0.1:8080/items    POSTed in batches as application/x-ndjson
+
+At most STREAM_BUFFER_ITEMS lines wait for the consumer. Once the buffer is
+full, the crawl is paused (no new requests are sent) and items that are
+still coming out of callbacks wait in the pipeline instead of piling up in
+memory. The crawl resumes once the consumer has caught up to half the
+buffer. A consumer that goes away is reconnected to every
+STREAM_RECONNECT_DELAY seconds; the crawl stays paused meanwhile, for at
+most STREAM_PAUSE_TIMEOUT seconds. After that the consumer counts as
+stalled: the crawl goes on and new lines are dropped until the consumer has
+caught up to half the buffer again. A batch the HTTP consumer rejects with a
+4xx status (other than 408/429) is dropped rather than sent again.
+
+When the spider closes, the writer gets STREAM_CLOSE_TIMEOUT seconds to
+flush what is left. Lines still unsent then, like all lines dropped
+earlier, are counted as ``stream/dropped``. The regular feeds are
+unaffected either way.
+"""
+import http.client
+import os
+import queue
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from itemadapter import ItemAdapter
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.defer import maybe_deferred_to_future
+from scrapy.utils.serialize import ScrapyJSONEncoder
+from twisted.internet import task
+from twisted.internet.defer import Deferred
+from twisted.internet.threads import deferToThread
+
+_CLOSE = object()
+# 4xx statuses worth sending the batch again for
+_RETRY_STATUSES = {408, 429}
+
+
+class RejectedError(Exception):
+    """The consumer refused a batch; sending it again will not help."""
+
+
+class UnixSocketSink:
+    def __init__(self, path):
+        self.path = path
+        self.sock = None
+
+    def send(self, data):
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(self.path)
+        self.sock.sendall(data)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class PipeSink:
+    def __init__(self, path):
+        self.path = path
+        self.fd = None
+
+    def send(self, data):
+        if self.fd is None:
+            # blocks until a reader has the pipe open
+            self.fd = os.open(self.path, os.O_WRONLY)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class HttpSink:
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.timeout = timeout
+        self.conn = None
+
+    def send(self, data):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        self.conn.request("POST", self.path, body=data, headers={"Content-Type": "application/x-ndjson"})
+        response = self.conn.getresponse()
+        response.read()
+        if 400 <= response.status < 500 and response.status not in _RETRY_STATUSES:
+            raise RejectedError(f"{self.host}:{self.port}{self.path} answered {response.status}")
+        if response.status >= 400:
+            raise OSError(f"{self.host}:{self.port}{self.path} answered {response.status}")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def open_sink(url):
+    scheme = urlsplit(url).scheme
+    if scheme == "unix":
+        return UnixSocketSink(urlsplit(url).path)
+    if scheme in ("pipe", "fifo"):
+        return PipeSink(urlsplit(url).path)
+    if scheme == "http":
+        return HttpSink(url)
+    raise NotConfigured(f"STREAM_URL must be unix://, pipe:// or http://, got {url!r}")
+
+
+class StreamingItemPipeline:
+    def __init__(self, crawler, sink, buffer_items, batch_items, reconnect_delay, pause_timeout, close_timeout):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.sink = sink
+        self.buffer_items = buffer_items
+        self.batch_items = batch_items
+        self.reconnect_delay = reconnect_delay
+        self.pause_timeout = pause_timeout
+        self.close_timeout = close_timeout
+        self.encoder = ScrapyJSONEncoder(ensure_ascii=False)
+        self.lines = queue.Queue()
+        self.pending = 0  # lines handed to the writer and not yet sent; reactor thread only
+        self.waiters = []
+        self.paused_at = None
+        self.watch = None
+        self.stalled = False  # paused too long: lines are dropped until the consumer catches up
+        self.released = False  # the crawl is ending: nothing waits for the consumer any more
+        self.closing = False  # the writer gives up
+        self.writer = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        url = settings.get("STREAM_URL")
+        if not url:
+            raise NotConfigured
+        o = cls(
+            crawler,
+            open_sink(url),
+            max(1, settings.getint("STREAM_BUFFER_ITEMS")),
+            max(1, settings.getint("STREAM_BATCH_ITEMS")),
+            settings.getfloat("STREAM_RECONNECT_DELAY"),
+            settings.getfloat("STREAM_PAUSE_TIMEOUT"),
+            settings.getfloat("STREAM_CLOSE_TIMEOUT"),
+        )
+        # waiters must never outlive the crawl, whatever ends it
+        crawler.signals.connect(o.release, signal=signals.spider_closed)
+        crawler.signals.connect(o.release, signal=signals.engine_stopped)
+        return o
+
+    def open_spider(self, spider):
+        self.writer = threading.Thread(target=self._write_loop, name="stream-writer", daemon=True)
+        self.writer.start()
+
+    async def process_item(self, item, spider):
+        while self.pending >= self.buffer_items and not (self.stalled or self.released):
+            self._pause()
+            waiter = Deferred()
+            self.waiters.append(waiter)
+            await maybe_deferred_to_future(waiter)
+        if self.stalled or self.closing:
+            self.stats.inc_value("stream/dropped")
+            return item
+        line = (self.encoder.encode(ItemAdapter(item).asdict()) + "\n").encode("utf-8")
+        self.pending += 1
+        self.lines.put(line)
+        return item
+
+    def close_spider(self, spider):
+        self.lines.put(_CLOSE)
+        # the writer's last _sent() calls reach the reactor before this Deferred fires
+        d = deferToThread(self.writer.join, self.close_timeout)
+        d.addCallback(self._closed)
+        return d
+
+    def _closed(self, _):
+        if self.writer.is_alive():
+            # the consumer never came back; give up on the rest
+            self.closing = True
+            self.stats.inc_value("stream/dropped", self.pending)
+        self.release()
+
+    def release(self):
+        """Stop holding items back for good: the crawl is ending, close_spider flushes the rest."""
+        self.released = True
+        self._resume()
+
+    # --- reactor side of the backpressure ---
+
+    def _pause(self):
+        if self.paused_at is None:
+            self.paused_at = time.monotonic()
+            self.stats.inc_value("stream/pauses")
+            self.crawler.engine.pause()
+            self.watch = task.LoopingCall(self._watch)
+            self.watch.start(min(1.0, self.pause_timeout), now=False)
+
+    def _watch(self):
+        # a shutdown (Ctrl-C, SIGTERM) can only finish once the waiting items are let go
+        if not self.crawler.crawling:
+            self.release()
+        elif time.monotonic() - self.paused_at >= self.pause_timeout:
+            self.stalled = True
+            self.stats.inc_value("stream/stalls")
+            self._resume()
+
+    def _resume(self):
+        if self.watch is not None and self.watch.running:
+            self.watch.stop()
+        self.watch = None
+        if self.paused_at is not None:
+            self.stats.inc_value("stream/paused_seconds", round(time.monotonic() - self.paused_at, 3))
+            self.paused_at = None
+            self.crawler.engine.unpause()
+        waiters, self.waiters = self.waiters, []
+        for waiter in waiters:
+            waiter.callback(None)
+
+    def _sent(self, count, size):
+        self.stats.inc_value("stream/items", count)
+        self.stats.inc_value("stream/bytes", size)
+        self._done(count)
+
+    def _rejected(self, count):
+        self.stats.inc_value("stream/dropped", count)
+        self._done(count)
+
+    def _done(self, count):
+        self.pending -= count
+        if self.pending <= self.buffer_items // 2:
+            self.stalled = False
+            self._resume()
+
+    # --- writer thread ---
+
+    def _write_loop(self):
+        from twisted.internet import reactor
+
+        done = False
+        while not done:
+            batch = [self.lines.get()]
+            while len(batch) < self.batch_items:
+                try:
+                    batch.append(self.lines.get_nowait())
+                except queue.Empty:
+                    break
+            if batch[-1] is _CLOSE:
+                batch.pop()
+                done = True
+            if not batch:
+                continue
+            payload = b"".join(batch)
+            while not self.closing:
+                try:
+                    self.sink.send(payload)
+                    reactor.callFromThread(self._sent, len(batch), len(payload))
+                    break
+                except RejectedError:
+                    reactor.callFromThread(self.stats.inc_value, "stream/errors/RejectedError")
+                    reactor.callFromThread(self._rejected, len(batch))
+                    break
+                except (OSError, http.client.HTTPException) as e:
+                    reactor.callFromThread(self.stats.inc_value, f"stream/errors/{type(e).__name__}")
+                    self.sink.close()
+                    time.sleep(self.reconnect_delay)
+            if self.closing:
+                break
+        self.sink.close()
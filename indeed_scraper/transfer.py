@@ -0,0 +1,143 @@
+"""Smaller, capped provider responses: per-site size limits, transfer stats, early cut-off.
+
+Scrapy's HttpCompressionMiddleware already asks for gzip/deflate (and br
+when ``brotli`` is installed) and decodes the answer; the provider APIs
+compress their responses when asked. ``TransferMiddleware`` adds, per
+target site (``site_for``):
+
+- SITE_DOWNLOAD_MAXSIZE: a body size cap (``download_maxsize``), applied on
+  the wire and again after decompression. A bigger body fails the request.
+- ``transfer/wire_bytes/<site>`` and ``transfer/decoded_bytes/<site>``: the
+  body as received and after decoding, so the compression ratio per board
+  shows in the stats.
+- With DOWNLOAD_TRUNCATE_ENABLED, the download stops once the listing is
+  complete. DOWNLOAD_TRUNCATE_AFTER maps a site to ``[marker, count]``: the
+  body ends right after the tag holding the ``count``-th ``marker``. Examples
+  are the pagination link, or the card after the last one the spec reads.
+  Compressed bodies are decoded as they arrive to find the marker. A cut
+  response carries the ``download_stopped`` flag. It is counted under
+  ``transfer/truncated/<site>`` only if bytes were actually left unread
+  (Content-Length above what arrived); a body without a Content-Length is
+  not counted.
+"""
+import weakref
+import zlib
+
+from scrapy import signals
+from scrapy.exceptions import StopDownload
+
+from indeed_scraper.providers import site_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _decoder(encoding):
+    encoding = encoding.strip().lower()
+    if encoding in (b"", b"identity"):
+        return lambda data: data
+    if encoding in (b"gzip", b"x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS).decompress
+    if encoding == b"deflate":
+        return zlib.decompressobj().decompress
+    if encoding == b"br" and brotli is not None:
+        return brotli.Decompressor().process
+    return None
+
+
+class _Cutoff:
+    """Watches one download's decoded bytes for the ``count``-th ``marker``."""
+
+    def __init__(self, marker, count, decode, expected=-1):
+        self.marker = marker
+        self.remaining = count
+        self.decode = decode
+        self.tail = b""
+        self.expected = expected  # body_length from the headers, -1 if unknown
+        self.received = 0
+
+    @property
+    def cut_short(self):
+        return self.received < self.expected
+
+    def feed(self, data):
+        """True once the tag holding the last marker has closed."""
+        self.received += len(data)
+        buffer = self.tail + self.decode(data)
+        start = 0
+        while self.remaining:
+            found = buffer.find(self.marker, start)
+            if found < 0:
+                self.tail = buffer[-(len(self.marker) - 1):] if len(self.marker) > 1 else b""
+                return False
+            self.remaining -= 1
+            start = found + len(self.marker)
+        if buffer.find(b">", start) >= 0:
+            return True
+        self.tail = b""
+        return False
+
+
+class TransferMiddleware:
+    def __init__(self, crawler, maxsizes, truncate_after):
+        self.stats = crawler.stats
+        self.maxsizes = maxsizes
+        self.truncate_after = truncate_after
+        self.cutoffs = weakref.WeakKeyDictionary()
+        crawler.signals.connect(self.response_downloaded, signal=signals.response_downloaded)
+        if truncate_after:
+            crawler.signals.connect(self.headers_received, signal=signals.headers_received)
+            crawler.signals.connect(self.bytes_received, signal=signals.bytes_received)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        truncate_after = {}
+        if settings.getbool("DOWNLOAD_TRUNCATE_ENABLED"):
+            truncate_after = {
+                site: (marker.encode("utf-8"), int(count))
+                for site, (marker, count) in settings.getdict("DOWNLOAD_TRUNCATE_AFTER").items()
+            }
+        return cls(crawler, settings.getdict("SITE_DOWNLOAD_MAXSIZE"), truncate_after)
+
+    def process_request(self, request, spider):
+        site = site_for(request.url)
+        if site in self.maxsizes and "download_maxsize" not in request.meta:
+            request.meta["download_maxsize"] = int(self.maxsizes[site])
+        if site in self.truncate_after and not request.meta.get("dont_truncate"):
+            request.meta["truncate_after"] = self.truncate_after[site]
+        request.meta.pop("download_truncated", None)
+
+    def process_response(self, request, response, spider):
+        # below HttpCompressionMiddleware: the body is decoded by now
+        site = site_for(request.url)
+        self.stats.inc_value(f"transfer/decoded_bytes/{site}", len(response.body))
+        if "download_stopped" in response.flags and request.meta.get("download_truncated"):
+            self.stats.inc_value(f"transfer/truncated/{site}")
+        return response
+
+    def response_downloaded(self, response, request, spider):
+        site = site_for(request.url)
+        self.stats.inc_value(f"transfer/wire_bytes/{site}", len(response.body))
+        if response.headers.get("Content-Encoding"):
+            self.stats.inc_value(f"transfer/compressed_responses/{site}")
+
+    # --- cut-off, on the download handler's signals ---
+
+    def headers_received(self, headers, body_length, request, spider):
+        truncate_after = request.meta.get("truncate_after")
+        if not truncate_after:
+            return
+        decode = _decoder(headers.get("Content-Encoding") or b"")
+        if decode is not None:  # an encoding we cannot follow: download it all
+            self.cutoffs[request] = _Cutoff(*truncate_after, decode, body_length)
+
+    def bytes_received(self, data, request, spider):
+        cutoff = self.cutoffs.get(request)
+        if cutoff is not None and cutoff.feed(data):
+            del self.cutoffs[request]
+            # the marker may only turn up in the last chunk: that is no saving
+            request.meta["download_truncated"] = cutoff.cut_short
+            raise StopDownload(fail=False)
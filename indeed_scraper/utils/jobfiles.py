@@ -0,0 +1,44 @@
+import csv
+import os
+
+# Column layouts of the CSVs the workflows commit to the repo root. Only
+# indeed/remote.co keep a header; the others are appended without one.
+KNOWN_LAYOUTS = {
+    "indeed_jobs.csv": ("indeed", ["title", "company", "location", "salary", "posted", "url"]),
+    "zenrows_jobs.csv": ("indeed_zenrows", ["title", "company", "location", "salary", "posted", "url"]),
+    "zip_jobs.csv": ("ziprecruiter", ["title", "company", "location", "salary", "posted", "url"]),
+    "wwr_jobs.csv": ("weworkremotely", ["title", "company", "location", "posted", "salary", "url"]),
+    "remote_co_jobs.csv": ("remote_co", ["title", "company", "location", "posted", "type", "url"]),
+    "remoteok_jobs.csv": ("remoteok", ["title", "company", "location", "salary_range", "posted", "url"]),
+}
+
+DEFAULT_LAYOUT = ["title", "company", "location", "salary", "posted", "url"]
+
+
+def source_for(path):
+    name = os.path.basename(path)
+    if name in KNOWN_LAYOUTS:
+        return KNOWN_LAYOUTS[name][0]
+    return name.rsplit(".", 1)[0].replace("_jobs", "")
+
+
+def read_jobs(path):
+    """Yield job dicts from one of the committed CSVs, whatever its header situation.
+
+    Header lines (including ones merged into the middle of the file) are used to
+    re-key the following rows; short rows (older remoteok runs without ``posted``)
+    are mapped by dropping the missing column.
+    """
+    columns = KNOWN_LAYOUTS.get(os.path.basename(path), (None, DEFAULT_LAYOUT))[1]
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row:
+                continue
+            if "url" in row and "title" in row:
+                columns = row
+                continue
+            if len(row) == len(columns):
+                yield dict(zip(columns, row))
+            elif len(row) == len(columns) - 1 and "posted" in columns:
+                short = [c for c in columns if c != "posted"]
+                yield dict(zip(short, row))
@@ -0,0 +1,99 @@
+import re
+import unicodedata
+from datetime import date, datetime, timedelta
+
+# Legal suffixes that boards add or drop at random ("Acme Inc." vs "Acme")
+COMPANY_SUFFIXES = {
+    "inc", "llc", "ltd", "llp", "corp", "corporation", "co", "company",
+    "plc", "gmbh", "limited", "incorporated", "group",
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_text(value):
+    """Lowercase, strip accents and collapse everything non-alphanumeric to single spaces."""
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", str(value))
+    value = value.encode("ascii", "ignore").decode("ascii").lower()
+    return _NON_ALNUM.sub(" ", value).strip()
+
+
+def normalize_company(value):
+    words = normalize_text(value).split()
+    while words and words[-1] in COMPANY_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def tokenize(value):
+    return normalize_text(value).split()
+
+
+def char_shingles(value, k=4):
+    """Character k-grams of a normalized string (the whole string if it is shorter than k)."""
+    value = normalize_text(value)
+    if not value:
+        return set()
+    if len(value) <= k:
+        return {value}
+    return {value[i:i + k] for i in range(len(value) - k + 1)}
+
+
+_SALARY_NUMBER = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*([kK])?")
+HOURS_PER_YEAR = 2080
+
+
+def parse_salary(value):
+    """Best-effort (min, max) annual salary from the strings the boards use, or (None, None).
+
+    Handles "$120K - $140K/yr", "$55 - $58/hr", "80000-120000 USD", "$100,000 or more USD".
+    Bare small amounts ("$40") are assumed hourly.
+    """
+    text = (value or "").lower()
+    if not text or "not disclosed" in text or "not specified" in text:
+        return None, None
+    amounts = []
+    for number, thousands in _SALARY_NUMBER.findall(text):
+        amount = float(number.replace(",", ""))
+        if thousands:
+            amount *= 1000
+        amounts.append(amount)
+    if not amounts:
+        return None, None
+    if "hour" in text or "/hr" in text or max(amounts) < 500:
+        amounts = [a * HOURS_PER_YEAR for a in amounts]
+    elif "month" in text or "/mo" in text:
+        amounts = [a * 12 for a in amounts]
+    return min(amounts), max(amounts)
+
+
+_RELATIVE_POSTED = re.compile(r"(\d+)\s*\+?\s*(d|day|days|h|hr|hour|hours|m|min|minutes)\b")
+
+
+def parse_posted(value, today=None, relative=True):
+    """Normalize a posted value ("2025-10-22", "Today", "9d", "2025-10-08 00:00:10 UTC") to a date.
+
+    Relative values are resolved against ``today``, or give None with ``relative=False``
+    (when the day they were scraped is unknown); returns None when unparseable.
+    """
+    today = today or date.today()
+    text = (value or "").strip().lower()
+    if not text:
+        return None
+    try:
+        return datetime.strptime(text[:10], "%Y-%m-%d").date()
+    except ValueError:
+        pass
+    if not relative:
+        return None
+    if any(k in text for k in ("today", "just posted", "new")):
+        return today
+    match = _RELATIVE_POSTED.search(text)
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        if unit.startswith("d"):
+            return today - timedelta(days=amount)
+        return today
+    return None
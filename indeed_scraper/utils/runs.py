@@ -0,0 +1,10 @@
+def completed(reason):
+    """True if a spider that closed for ``reason`` ran its course.
+
+    That is "finished", or one of the CloseSpider caps the spiders set as their
+    page limits (``closespider_pagecount``, ``_itemcount``, ``_timeout``...).
+    Errors, ``closespider_errorcount`` and ``shutdown`` are not.
+    """
+    if reason == "finished":
+        return True
+    return reason.startswith("closespider_") and reason != "closespider_errorcount"
@@ -0,0 +1,20 @@
+import os
+
+from scrapy.utils.project import data_path
+
+
+def data_file(setting_value, default_name):
+    """Resolve a file-path setting, falling back to ``default_name`` in the project's .scrapy dir."""
+    if setting_value:
+        parent = os.path.dirname(setting_value)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        return setting_value
+    return os.path.join(data_path("indeed_scraper", createdir=True), default_name)
+
+
+def data_dir(setting_value, default_name):
+    """Like data_file(), but for a directory; the directory is created."""
+    path = setting_value or os.path.join(data_path("indeed_scraper", createdir=True), default_name)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -0,0 +1,113 @@
+import json
+
+JSON_LD_XPATH = "//script[@type='application/ld+json']/text()"
+
+# Script tags that carry the page's client-side hydration state
+HYDRATION_XPATH = (
+    "//script[@id='__NEXT_DATA__' or @id='js_variables' or @id='__NUXT_DATA__']/text()"
+)
+
+SALARY_UNITS = {"YEAR": "a year", "MONTH": "a month", "WEEK": "a week", "DAY": "a day", "HOUR": "an hour"}
+
+
+def _loads(text):
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_json_ld(response):
+    """Decoded objects from every JSON-LD block of a page (each block decoded once)."""
+    for text in response.xpath(JSON_LD_XPATH).getall():
+        data = _loads(text.strip())
+        if data is not None:
+            yield data
+
+
+def iter_hydration(response):
+    for text in response.xpath(HYDRATION_XPATH).getall():
+        data = _loads(text.strip())
+        if data is not None:
+            yield data
+
+
+def _types(obj):
+    value = obj.get("@type")
+    return value if isinstance(value, list) else [value]
+
+
+def iter_job_postings(data):
+    """Walk JSON-LD (lists, @graph, ItemList/ListItem wrappers) and yield JobPosting dicts."""
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, list):
+            stack.extend(reversed(obj))
+        elif isinstance(obj, dict):
+            if "JobPosting" in _types(obj):
+                yield obj
+                continue
+            for key in ("@graph", "itemListElement", "item", "mainEntity"):
+                if key in obj:
+                    stack.append(obj[key])
+
+
+def iter_dicts_with(data, required_keys):
+    """Every nested dict containing all of ``required_keys`` (used on hydration blobs)."""
+    stack = [data]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, dict):
+            if all(k in obj for k in required_keys):
+                yield obj
+                continue
+            stack.extend(reversed(list(obj.values())))
+        elif isinstance(obj, list):
+            stack.extend(reversed(obj))
+
+
+def format_salary(min_value, max_value=None, unit=None, currency="USD"):
+    if not min_value and not max_value:
+        return ""
+    symbol = "$" if (currency or "USD") == "USD" else f"{currency} "
+    parts = [f"{symbol}{float(v):,.0f}" for v in (min_value, max_value) if v]
+    if len(parts) == 2 and parts[0] == parts[1]:
+        parts = parts[:1]
+    text = " - ".join(parts)
+    suffix = SALARY_UNITS.get((unit or "").upper())
+    return f"{text} {suffix}" if suffix else text
+
+
+def job_posting_salary(posting):
+    salary = posting.get("baseSalary") or {}
+    if not isinstance(salary, dict):
+        return ""
+    value = salary.get("value") or {}
+    if isinstance(value, dict):
+        return format_salary(
+            value.get("minValue") or value.get("value"),
+            value.get("maxValue"),
+            value.get("unitText"),
+            salary.get("currency", "USD"),
+        )
+    return format_salary(value, None, None, salary.get("currency", "USD"))
+
+
+def job_posting_location(posting):
+    locations = posting.get("jobLocation") or []
+    if isinstance(locations, dict):
+        locations = [locations]
+    names = []
+    for location in locations:
+        address = (location or {}).get("address") or {}
+        if isinstance(address, str):
+            names.append(address)
+            continue
+        parts = [address.get("addressLocality"), address.get("addressRegion")]
+        name = ", ".join(p for p in parts if p) or address.get("addressCountry")
+        if name:
+            names.append(name)
+    if posting.get("jobLocationType") == "TELECOMMUTE":
+        names.append("Remote")
+    return " ".join(dict.fromkeys(names))